@@ -1,5 +1,5 @@
 from fastapi import APIRouter
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from app.chess.board_mailbox import BoardMailbox as Board
 from app.chess.engines.random_engine import RandomEngine
 from app.chess.engines.dumb_engine import DumbEngine
@@ -15,6 +15,8 @@ class EngineMoveRequest(BaseModel):
     fen: str
     engine: str = "random"
     seed: int | None = None
+    # seconds the alphabeta engine may search; fixed depth when not given
+    time_limit: float | None = Field(default=None, gt=0)
 
 
 class EngineMoveResponse(BaseModel):
@@ -35,7 +37,7 @@ def engine_move(req: EngineMoveRequest):
     elif req.engine == "dumb":
         engine = DumbEngine(seed=req.seed)
     elif req.engine == "alphabeta":
-        engine = AlphaBeta(seed=req.seed)
+        engine = AlphaBeta(seed=req.seed, hard_limit=req.time_limit)
     else:
         raise BukochessException("Unknown engine")
     print(req.engine)
@@ -84,17 +84,10 @@ def legal_moves(req: LegalMovesRequest):
             detail=str(e),
         )
     generator = MoveGenerator(board)
-    moves = generator.legal_moves()
-    final_moves = []
     if req.square != "":
-        sq = from_uci(req.square)
-
-        for m in moves:
-            xy, nxy, flags = m
-            if xy == sq:
-                final_moves.append(m)
+        final_moves = generator.legal_moves_from_square(from_uci(req.square))
     else:
-        final_moves = moves
+        final_moves = generator.legal_moves()
     m_str = []
     for m in final_moves:
         m_str.append(to_uci(m))
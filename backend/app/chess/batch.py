@@ -0,0 +1,319 @@
+"""
+Position statistics for many FENs at once, vectorized with NumPy.
+NumPy is optional: only this module needs it.
+"""
+from typing import Sequence
+
+import numpy as np
+
+from app.chess.board_mailbox import BoardMailbox
+from app.chess.move_mailbox import MoveMailBoxGenerator
+from app.chess.static import WHITE, QUEEN_DIRS, ROOK_DIRS
+
+# int8 piece codes; negative for black
+PIECE_CODES = {"P": 1, "N": 2, "B": 3, "R": 4, "Q": 5, "K": 6}
+PIECE_CODES.update({c.lower(): -code for c, code in PIECE_CODES.items()})
+PAWN_CODE, KNIGHT_CODE, BISHOP_CODE, ROOK_CODE, QUEEN_CODE, KING_CODE = 1, 2, 3, 4, 5, 6
+
+# FEN placement with every digit expanded to dots: 8 ranks of 8 plus 7 separators
+EXPAND_EMPTY = str.maketrans({str(k): "." * k for k in range(1, 9)})
+RANK_SEPARATORS = np.arange(8, 71, 9)
+NO_CODE = -128
+CODE_TABLE = np.full(256, NO_CODE, dtype=np.int8)
+CODE_TABLE[ord(".")] = 0
+for _c, _code in PIECE_CODES.items():
+    CODE_TABLE[ord(_c)] = _code
+
+EN_PASSANT_SQUARES = {"-"} | {f + r for f in "abcdefgh" for r in "36"}
+
+KNIGHT_STEPS = ((2, 1), (2, -1), (-2, 1), (-2, -1), (1, 2), (1, -2), (-1, 2), (-1, -2))
+KING_STEPS = QUEEN_DIRS
+
+
+def _ray_index() -> np.ndarray:
+    """
+    [direction][sq] -> ray squares outwards, padded with 64 (an always empty column);
+    directions in QUEEN_DIRS order, the first four are rook lines.
+    """
+    index = np.full((len(QUEEN_DIRS), 64, 7), 64, dtype=np.intp)
+    for sq in range(64):
+        rank, file = divmod(sq, 8)
+        for d, (dr, df) in enumerate(QUEEN_DIRS):
+            r, f, i = rank + dr, file + df, 0
+            while 0 <= r < 8 and 0 <= f < 8:
+                index[d, sq, i] = r * 8 + f
+                r, f, i = r + dr, f + df, i + 1
+    return index
+
+
+RAY_INDEX = _ray_index()
+
+
+def _file_mask(df: int) -> np.uint64:
+    """
+    Squares a shift by df files may land on without wrapping to the other edge.
+    """
+    bits = 0
+    for sq in range(64):
+        if 0 <= (sq & 7) - df < 8:
+            bits |= 1 << sq
+    return np.uint64(bits)
+
+
+FILE_MASKS = {df: _file_mask(df) for df in range(-2, 3)}
+RANK_3 = np.uint64(0xFF << 16)
+RANK_8 = np.uint64(0xFF << 56)
+F1_G1 = np.uint64(1 << 5 | 1 << 6)
+B1_C1_D1 = np.uint64(1 << 1 | 1 << 2 | 1 << 3)
+E1_F1_G1 = np.uint64(1 << 4 | 1 << 5 | 1 << 6)
+C1_D1_E1 = np.uint64(1 << 2 | 1 << 3 | 1 << 4)
+E1 = np.uint64(1 << 4)
+
+if hasattr(np, "bitwise_count"):
+    _popcount = np.bitwise_count
+else:  # numpy < 2.0
+    def _popcount(bb: np.ndarray) -> np.ndarray:
+        return np.unpackbits(bb.astype("<u8").view(np.uint8).reshape(-1, 8), axis=1).sum(axis=1)
+
+
+def _shift(bb: np.ndarray, dr: int, df: int) -> np.ndarray:
+    """
+    Shift (N,) bitboards by dr ranks and df files; squares pushed off the board are dropped.
+    """
+    step = dr * 8 + df
+    bb = bb << np.uint64(step) if step > 0 else bb >> np.uint64(-step)
+    return bb & FILE_MASKS[df] if df else bb
+
+
+def _pack(mask: np.ndarray) -> np.ndarray:
+    """
+    (N, 64) bool -> (N,) uint64 bitboards, a1 = bit 0.
+    """
+    return np.packbits(mask, axis=1, bitorder="little").view("<u8")[:, 0].astype(np.uint64)
+
+
+def _unpack(bb: np.ndarray) -> np.ndarray:
+    """
+    (N,) uint64 bitboards -> (N, 64) uint8, a1 = column 0.
+    """
+    return np.unpackbits(bb.astype("<u8").view(np.uint8).reshape(-1, 8), axis=1, bitorder="little")
+
+
+def _attack_steps(pieces: dict[int, np.ndarray], pawn_up: int, empty: np.ndarray) -> list[np.ndarray]:
+    """
+    Attacks of one side as a list of bitboards, one bit per attacking piece and square;
+    the king's steps come last, eight of them.
+    pieces maps piece code -> bitboard, with positive codes for this side.
+    """
+    steps = [_shift(pieces[PAWN_CODE], pawn_up, -1), _shift(pieces[PAWN_CODE], pawn_up, 1)]
+    steps.extend(_shift(pieces[KNIGHT_CODE], dr, df) for dr, df in KNIGHT_STEPS)
+    for sliders, dirs in ((pieces[BISHOP_CODE] | pieces[QUEEN_CODE], QUEEN_DIRS[4:]),
+                          (pieces[ROOK_CODE] | pieces[QUEEN_CODE], ROOK_DIRS)):
+        if not sliders.any():
+            continue
+        for dr, df in dirs:
+            ray = sliders
+            for _ in range(7):
+                ray = _shift(ray, dr, df)
+                steps.append(ray)
+                ray = ray & empty
+                if not ray.any():
+                    break
+    steps.extend(_shift(pieces[KING_CODE], dr, df) for dr, df in KING_STEPS)
+    return steps
+
+
+class PositionBatch:
+    """
+    N positions packed into an (N, 64) int8 array (a1 = 0, negative codes for black).
+    Statistics run on (N,) uint64 bitboards with the side to move always playing up
+    the board: rows with black to move are mirrored and negated, results mirrored back.
+    Rows in check, with a pinned piece or an en passant square go through the scalar
+    generator for their legal-move count; everything else is counted on the arrays.
+    """
+
+    def __init__(self, boards: np.ndarray, white_to_move: np.ndarray, castling: np.ndarray,
+                 en_passant: np.ndarray, fens: Sequence[str]):
+        self.boards = boards
+        self.white_to_move = white_to_move
+        self.castling = castling
+        self.en_passant = en_passant
+        self.fens = fens
+        self._stats = None
+
+    def __len__(self) -> int:
+        return len(self.fens)
+
+    @classmethod
+    def from_fens(cls, fens: Sequence[str]) -> "PositionBatch":
+        """
+        Pack FENs; raises ValueError naming the first one that cannot be packed.
+        The placement is checked on the packed array, not per FEN like BoardBase.validate_fen.
+        """
+        fens = list(fens)
+        n = len(fens)
+        placements = []
+        white_to_move = np.zeros(n, dtype=bool)
+        castling = np.zeros(n, dtype=np.int8)
+        en_passant = np.full(n, -1, dtype=np.int8)
+        for i, fen in enumerate(fens):
+            parts = fen.split()
+            if len(parts) != 6 or parts[1] not in ("w", "b") or parts[3] not in EN_PASSANT_SQUARES:
+                raise ValueError(f"Invalid FEN: {fen}")
+            placement, active, rights, ep = parts[:4]
+            expanded = placement.translate(EXPAND_EMPTY)
+            if len(expanded) != 71 or not expanded.isascii():
+                raise ValueError(f"Invalid board layout: {fen}")
+            placements.append(expanded)
+            white_to_move[i] = active == "w"
+            castling[i] = ("K" in rights) | ("Q" in rights) << 1 | ("k" in rights) << 2 | ("q" in rights) << 3
+            if ep != "-":
+                en_passant[i] = (int(ep[1]) - 1) * 8 + ord(ep[0]) - ord("a")
+
+        raw = np.frombuffer("".join(placements).encode("ascii"), dtype=np.uint8).reshape(n, 71)
+        codes = CODE_TABLE[np.delete(raw, RANK_SEPARATORS, axis=1)]
+        invalid = (raw[:, RANK_SEPARATORS] != ord("/")).any(axis=1) | (codes == NO_CODE).any(axis=1) \
+            | (np.abs(codes[:, :8]) == PAWN_CODE).any(axis=1) | (np.abs(codes[:, 56:]) == PAWN_CODE).any(axis=1)
+        if invalid.any():
+            raise ValueError(f"Invalid board layout: {fens[np.argmax(invalid)]}")
+        # FEN lists rank 8 first
+        boards = np.ascontiguousarray(codes.reshape(n, 8, 8)[:, ::-1, :].reshape(n, 64))
+        return cls(boards, white_to_move, castling, en_passant, fens)
+
+    def attack_counts(self, color: int) -> np.ndarray:
+        """
+        (N, 64) number of pieces of color attacking each square, like BoardMailbox.attack_map
+        but without lifting any king.
+        """
+        stats = self._compute()
+        key = "white_attacks" if color == WHITE else "black_attacks"
+        if key not in stats:
+            own = self.white_to_move if color == WHITE else ~self.white_to_move
+            own_counts = sum(_unpack(step).astype(np.int8) for step in stats["own_steps"])
+            enemy_counts = sum(_unpack(step).astype(np.int8) for step in stats["enemy_steps"])
+            counts = np.where(own[:, None], own_counts, enemy_counts).reshape(-1, 8, 8)
+            stats[key] = np.where(self.white_to_move[:, None, None], counts, counts[:, ::-1, :]).reshape(-1, 64)
+        return stats[key]
+
+    def target_masks(self) -> np.ndarray:
+        """
+        (N, 64) squares the side to move has a pseudo-legal move to, castling included.
+        """
+        return _unpack(self._unmirror(self._compute()["targets"])).astype(bool)
+
+    def in_check(self) -> np.ndarray:
+        """
+        (N,) whether the side to move is in check.
+        """
+        return self._compute()["in_check"]
+
+    def legal_move_counts(self) -> np.ndarray:
+        """
+        (N,) number of legal moves for the side to move.
+        """
+        stats = self._compute()
+        counts = stats["counts"].copy()
+        board = BoardMailbox()
+        gen = MoveMailBoxGenerator(board)
+        for i in np.flatnonzero(stats["fallback"]):
+            board.from_fen(self.fens[i])
+            counts[i] = gen.count_legal_moves()
+        return counts
+
+    def _unmirror(self, bb: np.ndarray) -> np.ndarray:
+        return np.where(self.white_to_move, bb, bb.byteswap())
+
+    def _compute(self) -> dict:
+        if self._stats is not None:
+            return self._stats
+
+        n = len(self)
+        # side to move plays up the board as positive codes
+        flat = np.where(self.white_to_move[:, None], self.boards,
+                        -self.boards.reshape(n, 8, 8)[:, ::-1, :].reshape(n, 64))
+        rights = np.where(self.white_to_move, self.castling & 3, self.castling >> 2 & 3)
+
+        own_pieces = {code: _pack(flat == code) for code in range(1, 7)}
+        enemy_pieces = {code: _pack(flat == -code) for code in range(1, 7)}
+        own = np.bitwise_or.reduce(list(own_pieces.values()))
+        enemy = np.bitwise_or.reduce(list(enemy_pieces.values()))
+        empty = ~(own | enemy)
+
+        own_steps = _attack_steps(own_pieces, 1, empty)
+        enemy_steps = _attack_steps(enemy_pieces, -1, empty)
+        attacked = np.bitwise_or.reduce(enemy_steps)
+
+        # --- knights, sliders, king: every attacked square not holding an own piece ---
+        counts = np.zeros(n, dtype=np.int32)
+        targets = np.zeros(n, dtype=np.uint64)
+        not_own = ~own
+        for step in own_steps[2:-8]:
+            landing = step & not_own
+            counts += _popcount(landing)
+            targets |= landing
+        not_own_or_attacked = not_own & ~attacked
+        for step in own_steps[-8:]:
+            landing = step & not_own_or_attacked
+            counts += _popcount(landing)
+            targets |= landing
+
+        # --- pawns: four moves per promotion ---
+        pawns = own_pieces[PAWN_CODE]
+        push = _shift(pawns, 1, 0) & empty
+        double = _shift(push & RANK_3, 1, 0) & empty
+        for landing in (push, own_steps[0] & enemy, own_steps[1] & enemy):
+            counts += _popcount(landing & ~RANK_8) + 4 * _popcount(landing & RANK_8).astype(np.int32)
+            targets |= landing
+        counts += _popcount(double)
+        targets |= double
+        # en passant rows are counted by the scalar generator, only their target is set here
+        has_ep = self.en_passant >= 0
+        ep_sq = np.where(has_ep, np.where(self.white_to_move, self.en_passant, self.en_passant ^ 56), 0)
+        ep_target = np.where(has_ep, np.uint64(1) << ep_sq.astype(np.uint64), np.uint64(0))
+        targets |= (own_steps[0] | own_steps[1]) & ep_target
+
+        # --- castling ---
+        on_e1 = (own_pieces[KING_CODE] & E1) != 0
+        king_side = on_e1 & (rights & 1).astype(bool) & ((empty & F1_G1) == F1_G1) & ((attacked & E1_F1_G1) == 0)
+        queen_side = on_e1 & (rights & 2).astype(bool) & ((empty & B1_C1_D1) == B1_C1_D1) \
+            & ((attacked & C1_D1_E1) == 0)
+        counts += king_side.astype(np.int32) + queen_side
+        targets |= np.where(king_side, np.uint64(1 << 6), np.uint64(0))
+        targets |= np.where(queen_side, np.uint64(1 << 2), np.uint64(0))
+
+        in_check = (attacked & own_pieces[KING_CODE]) != 0
+        king_sq = np.argmax(flat == KING_CODE, axis=1)
+        fallback = in_check | self._pinned(flat, king_sq) | has_ep
+
+        self._stats = {
+            "own_steps": own_steps,
+            "enemy_steps": enemy_steps,
+            "targets": targets,
+            "in_check": in_check,
+            "counts": counts,
+            "fallback": fallback,
+        }
+        return self._stats
+
+    @staticmethod
+    def _pinned(flat: np.ndarray, king_sq: np.ndarray) -> np.ndarray:
+        """
+        Rows where an own piece is the only one between the own king and an enemy slider.
+        """
+        n = len(flat)
+        padded = np.concatenate((flat, np.zeros((n, 1), dtype=flat.dtype)), axis=1)
+        rows = np.arange(n)[:, None]
+        pinned = np.zeros(n, dtype=bool)
+        for d in range(len(QUEEN_DIRS)):
+            ray = padded[rows, RAY_INDEX[d][king_sq]]
+            occupied = ray != 0
+            first = np.argmax(occupied, axis=1)
+            second_occupied = occupied.copy()
+            second_occupied[np.arange(n), first] = False
+            second = np.argmax(second_occupied, axis=1)
+            first_piece = ray[np.arange(n), first]
+            second_piece = np.where(second_occupied.any(axis=1), ray[np.arange(n), second], 0)
+            slider = ROOK_CODE if d < 4 else BISHOP_CODE
+            pinned |= (first_piece > 0) & ((second_piece == -slider) | (second_piece == -QUEEN_CODE))
+        return pinned
+
@@ -15,6 +15,8 @@ class BoardBase(ABC):
     Abstract base class for all chess board representations.
     """
 
+    __slots__ = ()
+
     @staticmethod
     def validate_fen(fen: str) -> tuple[bool, str | None]:
         parts = fen.strip().split(" ")
@@ -1 +1,488 @@
-# TODO: if board_array is to slow, create this
\ No newline at end of file
+from typing import List
+
+from app.chess.board_base import BoardBase
+from app.chess.static import PAWN, ROOK, BISHOP, KNIGHT, QUEEN, KING, WHITE, BLACK, COLOR, EMPTY, \
+    KNIGHT_OFFSETS, KING_OFFSETS, COMBINED_TABLE, PIECE_VALUE_TABLE
+from app.chess.zobrist import Z_PIECE, Z_SIDE, Z_CASTLING, Z_EP_FILE
+from app.chess.move_flags import FLAG_EN_PASSANT, FLAG_PROMOTION
+from app.chess.utils import piece_flag_to_str, piece_str_to_flag, promotion_piece
+
+# ─────────────────────────────────────────────
+# Bitboard tables
+# ─────────────────────────────────────────────
+# bit n = square n (0 = a1, 63 = h8), same numbering as the mailbox board
+
+BB_ALL = 0xFFFF_FFFF_FFFF_FFFF
+BB_SQUARES = [1 << sq for sq in range(64)]
+
+BB_FILE_A = 0x0101_0101_0101_0101
+BB_FILE_H = BB_FILE_A << 7
+BB_RANK_1 = 0xFF
+BB_RANK_3 = BB_RANK_1 << 16
+BB_RANK_6 = BB_RANK_1 << 40
+BB_RANK_8 = BB_RANK_1 << 56
+BB_PROMOTION = BB_RANK_1 | BB_RANK_8
+
+BB_LIGHT_SQUARES = 0x55AA_55AA_55AA_55AA
+BB_DARK_SQUARES = BB_ALL ^ BB_LIGHT_SQUARES
+
+
+def _step_attacks(offsets) -> list[int]:
+    attacks = []
+    for sq in range(64):
+        rank, file = divmod(sq, 8)
+        bb = 0
+        for dr, df in offsets:
+            r, f = rank + dr, file + df
+            if 0 <= r < 8 and 0 <= f < 8:
+                bb |= BB_SQUARES[r * 8 + f]
+        attacks.append(bb)
+    return attacks
+
+
+def _ray_attacks(sq: int, occupied: int, dirs) -> int:
+    rank, file = divmod(sq, 8)
+    bb = 0
+    for dr, df in dirs:
+        r, f = rank + dr, file + df
+        while 0 <= r < 8 and 0 <= f < 8:
+            bit = BB_SQUARES[r * 8 + f]
+            bb |= bit
+            if occupied & bit:
+                break
+            r += dr
+            f += df
+    return bb
+
+
+def _line_attacks(dirs) -> tuple[list[int], list[dict[int, int]]]:
+    """
+    Attack tables for one line (rank, file, diagonal or anti-diagonal).
+    Every subset of the line mask is enumerated once (carry-rippler), so a
+    lookup is a single dict access keyed by `occupied & mask`.
+    """
+    masks = []
+    tables = []
+    for sq in range(64):
+        mask = _ray_attacks(sq, 0, dirs)
+        table = {}
+        subset = 0
+        while True:
+            table[subset] = _ray_attacks(sq, subset, dirs)
+            subset = (subset - mask) & mask
+            if not subset:
+                break
+        masks.append(mask)
+        tables.append(table)
+    return masks, tables
+
+
+KNIGHT_ATTACKS = _step_attacks(KNIGHT_OFFSETS)
+KING_ATTACKS = _step_attacks(KING_OFFSETS)
+# squares attacked BY a pawn of the given color standing on sq
+PAWN_ATTACKS = {
+    WHITE: _step_attacks(((1, -1), (1, 1))),
+    BLACK: _step_attacks(((-1, -1), (-1, 1))),
+}
+
+RANK_MASKS, RANK_ATTACKS = _line_attacks(((0, 1), (0, -1)))
+FILE_MASKS, FILE_ATTACKS = _line_attacks(((1, 0), (-1, 0)))
+DIAG_MASKS, DIAG_ATTACKS = _line_attacks(((1, 1), (-1, -1)))
+ANTI_MASKS, ANTI_ATTACKS = _line_attacks(((1, -1), (-1, 1)))
+
+
+def rook_attacks(sq: int, occupied: int) -> int:
+    return RANK_ATTACKS[sq][occupied & RANK_MASKS[sq]] | FILE_ATTACKS[sq][occupied & FILE_MASKS[sq]]
+
+
+def bishop_attacks(sq: int, occupied: int) -> int:
+    return DIAG_ATTACKS[sq][occupied & DIAG_MASKS[sq]] | ANTI_ATTACKS[sq][occupied & ANTI_MASKS[sq]]
+
+
+# BETWEEN[a][b]: squares strictly between a and b (0 if not aligned)
+# LINE[a][b]: the full rank/file/diagonal through a and b (0 if not aligned)
+BETWEEN = [[0] * 64 for _ in range(64)]
+LINE = [[0] * 64 for _ in range(64)]
+
+for _a in range(64):
+    for _masks in (RANK_MASKS, FILE_MASKS, DIAG_MASKS, ANTI_MASKS):
+        _line = _masks[_a] | BB_SQUARES[_a]
+        for _b in range(64):
+            if _masks[_a] & BB_SQUARES[_b]:
+                LINE[_a][_b] = _line
+    _rank, _file = divmod(_a, 8)
+    for _dr, _df in KING_OFFSETS:
+        _between = 0
+        _r, _f = _rank + _dr, _file + _df
+        while 0 <= _r < 8 and 0 <= _f < 8:
+            BETWEEN[_a][_r * 8 + _f] = _between
+            _between |= BB_SQUARES[_r * 8 + _f]
+            _r += _dr
+            _f += _df
+
+
+def bit_squares(bb: int) -> list[int]:
+    squares = []
+    while bb:
+        lsb = bb & -bb
+        squares.append(lsb.bit_length() - 1)
+        bb ^= lsb
+    return squares
+
+
+class BoardBitboard(BoardBase):
+    """
+    Bitboard board representation.
+    One 64-bit int per piece flag plus one occupancy set per color. A mirrored
+    64-square mailbox is kept so "which piece is on sq" stays a list lookup.
+    """
+
+    def __init__(self):
+        self.board: List[int] = [EMPTY] * 64
+        # indexed by piece flag (color | type), like Z_PIECE and COMBINED_TABLE
+        self.pieces: List[int] = [0] * 256
+        # indexed by WHITE / BLACK
+        self.occupancy: List[int] = [0] * 256
+        self.active_color: int = WHITE
+        self.castling_rights: int = 0
+        self.en_passant = -1
+        self.halfmove_clock = 0
+        self.fullmove_number = 1
+        self.position_counts: dict[int, int]
+        self.position_counts = {}
+        self.hash = 0
+        self.undo_stack: list[tuple] = []
+        self.white_king = 0
+        self.black_king = 0
+        self.score = 0
+
+    def move_generator(self):
+        from app.chess.move_bitboard import MoveBitboardGenerator
+        return MoveBitboardGenerator(self)
+
+    @property
+    def occupied(self) -> int:
+        return self.occupancy[WHITE] | self.occupancy[BLACK]
+
+    @property
+    def is_king_in_check(self) -> bool:
+        return self.precompute_is_king_in_check()
+
+    @property
+    def is_other_king_in_check(self) -> bool:
+        return self.precompute_is_king_in_check(self.active_color ^ COLOR)
+
+    def has_non_pawn_material(self, color: int) -> bool:
+        """Whether color has a piece besides pawns and the king (no zugzwang risk for a null move)."""
+        pieces = self.pieces
+        return bool(pieces[color | KNIGHT] | pieces[color | BISHOP] | pieces[color | ROOK] | pieces[color | QUEEN])
+
+    def put_piece(self, sq: int, piece: int):
+        self.board[sq] = piece
+        self.pieces[piece] |= BB_SQUARES[sq]
+        self.occupancy[piece & COLOR] |= BB_SQUARES[sq]
+        if piece & KING:
+            if piece & WHITE:
+                self.white_king = sq
+            else:
+                self.black_king = sq
+
+    def compute_hash(self):
+        h = 0
+        board = self.board
+
+        for sq in bit_squares(self.occupied):
+            h ^= Z_PIECE[board[sq]][sq]
+
+        # side to move
+        if self.active_color == BLACK:
+            h ^= Z_SIDE
+
+        # castling rights
+        h ^= Z_CASTLING[self.castling_rights]
+
+        # en passant (file only, if any)
+        if self.en_passant != -1:
+            h ^= Z_EP_FILE[self.en_passant & 7]
+
+        return h
+
+    def set_hash(self):
+        self.hash = self.compute_hash()
+
+    def switch_active_color(self):
+        self.active_color ^= (WHITE | BLACK)
+
+    def create_repetition_key(self):
+        return self.hash
+
+    def is_threefold_repetition(self) -> bool:
+        key = self.create_repetition_key()
+        return self.position_counts.get(key, 0) >= 3
+
+    def is_insufficient_material(self) -> bool:
+        pieces = self.pieces
+
+        # Any pawn, rook or queen → mating material exists
+        for ptype in (PAWN, ROOK, QUEEN):
+            if pieces[WHITE | ptype] or pieces[BLACK | ptype]:
+                return False
+
+        count = self.occupied.bit_count()
+        if count == 2 or count == 3:
+            return True  # K vs K or minor vs K
+
+        bishops = pieces[WHITE | BISHOP] | pieces[BLACK | BISHOP]
+        if count == 4 and bishops.bit_count() == 2:
+            return not (bishops & BB_LIGHT_SQUARES) or not (bishops & BB_DARK_SQUARES)
+
+        return False
+
+    def find_king(self, color: int) -> int:
+        return self.white_king if color == WHITE else self.black_king
+
+    def attackers(self, sq: int, attacker_color: int, occupied: int) -> int:
+        """
+        Set of `attacker_color` pieces attacking sq, given the occupancy `occupied`.
+        """
+        pieces = self.pieces
+        queens = pieces[attacker_color | QUEEN]
+        return (
+                (PAWN_ATTACKS[attacker_color ^ COLOR][sq] & pieces[attacker_color | PAWN])
+                | (KNIGHT_ATTACKS[sq] & pieces[attacker_color | KNIGHT])
+                | (KING_ATTACKS[sq] & pieces[attacker_color | KING])
+                | (rook_attacks(sq, occupied) & (pieces[attacker_color | ROOK] | queens))
+                | (bishop_attacks(sq, occupied) & (pieces[attacker_color | BISHOP] | queens))
+        )
+
+    def see(self, move: int) -> int:
+        """
+        Static exchange evaluation of a capture, see BoardMailbox.see. Captured pieces leave
+        the occupancy, so the slider attack sets pick up x-ray attackers by themselves.
+        """
+        board = self.board
+        pieces = self.pieces
+        from_sq = move & 63
+        to_sq = move >> 6 & 63
+        flags = move >> 12
+        piece = board[from_sq]
+        occupied = self.occupied ^ BB_SQUARES[from_sq]
+
+        if flags & FLAG_EN_PASSANT:
+            occupied ^= BB_SQUARES[(from_sq & ~7) + (to_sq & 7)]
+            gain = [PIECE_VALUE_TABLE[PAWN | WHITE]]
+        else:
+            gain = [PIECE_VALUE_TABLE[board[to_sq]]]
+        on_square = PIECE_VALUE_TABLE[piece]
+        if flags & FLAG_PROMOTION:
+            on_square = PIECE_VALUE_TABLE[promotion_piece(flags, piece & COLOR)]
+            gain[0] += on_square - PIECE_VALUE_TABLE[piece]
+
+        color = (piece & COLOR) ^ COLOR
+        while True:
+            attackers = self.attackers(to_sq, color, occupied) & occupied
+            if not attackers:
+                break
+            for ptype in (PAWN, KNIGHT, BISHOP, ROOK, QUEEN, KING):
+                candidates = attackers & pieces[color | ptype]
+                if candidates:
+                    break
+            gain.append(on_square - gain[-1])
+            if max(-gain[-2], gain[-1]) < 0:
+                break  # neither side would go on
+            occupied ^= candidates & -candidates
+            on_square = PIECE_VALUE_TABLE[color | ptype]
+            color ^= COLOR
+
+        while len(gain) > 1:
+            last = gain.pop()
+            gain[-1] = -max(-gain[-1], last)
+        return gain[0]
+
+    def is_square_attacked(self, sq: int, attacker_color: int) -> bool:
+        return bool(self.attackers(sq, attacker_color, self.occupied))
+
+    def precompute_is_king_in_check(self, color: int = None) -> bool:
+        if color is None:
+            color = self.active_color
+        king_sq = self.white_king if color == WHITE else self.black_king
+        return self.is_square_attacked(king_sq, color ^ COLOR)
+
+    def has_legal_moves(self, color: int = None) -> bool:
+        if color is None:
+            color = self.active_color
+
+        current_color = self.active_color
+        self.active_color = color
+
+        moves = self.move_generator().legal_moves()
+
+        self.active_color = current_color
+        return bool(moves)
+
+    def is_checkmate(self, color: int = None) -> bool:
+        if color is None:
+            color = self.active_color
+        return self.precompute_is_king_in_check(color) and not self.has_legal_moves(color)
+
+    def is_draw(self, color: int = None) -> bool:
+        if color is None:
+            color = self.active_color
+        # TODO: implement draw
+        return self.is_threefold_repetition()
+
+    def is_stalemate(self, color: int = None) -> bool:
+        if color is None:
+            color = self.active_color
+        return (
+                not self.precompute_is_king_in_check(color)
+                and not self.has_legal_moves(color)
+        )
+
+    def get_game_state(self) -> str:
+        status = "ok"
+        if self.is_stalemate():
+            status = "stalemate"
+        if self.is_draw():
+            status = "draw"
+        if self.is_king_in_check:
+            status = "check"
+        if self.is_checkmate():
+            status = "checkmate"
+        return status
+
+    def get_pieces_location(self, color: int) -> list[int]:
+        return bit_squares(self.occupancy[color])
+
+    def get_pieces(self) -> list[tuple[int, int]]:
+        board = self.board
+        return [(board[sq], sq) for sq in bit_squares(self.occupied)]
+
+    def to_2d_board_str(self):
+        board2d = [["" for _ in range(8)] for _ in range(8)]
+        for sq in range(64):
+            rank = 7 - (sq // 8)  # 0 = a8
+            file = sq % 8
+            board2d[rank][file] = piece_flag_to_str(self.board[sq]) if self.board[sq] else ""
+        return board2d
+
+    def print_board(self):
+        print()
+        print("    A   B   C   D   E   F   G   H")
+        print("  +---+---+---+---+---+---+---+---+")
+
+        # rank 8 (top) → rank 1 (bottom)
+        for rank in range(7, -1, -1):
+            row_str = f"{rank + 1} |"
+            for file in range(8):
+                sq = rank * 8 + file
+                piece = piece_flag_to_str(self.board[sq]) if self.board[sq] else "."
+                row_str += f" {piece} |"
+            print(row_str)
+            print("  +---+---+---+---+---+---+---+---+")
+
+        print("    A   B   C   D   E   F   G   H")
+        print()
+
+    def from_fen(self, fen: str):
+        """
+        Parses FEN into piece bitboards and the mirrored mailbox.
+        0 = a1 (white bottom-left)
+        63 = h8 (black top-right)
+        """
+        valid, message = self.validate_fen(fen)
+        if not valid:
+            raise ValueError(message)
+        parts = fen.strip().split()
+        if len(parts) != 6:
+            raise ValueError("Invalid FEN")
+
+        board_fen, active, castling, ep, halfmove, fullmove = parts
+        self.board = [EMPTY] * 64
+        self.pieces = [0] * 256
+        self.occupancy = [0] * 256
+
+        rank = 7  # FEN starts from rank 8 (top)
+        file = 0
+
+        for c in board_fen:
+            if c == "/":
+                rank -= 1
+                file = 0
+                continue
+            if c.isdigit():
+                file += int(c)
+            else:
+                self.put_piece(rank * 8 + file, piece_str_to_flag(c))
+                file += 1
+
+        # Active color
+        self.active_color = WHITE if active == "w" else BLACK
+
+        # Castling
+        self.castling_rights = 0
+        if "K" in castling: self.castling_rights |= 1
+        if "Q" in castling: self.castling_rights |= 2
+        if "k" in castling: self.castling_rights |= 4
+        if "q" in castling: self.castling_rights |= 8
+
+        # En passant
+        if ep == "-":
+            self.en_passant = -1
+        else:
+            ep_file = ord(ep[0]) - ord("a")
+            ep_rank = int(ep[1]) - 1  # rank 1 = 0
+            self.en_passant = ep_rank * 8 + ep_file
+
+        # Halfmove / fullmove
+        self.halfmove_clock = int(halfmove)
+        self.fullmove_number = int(fullmove)
+
+        self.set_hash()
+        self.score = self.calculate_total_score()
+
+        return True, "FEN Imported"
+
+    def calculate_total_score(self):
+        score = 0
+        for piece, square in self.get_pieces():
+            score += self.get_piece_sq_val(piece, square)
+        return score
+
+    def get_piece_sq_val(self, piece: int, square: int):
+        return COMBINED_TABLE[piece][square]
+
+    def castling_to_string(self) -> str:
+        if self.castling_rights == 0:
+            return "-"
+
+        res = ""
+        if self.castling_rights & 1: res += "K"
+        if self.castling_rights & 2: res += "Q"
+        if self.castling_rights & 4: res += "k"
+        if self.castling_rights & 8: res += "q"
+        return res
+
+    def to_fen(self) -> str:
+        fen_rows = []
+        for rank in range(7, -1, -1):
+            empty = 0
+            row = ""
+            for file in range(8):
+                pf = self.board[rank * 8 + file]
+                if pf == EMPTY:
+                    empty += 1
+                else:
+                    if empty:
+                        row += str(empty)
+                        empty = 0
+                    row += piece_flag_to_str(pf)
+            if empty:
+                row += str(empty)
+            fen_rows.append(row)
+        board_part = "/".join(fen_rows)
+
+        active = "w" if self.active_color == WHITE else "b"
+        ep = "-" if self.en_passant == -1 else chr((self.en_passant % 8) + ord("a")) + str((self.en_passant // 8) + 1)
+
+        return f"{board_part} {active} {self.castling_to_string()} {ep} {self.halfmove_clock} {self.fullmove_number}"
@@ -1,36 +1,69 @@
+from struct import Struct
 from typing import List
 
 from app.chess.board_base import BoardBase
 from app.chess.static import *
 from app.chess.static import PAWN, ROOK, BISHOP, KNIGHT, QUEEN, KING, WHITE, BLACK, PIECE, COLOR, PIECE_TO_INDEX, \
-    ROOK_SLIDERS, BISHOP_SLIDERS, EMPTY
+    ROOK_SLIDERS, BISHOP_SLIDERS, EMPTY, KNIGHT_TARGETS, KING_TARGETS, PAWN_CAPTURE_TARGETS, ROOK_RAYS, BISHOP_RAYS, \
+    QUEEN_RAYS, PIECE_VALUE_TABLE
 from app.chess.zobrist import Z_PIECE, Z_SIDE, Z_CASTLING, Z_EP_FILE, PIECE_INDEX
-from app.chess.utils import rank_x, file_y, piece_flag_to_str, piece_str_to_flag
+from app.chess.move_flags import FLAG_EN_PASSANT, FLAG_PROMOTION
+from app.chess.utils import piece_flag_to_str, piece_str_to_flag, promotion_piece
+
+
+# initial capacity of the per-ply undo store
+UNDO_PLIES = 1024
+
+# to_bytes layout: 64 squares, side, castling, en passant + 1, halfmove and fullmove as uint16
+PACKED_CLOCKS = Struct("<HH")
+PACKED_SIZE = 67 + PACKED_CLOCKS.size
+PACKED_PIECES = {EMPTY} | {color | ptype for color in (WHITE, BLACK) for ptype in (PAWN, KNIGHT, BISHOP, ROOK, QUEEN, KING)}
 
 
 class BoardMailbox(BoardBase):
     """
     Simple 8x8 array board representation.
+    Slotted: one is created per API request and its fields are read on every apply/undo.
     """
 
+    __slots__ = (
+        "board", "active_color", "castling_rights", "en_passant", "halfmove_clock", "fullmove_number", "hash",
+        "ply", "hash_history", "undo_captured", "undo_castling", "undo_en_passant", "undo_halfmove", "undo_score",
+        "white_king", "black_king", "piece_squares", "attack_maps", "_is_king_in_check", "_is_other_king_in_check",
+        "score",
+    )
+
     def __init__(self):
-        # a list with 64 entries
+        # one int per square, a1 = 0; a list indexes faster than bytearray/array in the search
         self.board: List[int] = [EMPTY] * 64
         self.active_color: int = WHITE
         self.castling_rights: int = 0
         self.en_passant = 0
         self.halfmove_clock = 0
         self.fullmove_number = 1
-        self.position_counts: dict[int, int]
-        self.position_counts = {}
         self.hash = 0
-        self.undo_stack: list[tuple] = []
+        # make/unmake store, one slot per ply below self.ply, written by MoveMailBoxGenerator.apply;
+        # hash_history[i] is the hash before move i and also serves the repetition check
+        self.ply = 0
+        self.hash_history: List[int] = [0] * UNDO_PLIES
+        self.undo_captured: List[int] = [EMPTY] * UNDO_PLIES
+        self.undo_castling: List[int] = [0] * UNDO_PLIES
+        self.undo_en_passant: List[int] = [-1] * UNDO_PLIES
+        self.undo_halfmove: List[int] = [0] * UNDO_PLIES
+        self.undo_score: List[int] = [0] * UNDO_PLIES
         self.white_king = 0
         self.black_king = 0
+        # occupied squares per color, kept in sync by MoveMailBoxGenerator.apply/undo
+        self.piece_squares: dict[int, set[int]] = {WHITE: set(), BLACK: set()}
+        # per color attack counts of the current position, see attack_map; cleared by apply/undo
+        self.attack_maps: dict[int, list[int]] = {}
         self._is_king_in_check = -1
         self._is_other_king_in_check = -1
         self.score = 0
-        init_tables()
+
+    def move_generator(self):
+        from app.chess.move_mailbox import MoveMailBoxGenerator
+        return MoveMailBoxGenerator(self)
 
     @property
     def is_king_in_check(self):
@@ -53,17 +86,30 @@ class BoardMailbox(BoardBase):
     def is_other_king_in_check(self, value):
         self._is_other_king_in_check = value
 
+    def has_non_pawn_material(self, color: int) -> bool:
+        """Whether color has a piece besides pawns and the king (no zugzwang risk for a null move)."""
+        board = self.board
+        for sq in self.piece_squares[color]:
+            if board[sq] & (KNIGHT | BISHOP | ROOK | QUEEN):
+                return True
+        return False
+
+    def position_key(self) -> bytes:
+        """
+        Exact identity of the position (placement, side, castling, en passant), used to verify hash lookups.
+        """
+        return bytes(self.board) + bytes((self.active_color, self.castling_rights, self.en_passant + 1))
+
     def compute_hash(self):
         h = 0
         board = self.board
 
-        for sq in range(64):
+        for sq in self.piece_squares[WHITE] | self.piece_squares[BLACK]:
             piece = board[sq]
-            if piece:
-                ptype = piece & PIECE
-                color = piece & COLOR
-                idx = PIECE_TO_INDEX[ptype] + (0 if color == WHITE else 6)
-                h ^= Z_PIECE[idx][sq]
+            ptype = piece & PIECE
+            color = piece & COLOR
+            idx = PIECE_TO_INDEX[ptype] + (0 if color == WHITE else 6)
+            h ^= Z_PIECE[idx][sq]
 
         # side to move
         if self.active_color == BLACK:
@@ -90,16 +136,37 @@ class BoardMailbox(BoardBase):
         return repetition_key
 
     def is_threefold_repetition(self) -> bool:
+        """
+        Positions reached by the applied moves, the FEN position itself not counted.
+        Only plies since the last capture or pawn move with the same side to move can repeat.
+        """
+        if self.ply == 0:
+            return False
         key = self.create_repetition_key()
-        return self.position_counts.get(key, 0) >= 3
+        history = self.hash_history
+        count = 1
+        for i in range(self.ply - 2, max(self.ply - self.halfmove_clock, 1) - 1, -2):
+            if history[i] == key:
+                count += 1
+                if count >= 3:
+                    return True
+        return False
 
-    def is_insufficient_material(self) -> bool:
-        pieces = []
+    def grow_undo(self):
+        """
+        Double the capacity of the undo store, to at least UNDO_PLIES slots; only games longer
+        than UNDO_PLIES and copies (which keep just the used plies) get here.
+        """
+        size = max(len(self.hash_history), UNDO_PLIES)
+        self.hash_history.extend([0] * size)
+        self.undo_captured.extend([EMPTY] * size)
+        self.undo_castling.extend([0] * size)
+        self.undo_en_passant.extend([-1] * size)
+        self.undo_halfmove.extend([0] * size)
+        self.undo_score.extend([0] * size)
 
-        for sq in range(64):
-            p = self.board[sq]
-            if p:
-                pieces.append((p, sq))
+    def is_insufficient_material(self) -> bool:
+        pieces = self.get_pieces()
 
         # Any pawn, rook or queen → mating material exists
         for p, _ in pieces:
@@ -140,7 +207,54 @@ class BoardMailbox(BoardBase):
         if color is None:
             color = self.active_color
         king_sq = self.white_king if color == WHITE else self.black_king
-        return self.is_square_attacked(king_sq, color ^ (WHITE | BLACK))
+        enemy = color ^ COLOR
+        counts = self.attack_maps.get(enemy)
+        if counts is None:
+            # a single square is cheaper to scan than building the whole map
+            return self.is_square_attacked(king_sq, enemy)
+        return counts[king_sq] > 0
+
+    def attack_map(self, color: int) -> list[int]:
+        """
+        Number of pieces of color attacking each square, computed once per position and
+        dropped by apply/undo. The other king is left out, so a square behind it on a
+        checking ray counts as attacked.
+        """
+        counts = self.attack_maps.get(color)
+        if counts is not None:
+            return counts
+        counts = [0] * 64
+        board = self.board
+        king_sq = self.black_king if color == WHITE else self.white_king
+        king = board[king_sq]
+        board[king_sq] = EMPTY
+        for sq in self.piece_squares[color]:
+            piece = board[sq]
+            ptype = piece & PIECE
+            if ptype == PAWN:
+                targets = PAWN_CAPTURE_TARGETS[color][sq]
+            elif ptype == KNIGHT:
+                targets = KNIGHT_TARGETS[sq]
+            elif ptype == KING:
+                targets = KING_TARGETS[sq]
+            else:
+                if ptype == ROOK:
+                    rays = ROOK_RAYS[sq]
+                elif ptype == BISHOP:
+                    rays = BISHOP_RAYS[sq]
+                else:
+                    rays = QUEEN_RAYS[sq]
+                for ray in rays:
+                    for target in ray:
+                        counts[target] += 1
+                        if board[target]:
+                            break
+                continue
+            for target in targets:
+                counts[target] += 1
+        board[king_sq] = king
+        self.attack_maps[color] = counts
+        return counts
 
     def has_legal_moves(self, color: int = None) -> bool:
         from app.chess.move_mailbox import MoveMailBoxGenerator as Movegenerator
@@ -176,56 +290,121 @@ class BoardMailbox(BoardBase):
                 and not self.has_legal_moves(color)
         )
 
+    def see(self, move: int) -> int:
+        """
+        Static exchange evaluation of a capture: the material its side wins (negative: loses)
+        when both sides keep recapturing on the target square with their least valuable
+        attacker and each may stop when that is better. Sliders behind a piece that has
+        captured join the exchange (x-rays).
+        """
+        board = self.board
+        from_sq = move & 63
+        to_sq = move >> 6 & 63
+        flags = move >> 12
+        piece = board[from_sq]
+        removed = {from_sq}
+
+        if flags & FLAG_EN_PASSANT:
+            removed.add((from_sq & ~7) + (to_sq & 7))
+            gain = [PIECE_VALUE_TABLE[PAWN | WHITE]]
+        else:
+            gain = [PIECE_VALUE_TABLE[board[to_sq]]]
+        on_square = PIECE_VALUE_TABLE[piece]
+        if flags & FLAG_PROMOTION:
+            on_square = PIECE_VALUE_TABLE[promotion_piece(flags, piece & COLOR)]
+            gain[0] += on_square - PIECE_VALUE_TABLE[piece]
+
+        color = (piece & COLOR) ^ COLOR
+        while True:
+            sq = self.least_valuable_attacker(to_sq, color, removed)
+            if sq == -1:
+                break
+            gain.append(on_square - gain[-1])
+            if max(-gain[-2], gain[-1]) < 0:
+                break  # neither side would go on
+            removed.add(sq)
+            on_square = PIECE_VALUE_TABLE[board[sq]]
+            color ^= COLOR
+
+        while len(gain) > 1:
+            last = gain.pop()
+            gain[-1] = -max(-gain[-1], last)
+        return gain[0]
+
+    def least_valuable_attacker(self, sq: int, color: int, removed: set[int]) -> int:
+        """
+        Square of the cheapest piece of color attacking sq, -1 if there is none.
+        Pieces on removed squares are treated as gone, so sliders see through them.
+        """
+        board = self.board
+        pawn = PAWN | color
+        for from_sq in PAWN_CAPTURE_TARGETS[color ^ COLOR][sq]:
+            if board[from_sq] == pawn and from_sq not in removed:
+                return from_sq
+        knight = KNIGHT | color
+        for from_sq in KNIGHT_TARGETS[sq]:
+            if board[from_sq] == knight and from_sq not in removed:
+                return from_sq
+
+        # --- sliders: first piece on every ray ---
+        best_sq = -1
+        best_value = PIECE_VALUE_TABLE[KING | color]
+        for rays, sliders in ((BISHOP_RAYS[sq], BISHOP_SLIDERS), (ROOK_RAYS[sq], ROOK_SLIDERS)):
+            for ray in rays:
+                for from_sq in ray:
+                    p = board[from_sq]
+                    if p and from_sq not in removed:
+                        if (p & COLOR) == color and p & sliders and PIECE_VALUE_TABLE[p] < best_value:
+                            best_sq = from_sq
+                            best_value = PIECE_VALUE_TABLE[p]
+                        break
+        if best_sq != -1:
+            return best_sq
+
+        king = KING | color
+        for from_sq in KING_TARGETS[sq]:
+            if board[from_sq] == king and from_sq not in removed:
+                return from_sq
+        return -1
+
     def is_square_attacked(self, sq: int, attacker_color: int) -> bool:
         board = self.board
-        rank, file = divmod(sq, 8)
 
         # --- pawn attacks ---
         pawn = PAWN | attacker_color
-        pawn_dir = 1 if attacker_color == WHITE else -1
-        for df in (-1, 1):
-            r, f = rank - pawn_dir, file + df
-            if 0 <= r < 8 and 0 <= f < 8:
-                if board[r * 8 + f] == pawn:
-                    return True
+        for from_sq in PAWN_CAPTURE_TARGETS[attacker_color ^ COLOR][sq]:
+            if board[from_sq] == pawn:
+                return True
 
         # --- knight attacks ---
-        for dr, df in KNIGHT_OFFSETS:
-            r, f = rank + dr, file + df
-            if 0 <= r < 8 and 0 <= f < 8:
-                if board[r * 8 + f] == (KNIGHT | attacker_color):
-                    return True
+        knight = KNIGHT | attacker_color
+        for from_sq in KNIGHT_TARGETS[sq]:
+            if board[from_sq] == knight:
+                return True
 
         # --- king attacks ---
-        for dr, df in KING_OFFSETS:
-            r, f = rank + dr, file + df
-            if 0 <= r < 8 and 0 <= f < 8:
-                if board[r * 8 + f] == (KING | attacker_color):
-                    return True
+        king = KING | attacker_color
+        for from_sq in KING_TARGETS[sq]:
+            if board[from_sq] == king:
+                return True
 
         # --- rook / queen rays ---
-        for dr, df in ROOK_DIRS:
-            r, f = rank + dr, file + df
-            while 0 <= r < 8 and 0 <= f < 8:
-                p = board[r * 8 + f]
+        for ray in ROOK_RAYS[sq]:
+            for from_sq in ray:
+                p = board[from_sq]
                 if p:
                     if (p & COLOR) == attacker_color and (p & ROOK_SLIDERS):
                         return True
                     break
-                r += dr
-                f += df
 
         # --- bishop / queen rays ---
-        for dr, df in BISHOP_DIRS:
-            r, f = rank + dr, file + df
-            while 0 <= r < 8 and 0 <= f < 8:
-                p = board[r * 8 + f]
+        for ray in BISHOP_RAYS[sq]:
+            for from_sq in ray:
+                p = board[from_sq]
                 if p:
                     if (p & COLOR) == attacker_color and (p & BISHOP_SLIDERS):
                         return True
                     break
-                r += dr
-                f += df
 
         return False
 
@@ -242,20 +421,11 @@ class BoardMailbox(BoardBase):
         return status
 
     def get_pieces_location(self, color: int) -> list[int]:
-        pieces = []
-        for sq in range(64):
-            p = self.board[sq]
-            if p and (p & COLOR) == color:
-                pieces.append(sq)
-        return pieces
+        return sorted(self.piece_squares[color])
 
     def get_pieces(self) -> list[tuple[int, int]]:
-        pieces = []
-        for sq in range(64):
-            p = self.board[sq]
-            if p:
-                pieces.append((p, sq))
-        return pieces
+        board = self.board
+        return [(board[sq], sq) for sq in sorted(self.piece_squares[WHITE] | self.piece_squares[BLACK])]
 
     def to_2d_board_str(self):
         board2d = [["" for _ in range(8)] for _ in range(8)]
@@ -336,20 +506,91 @@ class BoardMailbox(BoardBase):
         self.halfmove_clock = int(halfmove)
         self.fullmove_number = int(fullmove)
 
-        # Update kings
+        self.load_derived_state()
+        # self.is_other_king_in_check = self.precompute_is_king_in_check(WHITE if self.active_color == BLACK else BLACK)
+        # self.is_king_in_check = self.precompute_is_king_in_check()
+
+        return True, "FEN Imported"
+
+    def load_derived_state(self):
+        """
+        Rebuild everything that follows from board and position fields: piece squares,
+        kings, hash and score. Starts a fresh game history.
+        """
+        self.piece_squares = {WHITE: set(), BLACK: set()}
         for sq, pf in enumerate(self.board):
+            if not pf:
+                continue
+            self.piece_squares[pf & COLOR].add(sq)
             if pf & KING:
                 if pf & WHITE:
                     self.white_king = sq
                 else:
                     self.black_king = sq
 
+        self.attack_maps = {}
+        self._is_king_in_check = -1
+        self._is_other_king_in_check = -1
+        self.ply = 0
         self.set_hash()
         self.score = self.calculate_total_score()
-        # self.is_other_king_in_check = self.precompute_is_king_in_check(WHITE if self.active_color == BLACK else BLACK)
-        # self.is_king_in_check = self.precompute_is_king_in_check()
 
-        return True, "FEN Imported"
+    def to_bytes(self) -> bytes:
+        """
+        Position as PACKED_SIZE bytes: position_key() followed by halfmove clock and
+        fullmove number. The game history and undo store are not included.
+        """
+        return self.position_key() + PACKED_CLOCKS.pack(self.halfmove_clock, self.fullmove_number)
+
+    def from_bytes(self, data: bytes):
+        """
+        Load a position written by to_bytes, without FEN parsing.
+        """
+        if len(data) != PACKED_SIZE:
+            raise ValueError(f"Packed position must be {PACKED_SIZE} bytes, not {len(data)}")
+        board = list(data[:64])
+        active_color, castling_rights, en_passant = data[64:67]
+        if not set(board) <= PACKED_PIECES or active_color not in (WHITE, BLACK) \
+                or castling_rights > 15 or en_passant > 64:
+            raise ValueError("Invalid packed position")
+
+        self.board = board
+        self.active_color = active_color
+        self.castling_rights = castling_rights
+        self.en_passant = en_passant - 1
+        self.halfmove_clock, self.fullmove_number = PACKED_CLOCKS.unpack_from(data, 67)
+        self.load_derived_state()
+
+    def copy(self) -> "BoardMailbox":
+        """
+        Independent copy without FEN parsing or rehashing. The used part of the undo store
+        comes along, so moves applied before the copy can be undone and repetitions still count.
+        """
+        other = BoardMailbox.__new__(BoardMailbox)
+        other.board = self.board[:]
+        other.active_color = self.active_color
+        other.castling_rights = self.castling_rights
+        other.en_passant = self.en_passant
+        other.halfmove_clock = self.halfmove_clock
+        other.fullmove_number = self.fullmove_number
+        other.hash = self.hash
+        other.ply = self.ply
+        ply = self.ply
+        other.hash_history = self.hash_history[:ply]
+        other.undo_captured = self.undo_captured[:ply]
+        other.undo_castling = self.undo_castling[:ply]
+        other.undo_en_passant = self.undo_en_passant[:ply]
+        other.undo_halfmove = self.undo_halfmove[:ply]
+        other.undo_score = self.undo_score[:ply]
+        other.white_king = self.white_king
+        other.black_king = self.black_king
+        other.piece_squares = {WHITE: set(self.piece_squares[WHITE]), BLACK: set(self.piece_squares[BLACK])}
+        # cached maps are replaced, never changed in place
+        other.attack_maps = dict(self.attack_maps)
+        other._is_king_in_check = self._is_king_in_check
+        other._is_other_king_in_check = self._is_other_king_in_check
+        other.score = self.score
+        return other
 
     def calculate_total_score(self):
         score = 0
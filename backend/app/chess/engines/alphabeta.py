@@ -1,10 +1,14 @@
 import random
+import time
+from typing import Iterator
+
 from app.chess.move_mailbox import MoveMailBoxGenerator as MoveGenerator, BoardMailbox as Board
 from app.chess.engines.base import Engine
 from app.chess.engines.transposition import TranspositionTable, TT_EXACT, TT_LOWER, TT_UPPER
-from app.chess.utils import to_uci
+from app.chess.utils import to_uci, capture_score, is_bad_capture
 from app.chess.static import WHITE, BLACK
-from app.chess.move_flags import FLAG_CAPTURE
+from app.chess.move_flags import MOVE_CAPTURE
+from app.chess.move_buffers import MoveBuffers
 from app.chess.static import PIECE_VALUE_TABLE
 
 MATE_SCORE = 100000
@@ -12,14 +16,53 @@ MATE_THRESHOLD = 90000
 
 MAX_DEPTH = 64
 
+# the clock is read once every STOP_CHECK_NODES nodes
+STOP_CHECK_NODES = 1024
+# soft limit as a share of the hard limit when only one of them is given
+SOFT_LIMIT_SHARE = 0.5
+# half width of the first aspiration window around the previous depth's score
+ASPIRATION_DELTA = 50
+# factor the half width grows by after each fail; past ASPIRATION_MAX_DELTA that side is open
+ASPIRATION_GROWTH = 2
+ASPIRATION_MAX_DELTA = 1000
+# null move: reduction NULL_R, NULL_R_DEEP above NULL_R_DEPTH remaining plies; not below NULL_MIN_DEPTH
+NULL_MIN_DEPTH = 3
+NULL_R = 2
+NULL_R_DEEP = 3
+NULL_R_DEPTH = 6
 
-class AlphaBeta(Engine):
 
-    def __init__(self, deepness: int | None = None, seed: int | None = None):
+class AlphaBeta(Engine):
+    """
+    Iterative deepening negamax with principal variation search. Without a time budget every
+    depth up to deepness is searched; with one, no new depth starts after soft_limit seconds
+    and a running depth is stopped at hard_limit. The move and pv always come from the last
+    completed depth.
+    """
+
+    def __init__(self, deepness: int | None = None, seed: int | None = None,
+                 soft_limit: float | None = None, hard_limit: float | None = None, random_ties: bool = False,
+                 aspiration_delta: int | None = ASPIRATION_DELTA, aspiration_growth: float = ASPIRATION_GROWTH,
+                 null_move: bool = True):
         self._rng = random.Random(seed)
+        # pick randomly among root moves with the best score instead of the first one
+        self.random_ties = random_ties
+        # None or 0 searches every depth with the full window
+        self.aspiration_delta = aspiration_delta
+        self.aspiration_growth = aspiration_growth
+        self.null_move = null_move
         self.move_value = {}
+        # a budget given as one limit: the other one follows from it
+        if hard_limit is None and soft_limit is not None:
+            hard_limit = soft_limit / SOFT_LIMIT_SHARE
+        elif soft_limit is None and hard_limit is not None:
+            soft_limit = hard_limit * SOFT_LIMIT_SHARE
+        self.soft_limit = soft_limit
+        self.hard_limit = hard_limit
         if deepness:
             self.deepness = deepness
+        elif hard_limit is not None:
+            self.deepness = MAX_DEPTH
         else:
             self.deepness = 4
         self.nodes = 0
@@ -29,59 +72,197 @@ class AlphaBeta(Engine):
         self.cutoffs = 0
         self.tt_hits = 0
         self.first_move_cutoffs = 0
+        # root searches that had to be repeated with a wider aspiration window
+        self.fail_highs = 0
+        self.fail_lows = 0
+        self.null_cutoffs = 0
         self.quiesce_calls = 0
         self.killers = [[None, None] for _ in range(MAX_DEPTH)]
+        # triangular PV table: row ply holds the best line found from ply, up to pv_length[ply]
+        self.pv_table = [[0] * (MAX_DEPTH + 1) for _ in range(MAX_DEPTH + 1)]
+        self.pv_length = [0] * (MAX_DEPTH + 1)
+        # principal variation of the last completed depth, root move first
+        self.pv: list[int] = []
+        self.buffers = MoveBuffers()
+        # perf_counter() value at which a running search stops, None while it may not
+        self.deadline: float | None = None
+        self.stopped = False
+        self.completed_depth = 0
 
     def choose_move(self, board: Board):
         print(f"searching move with alphabeta. deepness = {self.deepness}")
-        gen = MoveGenerator(board)
+        gen = board.move_generator()
         moves = gen.legal_moves()
         board = gen.board
         self.color = WHITE if board.active_color == WHITE else BLACK
         if not moves:
             return None
 
-        maximizing = board.active_color == WHITE
-        best_value = -float("inf") if maximizing else float("inf")
+        # scores are from the side to move; printed from white's point of view
+        sign = 1 if board.active_color == WHITE else -1
+        start = time.perf_counter()
+        self.stopped = False
+        self.completed_depth = 0
+        best_value = None
         best_moves = []
 
-        for m in moves:
-            gen.apply(m)
-            value = self.alphabeta(
-                gen,
-                self.deepness - 1,
-                -float("inf"),
-                float("inf"),
-                not maximizing, ply=0
-            )
-            gen.undo(m)
-            print(f"Move: {to_uci(m)} | Score: {value}")
-            if maximizing:
-                if value > best_value:
-                    best_value = value
-                    best_moves = [m]
-                elif value == best_value:
-                    best_moves.append(m)
+        for depth in range(1, self.deepness + 1):
+            # depth 1 always completes, so there is a move to return
+            self.deadline = start + self.hard_limit if self.hard_limit is not None and depth > 1 else None
+            result = self.search_aspiration(gen, moves, depth, best_value)
+            if result is None:
+                break
+            best_value, best_moves, scores = result
+            self.completed_depth = depth
+            self.pv = self.extend_pv(gen, self.pv_table[0][:self.pv_length[0]], depth)
+            # the next depth searches the root moves best score first
+            moves = sorted(moves, key=scores.__getitem__, reverse=True)
+
+            elapsed = time.perf_counter() - start
+            print(f"depth {depth} | Score: {sign * best_value} | PV: {' '.join(map(to_uci, self.pv))} | {elapsed:.2f}s")
+            if abs(best_value) > MATE_THRESHOLD:
+                break
+            if self.soft_limit is not None and elapsed >= self.soft_limit:
+                break
+        self.deadline = None
+
+        move = self._rng.choice(best_moves) if self.random_ties else best_moves[0]
+        if move != self.pv[0]:
+            # a tie picked over the searched line: its own continuation is unknown
+            self.pv = [move]
+        m = to_uci(move)
+
+        print(f"Best Move: {m} | Score: {sign * best_value} | depth {self.completed_depth}")
+        print(
+            f"nodes: {self.nodes}, cutoffs: {self.cutoffs}, fm_cuttoffs: {self.first_move_cutoffs}, fail high/low: {self.fail_highs}/{self.fail_lows}, null: {self.null_cutoffs}, tt: {self.tt_hits}, quiesce {self.quiesce_calls}")
+
+        return m
 
+    def search_aspiration(self, gen: MoveGenerator, moves: list[int], depth: int,
+                          previous: int | None) -> tuple[int, list[int], dict[int, int]] | None:
+        """
+        search_root in a window of aspiration_delta around the previous depth's score. A
+        fail widens the failing side by aspiration_growth until the score lands inside.
+        The first depth, mate scores and a disabled delta use the full window.
+        """
+        delta = self.aspiration_delta
+        if not delta or previous is None or abs(previous) > MATE_THRESHOLD:
+            return self.search_root(gen, moves, depth)
+
+        tie = 1 if self.random_ties else 0
+        alpha = previous - delta
+        beta = previous + delta
+        alpha_delta = beta_delta = delta
+        while True:
+            result = self.search_root(gen, moves, depth, alpha, beta)
+            if result is None:
+                return None
+            value, best_moves, _ = result
+            if value <= alpha - tie:
+                self.fail_lows += 1
+                alpha_delta *= self.aspiration_growth
+                alpha = value - alpha_delta if alpha_delta <= ASPIRATION_MAX_DELTA else -float("inf")
+            elif value >= beta:
+                self.fail_highs += 1
+                beta_delta *= self.aspiration_growth
+                beta = value + beta_delta if beta_delta <= ASPIRATION_MAX_DELTA else float("inf")
+                # the move that failed high is searched first next time
+                moves = best_moves[:1] + [m for m in moves if m != best_moves[0]]
             else:
-                if value < best_value:
-                    best_value = value
-                    best_moves = [m]
-                elif value == best_value:
-                    best_moves.append(m)
+                return result
 
-        m = to_uci(self._rng.choice(best_moves))
+    def search_root(self, gen: MoveGenerator, moves: list[int], depth: int,
+                    alpha: int = -float("inf"),
+                    beta: int = float("inf")) -> tuple[int, list[int], dict[int, int]] | None:
+        """
+        Search the root moves to depth within (alpha, beta), the first with the whole window
+        and the rest with null-window scouts, re-searched when they beat alpha. Scores are from
+        the side to move; the first move reaching beta ends the search.
+        Returns (best value, moves reaching it, root move -> score), None if the search was
+        stopped first. Scores of moves that fail low are bounds, good enough for ordering.
+        With random_ties the window is one point wider, so moves equal to the best come
+        back exact and are kept as well.
+        """
+        tie = 1 if self.random_ties else 0
+        best_value = -float("inf")
+        best_moves = []
+        scores = {}
+        self.pv_length[0] = 0
 
-        print(f"Best Move: {m} | Score: {best_value}")
-        print(
-            f"nodes: {self.nodes}, cutoffs: {self.cutoffs}, fm_cuttoffs: {self.first_move_cutoffs}, tt: {self.tt_hits}, quiesce {self.quiesce_calls}")
+        for i, m in enumerate(moves):
+            gen.apply(m)
+            if i == 0:
+                value = -self.negamax(gen, depth - 1, -beta, -(alpha - tie), 1)
+            else:
+                value = -self.negamax(gen, depth - 1, -(alpha - tie) - 1, -(alpha - tie), 1)
+                if alpha - tie < value < beta and not self.stopped:
+                    value = -self.negamax(gen, depth - 1, -beta, -(alpha - tie), 1)
+            gen.undo(m)
+            if self.stopped:
+                return None
+            scores[m] = value
+
+            if value > best_value:
+                best_value = value
+                best_moves = [m]
+                self.update_pv(0, m)
+            elif value == best_value and tie:
+                best_moves.append(m)
+            alpha = max(alpha, value)
+            if alpha >= beta:
+                break
 
-        return m
+        return best_value, best_moves, scores
 
-    def alphabeta(self, gen: MoveGenerator, depth: int, alpha: int, beta: int, maximizing: bool, ply: int) -> int:
+    def extend_pv(self, gen: MoveGenerator, pv: list[int], depth: int) -> list[int]:
+        """
+        Continue a line cut short by TT cutoffs with the hash moves stored below it, while
+        they are legal, up to depth moves. Re-searches after an aspiration fail cut it most.
+        """
+        played = []
+        for m in pv:
+            gen.apply(m)
+            played.append(m)
+        while len(played) < depth:
+            entry = self.tt.get_entry(gen.board.hash)
+            if entry is None or entry.move not in gen.legal_moves():
+                break
+            gen.apply(entry.move)
+            played.append(entry.move)
+        for m in reversed(played):
+            gen.undo(m)
+        return played
+
+    def update_pv(self, ply: int, move: int):
+        """Line at ply becomes move followed by the line just found one ply deeper."""
+        row = self.pv_table[ply]
+        child = self.pv_table[ply + 1]
+        length = self.pv_length[ply + 1]
+        row[ply] = move
+        row[ply + 1:length] = child[ply + 1:length]
+        self.pv_length[ply] = max(length, ply + 1)
+
+    def out_of_time(self, count: int) -> bool:
+        """
+        Stop check, reading the clock once every STOP_CHECK_NODES counted nodes.
+        Once it has fired, every node returns at once without touching the TT.
+        """
+        if not self.stopped and not count % STOP_CHECK_NODES and self.deadline is not None \
+                and time.perf_counter() >= self.deadline:
+            self.stopped = True
+        return self.stopped
+
+    def negamax(self, gen: MoveGenerator, depth: int, alpha: int, beta: int, ply: int,
+                allow_null: bool = True) -> int:
+        """
+        Principal variation search, scored from the side to move: the first move gets the
+        full window, the others a null window that is only re-searched when it beats alpha.
+        Null-window nodes first try passing the turn at reduced depth (see NULL_R) and return
+        beta if even that holds; never twice in a row, in check or with only pawns left.
+        """
         board = gen.board
         alpha_orig = alpha
-        beta_orig = beta
+        self.pv_length[ply] = ply
 
         # 1. TT PROBE
         tt_entry = self.tt.get_entry(board.hash)
@@ -99,93 +280,75 @@ class AlphaBeta(Engine):
                 return alpha if tt_entry.flag == TT_LOWER else beta
 
         self.nodes += 1
-        if depth == 0:
-            return self.quiesce(gen, alpha, beta, maximizing)
-
-        moves = gen.legal_moves()
-        if not moves:
-            if board.is_king_in_check:
-                return -MATE_SCORE + ply if maximizing else MATE_SCORE - ply
+        if self.out_of_time(self.nodes):
             return 0
+        if depth == 0:
+            return self.quiesce(gen, alpha, beta, ply)
+
+        if allow_null and self.null_move and depth >= NULL_MIN_DEPTH and beta - alpha == 1 \
+                and abs(beta) < MATE_THRESHOLD and not board.is_king_in_check \
+                and board.has_non_pawn_material(board.active_color):
+            stand_pat = self.evaluate_position(board)
+            if board.active_color != WHITE:
+                stand_pat = -stand_pat
+            if stand_pat >= beta:
+                r = NULL_R_DEEP if depth > NULL_R_DEPTH else NULL_R
+                gen.apply_null()
+                score = -self.negamax(gen, max(depth - 1 - r, 0), -beta, -beta + 1, ply + 1, False)
+                gen.undo_null()
+                if self.stopped:
+                    return 0
+                if score >= beta:
+                    self.null_cutoffs += 1
+                    return beta
 
         best_move_from_tt = tt_entry.move if tt_entry else None
-        if not best_move_from_tt in moves:
-            best_move_from_tt = None
-
-        # --- KILLER MOVE SCORING ---
-        scored_moves = []
-        for m in moves:
-            xy, nxy, flag = m
-            score = 0
-            if m == best_move_from_tt:
-                score = 10000
-            elif flag & FLAG_CAPTURE:
-                score = 1000 + (PIECE_VALUE_TABLE[gen.board.board[nxy] & 0x07] * 10) - PIECE_VALUE_TABLE[
-                    gen.board.board[xy] & 0x07]
-            # Check against the two killer slots for this ply
-            elif m == self.killers[ply][0]:
-                score = 900
-            elif m == self.killers[ply][1]:
-                score = 800
-
-            scored_moves.append((score, m))
-
-        scored_moves.sort(key=lambda x: x[0], reverse=True)
+        # hash move, captures, killers and quiets are produced lazily, best first
+        picker = gen.move_picker(best_move_from_tt, self.killers[ply], self.buffers.at(ply))
 
         best_move = None
+        value = -float('inf')
         i = -1
-        if maximizing:
-            value = -float('inf')
-            for _, m in scored_moves:  # Iterate over sorted moves
-                i += 1
-                gen.apply(m)
-                score = self.alphabeta(gen, depth - 1, alpha, beta, False, ply + 1)
-                gen.undo(m)
-
-                if score > value:
-                    value = score
-                    best_move = m
-
-                alpha = max(alpha, value)
-                if alpha >= beta:
-                    # --- RECORD KILLER MOVE ---
-                    _, _, flag = m
-                    if not (flag & FLAG_CAPTURE):
-                        if m != self.killers[ply][0]:
-                            self.killers[ply][1] = self.killers[ply][0]
-                            self.killers[ply][0] = m
-
-                    self.cutoffs += 1
-                    if i == 0: self.first_move_cutoffs += 1
-                    break
-        else:
-            value = float('inf')
-            for _, m in scored_moves:  # Iterate over sorted moves
-                i += 1
-                gen.apply(m)
-                score = self.alphabeta(gen, depth - 1, alpha, beta, True, ply + 1)
-                gen.undo(m)
-
-                if score < value:
-                    value = score
-                    best_move = m
-
-                beta = min(beta, value)
-                if beta <= alpha:
-                    # --- RECORD KILLER MOVE ---
-                    _, _, flag = m
-                    if not (flag & FLAG_CAPTURE):
-                        if m != self.killers[ply][0]:
-                            self.killers[ply][1] = self.killers[ply][0]
-                            self.killers[ply][0] = m
-
-                    self.cutoffs += 1
-                    if i == 0: self.first_move_cutoffs += 1
-                    break
+        for m in picker:
+            i += 1
+            gen.apply(m)
+            if i == 0:
+                score = -self.negamax(gen, depth - 1, -beta, -alpha, ply + 1)
+            else:
+                score = -self.negamax(gen, depth - 1, -alpha - 1, -alpha, ply + 1)
+                if alpha < score < beta and not self.stopped:
+                    score = -self.negamax(gen, depth - 1, -beta, -alpha, ply + 1)
+            gen.undo(m)
+            if self.stopped:
+                return 0
+
+            if score > value:
+                value = score
+                best_move = m
+                if score > alpha:
+                    alpha = score
+                    self.update_pv(ply, m)
+
+            if alpha >= beta:
+                # --- RECORD KILLER MOVE ---
+                if not m & MOVE_CAPTURE:
+                    if m != self.killers[ply][0]:
+                        self.killers[ply][1] = self.killers[ply][0]
+                        self.killers[ply][0] = m
+
+                self.cutoffs += 1
+                if i == 0: self.first_move_cutoffs += 1
+                break
+
+        if best_move is None:
+            # no legal move: the picker has set the check flag
+            if board.is_king_in_check:
+                return -MATE_SCORE + ply
+            return 0
 
         if value <= alpha_orig:
             flag = TT_UPPER
-        elif value >= beta_orig:
+        elif value >= beta:
             flag = TT_LOWER
         else:
             flag = TT_EXACT
@@ -194,55 +357,52 @@ class AlphaBeta(Engine):
         self.tt.store(board.hash, depth, stored_score, flag, best_move)
         return value
 
-    def quiesce(self, gen: MoveGenerator, alpha, beta, maximizing):
+    def quiesce(self, gen: MoveGenerator, alpha, beta, ply: int = 0):
         self.quiesce_calls += 1
-        stand_pat = self.evaluate_position(gen.board)
+        if self.out_of_time(self.quiesce_calls):
+            return 0
+        board = gen.board
+        stand_pat = self.evaluate_position(board)
+        if board.active_color != WHITE:
+            stand_pat = -stand_pat
 
-        if maximizing:
-            if stand_pat >= beta:
-                return beta
-            alpha = max(alpha, stand_pat)
+        if stand_pat >= beta:
+            return beta
+        alpha = max(alpha, stand_pat)
 
-            captures = gen.legal_captures()
-            scored_captures = []
-            for m in captures:
-                f, t, _ = m
-                score = (PIECE_VALUE_TABLE[gen.board.board[t] & 7] * 10) - PIECE_VALUE_TABLE[gen.board.board[f] & 7]
-                scored_captures.append((score, m))
-            scored_captures.sort(key=lambda x: x[0], reverse=True)
+        for m in self.quiesce_captures(gen, ply):
+            gen.apply(m)
+            score = -self.quiesce(gen, -beta, -alpha, ply + 1)
+            gen.undo(m)
 
-            for _, m in scored_captures:
-                gen.apply(m)
-                score = self.quiesce(gen, alpha, beta, False)  # Pass False for Black
-                gen.undo(m)
+            if score >= beta:
+                return beta
+            alpha = max(alpha, score)
+        return alpha
 
-                if score >= beta:
-                    return beta
-                alpha = max(alpha, score)
-            return alpha
-
-        else:  # Minimizing (Black)
-            if stand_pat <= alpha:
-                return alpha
-            beta = min(beta, stand_pat)
-
-            captures = gen.legal_captures()
-            scored_captures = []
-            for m in captures:
-                f, t, _ = m
-                score = (PIECE_VALUE_TABLE[gen.board.board[t] & 7] * 10) - PIECE_VALUE_TABLE[gen.board.board[f] & 7]
-                scored_captures.append((score, m))
-            scored_captures.sort(key=lambda x: x[0], reverse=True)
-
-            for _, m in scored_captures:
-                gen.apply(m)
-                score = self.quiesce(gen, alpha, beta, True)  # Pass True for White
-                gen.undo(m)
-
-                if score <= alpha:
-                    return alpha
-                beta = min(beta, score)
-            return beta
+    def quiesce_captures(self, gen: MoveGenerator, ply: int) -> Iterator[int]:
+        """
+        Captures worth searching in quiescence, selected one at a time by MVV-LVA from the
+        buffers of this ply; those losing material by static exchange are pruned.
+        """
+        board_items = gen.board
+        board = board_items.board
+        captures, scores = self.buffers.at(ply)
+        gen.legal_captures(captures)
+        for move in captures:
+            scores.append(capture_score(board, move))
+
+        count = len(captures)
+        for i in range(count):
+            best = i
+            for j in range(i + 1, count):
+                if scores[j] > scores[best]:
+                    best = j
+            if best != i:
+                captures[i], captures[best] = captures[best], captures[i]
+                scores[i], scores[best] = scores[best], scores[i]
+            if not is_bad_capture(board_items, captures[i]):
+                yield captures[i]
 
     def score_mate(self, score, ply):
         if score > MATE_THRESHOLD: return score + ply
@@ -262,8 +422,9 @@ class AlphaBeta(Engine):
         if move == tt_move:
             return 10000
 
-        from_sq, to_sq, flags = move
-        if flags & FLAG_CAPTURE:
+        from_sq = move & 63
+        to_sq = move >> 6 & 63
+        if move & MOVE_CAPTURE:
             captured_piece = board.board[to_sq]
             moving_piece = board.board[from_sq]
             return 1000 + (PIECE_VALUE_TABLE[captured_piece & 0x07] - PIECE_VALUE_TABLE[moving_piece & 0x07])
@@ -11,7 +11,7 @@ class TTEntry:
     depth: int
     score: int
     flag: int
-    move: tuple[int, int, int]
+    move: int
 
 
 class TranspositionTable:
@@ -22,8 +22,8 @@ class TranspositionTable:
         """Returns the full entry object if it exists, otherwise None."""
         return self.table.get(key)
 
-    def store(self, key: int, depth: int, score: int, flag: int, move: tuple[int, int, int]):
+    def store(self, key: int, depth: int, score: int, flag: int, move: int):
         # Always replace if the new search was deeper
         existing = self.table.get(key)
         if existing is None or depth >= existing.depth:
-            self.table[key] = TTEntry(score, depth, flag, move)
+            self.table[key] = TTEntry(depth, score, flag, move)
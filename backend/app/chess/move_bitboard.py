@@ -0,0 +1,656 @@
+from typing import Iterator, List
+
+from app.chess.board_bitboard import BoardBitboard, BB_ALL, BB_SQUARES, BB_FILE_A, BB_FILE_H, BB_RANK_3, \
+    BB_RANK_6, BB_PROMOTION, KNIGHT_ATTACKS, KING_ATTACKS, PAWN_ATTACKS, BETWEEN, LINE, rook_attacks, bishop_attacks
+from app.chess.move_flags import FLAG_CAPTURE, FLAG_CASTLE_K, FLAG_CASTLE_Q, FLAG_EN_PASSANT, FLAG_PROMO_B, \
+    FLAG_PROMO_N, FLAG_PROMO_R, FLAG_PROMOTION, MOVE_CAPTURE, MOVE_EN_PASSANT, MOVE_CASTLE_K, MOVE_CASTLE_Q, \
+    MOVE_PROMO_Q, MOVE_PROMOS, encode_move, decode_move
+from app.chess.static import PAWN, ROOK, BISHOP, KNIGHT, QUEEN, KING, WHITE, BLACK, COLOR, EMPTY, COMBINED_TABLE, \
+    CASTLING_KEEP_MASK
+from app.chess.zobrist import Z_PIECE, Z_SIDE, Z_CASTLING, Z_EP_FILE
+from app.chess.utils import from_uci_move, capture_score, is_bad_capture
+
+
+class MoveBitboardGenerator:
+    """
+    Generates legal moves for a BoardBitboard.
+    Legality comes from checkers and pins computed once per call, so no move
+    is applied and undone just to test it.
+    Same surface as MoveMailBoxGenerator.
+    """
+
+    def __init__(self, board: BoardBitboard, order: bool = False):
+        self._board = board
+
+    @property
+    def board(self) -> BoardBitboard:
+        return self._board
+
+    @board.setter
+    def board(self, new_board: BoardBitboard):
+        self._board = new_board
+
+    def legal_moves(self) -> List[int]:
+        """
+        Return a list of all legal moves for the current active color.
+        """
+        return self.generate_legal_moves(False)
+
+    def legal_captures(self, moves: List[int] | None = None) -> List[int]:
+        """
+        Legal captures, capture-promotions and queen promotions (quiescence search).
+        Appended to moves when a list is given.
+        """
+        return self.generate_legal_moves(True, moves)
+
+    def move_picker(self, tt_move: int | None = None, killers=(),
+                    buffers: tuple[List[int], List[int]] | None = None) -> Iterator[int]:
+        """
+        Legal moves in search order: hash move, captures and queen promotions by MVV-LVA,
+        killers, quiet moves, then captures losing material by static exchange.
+        Quiet moves are only generated when the search gets past the captures, or to
+        validate a quiet hash move. buffers are an empty (moves, scores) pair, see MoveBuffers.
+        """
+        captures, bad_captures = buffers if buffers is not None else ([], [])
+        self.generate_legal_moves(True, captures)
+        quiets = None
+        if tt_move is not None:
+            if tt_move in captures:
+                yield tt_move
+            else:
+                quiets = self.generate_quiet_moves()
+                if tt_move in quiets:
+                    yield tt_move
+                else:
+                    tt_move = None
+
+        board = self.board.board
+        captures.sort(key=lambda move: capture_score(board, move), reverse=True)
+        for move in captures:
+            if move != tt_move:
+                if is_bad_capture(self.board, move):
+                    bad_captures.append(move)
+                else:
+                    yield move
+
+        if quiets is None:
+            quiets = self.generate_quiet_moves()
+        tried_killers = []
+        for killer in killers:
+            if killer is not None and killer != tt_move and killer in quiets:
+                tried_killers.append(killer)
+                yield killer
+
+        for move in quiets:
+            if move != tt_move and move not in tried_killers:
+                yield move
+
+        yield from bad_captures
+
+    def generate_quiet_moves(self) -> List[int]:
+        return [m for m in self.generate_legal_moves(False) if not m & (MOVE_CAPTURE | MOVE_PROMO_Q)]
+
+    def generate_legal_moves(self, captures_only: bool, moves: List[int] | None = None) -> List[int]:
+        board_items = self.board
+        pieces = board_items.pieces
+        color = board_items.active_color
+        enemy = color ^ COLOR
+        us = board_items.occupancy[color]
+        them = board_items.occupancy[enemy]
+        occupied = us | them
+        king_sq = board_items.white_king if color == WHITE else board_items.black_king
+        attackers = board_items.attackers
+
+        if moves is None:
+            moves = []
+        append = moves.append
+
+        target_mask = them if captures_only else BB_ALL ^ us
+
+        # --- king moves (the king itself must not shadow a slider ray) ---
+        occupied_no_king = occupied ^ BB_SQUARES[king_sq]
+        targets = KING_ATTACKS[king_sq] & target_mask
+        while targets:
+            bit = targets & -targets
+            targets ^= bit
+            to_sq = bit.bit_length() - 1
+            if not attackers(to_sq, enemy, occupied_no_king):
+                append(king_sq | to_sq << 6 | (MOVE_CAPTURE if them & bit else 0))
+
+        checkers = attackers(king_sq, enemy, occupied)
+        if checkers & (checkers - 1):
+            # double check: only the king may move
+            return moves
+
+        if checkers:
+            check_mask = BETWEEN[king_sq][checkers.bit_length() - 1] | checkers
+        else:
+            check_mask = BB_ALL
+            if not captures_only:
+                self._generate_castling(color, enemy, occupied, append)
+
+        # --- absolute pins ---
+        pinned = 0
+        enemy_queens = pieces[enemy | QUEEN]
+        snipers = (
+                (rook_attacks(king_sq, them) & (pieces[enemy | ROOK] | enemy_queens))
+                | (bishop_attacks(king_sq, them) & (pieces[enemy | BISHOP] | enemy_queens))
+        )
+        while snipers:
+            bit = snipers & -snipers
+            snipers ^= bit
+            blockers = BETWEEN[king_sq][bit.bit_length() - 1] & occupied
+            if blockers and not (blockers & (blockers - 1)) and blockers & us:
+                pinned |= blockers
+
+        king_lines = LINE[king_sq]
+        target_mask &= check_mask
+
+        # --- knights (a pinned knight can never move) ---
+        bb = pieces[color | KNIGHT] & ~pinned
+        while bb:
+            bit = bb & -bb
+            bb ^= bit
+            from_sq = bit.bit_length() - 1
+            targets = KNIGHT_ATTACKS[from_sq] & target_mask
+            while targets:
+                to_bit = targets & -targets
+                targets ^= to_bit
+                append(from_sq | (to_bit.bit_length() - 1) << 6 | (MOVE_CAPTURE if them & to_bit else 0))
+
+        # --- sliders (queens are handled in both loops) ---
+        queens = pieces[color | QUEEN]
+        for bb, slider_attacks in (
+                (pieces[color | BISHOP] | queens, bishop_attacks),
+                (pieces[color | ROOK] | queens, rook_attacks),
+        ):
+            while bb:
+                bit = bb & -bb
+                bb ^= bit
+                from_sq = bit.bit_length() - 1
+                targets = slider_attacks(from_sq, occupied) & target_mask
+                if pinned & bit:
+                    targets &= king_lines[from_sq]
+                while targets:
+                    to_bit = targets & -targets
+                    targets ^= to_bit
+                    append(from_sq | (to_bit.bit_length() - 1) << 6 | (MOVE_CAPTURE if them & to_bit else 0))
+
+        # --- pawns (set-wise, origin recovered from the shift) ---
+        pawns = pieces[color | PAWN]
+        empty = BB_ALL ^ occupied
+        if color == WHITE:
+            single = (pawns << 8) & empty
+            pawn_sets = (
+                (single, 8, 0),
+                (((single & BB_RANK_3) << 8) & empty, 16, 0),
+                (((pawns & ~BB_FILE_A) << 7) & them, 7, MOVE_CAPTURE),
+                (((pawns & ~BB_FILE_H) << 9) & them, 9, MOVE_CAPTURE),
+            )
+        else:
+            single = (pawns >> 8) & empty
+            pawn_sets = (
+                (single, -8, 0),
+                (((single & BB_RANK_6) >> 8) & empty, -16, 0),
+                (((pawns & ~BB_FILE_A) >> 9) & them, -9, MOVE_CAPTURE),
+                (((pawns & ~BB_FILE_H) >> 7) & them, -7, MOVE_CAPTURE),
+            )
+
+        for targets, delta, flag in pawn_sets:
+            targets &= check_mask
+            if captures_only and not flag:
+                targets &= BB_PROMOTION
+            while targets:
+                to_bit = targets & -targets
+                targets ^= to_bit
+                to_sq = to_bit.bit_length() - 1
+                from_sq = to_sq - delta
+                if pinned & BB_SQUARES[from_sq] and not king_lines[from_sq] & to_bit:
+                    continue
+                move = from_sq | to_sq << 6 | flag
+                if to_bit & BB_PROMOTION:
+                    if captures_only and not flag:
+                        append(move | MOVE_PROMO_Q)
+                        continue
+                    for promo in MOVE_PROMOS:
+                        append(move | promo)
+                else:
+                    append(move)
+
+        # --- en passant: verified on the resulting occupancy (covers the horizontal pin) ---
+        ep = board_items.en_passant
+        if ep != -1:
+            captured_sq = ep - 8 if color == WHITE else ep + 8
+            captured_bit = BB_SQUARES[captured_sq]
+            if pieces[enemy | PAWN] & captured_bit:
+                candidates = PAWN_ATTACKS[enemy][ep] & pawns
+                while candidates:
+                    bit = candidates & -candidates
+                    candidates ^= bit
+                    after = (occupied ^ bit ^ captured_bit) | BB_SQUARES[ep]
+                    if not attackers(king_sq, enemy, after) & ~captured_bit:
+                        append(bit.bit_length() - 1 | ep << 6 | MOVE_CAPTURE | MOVE_EN_PASSANT)
+
+        return moves
+
+    def count_legal_moves(self) -> int:
+        """
+        Number of legal moves for the active color, counted from the target sets with
+        popcounts; no move is built except for the king, castling and en passant.
+        Same rules as generate_legal_moves.
+        """
+        board_items = self.board
+        pieces = board_items.pieces
+        color = board_items.active_color
+        enemy = color ^ COLOR
+        us = board_items.occupancy[color]
+        them = board_items.occupancy[enemy]
+        occupied = us | them
+        king_sq = board_items.white_king if color == WHITE else board_items.black_king
+        attackers = board_items.attackers
+        count = 0
+
+        # --- king moves ---
+        occupied_no_king = occupied ^ BB_SQUARES[king_sq]
+        targets = KING_ATTACKS[king_sq] & ~us
+        while targets:
+            bit = targets & -targets
+            targets ^= bit
+            if not attackers(bit.bit_length() - 1, enemy, occupied_no_king):
+                count += 1
+
+        checkers = attackers(king_sq, enemy, occupied)
+        if checkers & (checkers - 1):
+            return count
+
+        if checkers:
+            target_mask = (BETWEEN[king_sq][checkers.bit_length() - 1] | checkers) & ~us
+        else:
+            target_mask = BB_ALL ^ us
+            castling = []
+            self._generate_castling(color, enemy, occupied, castling.append)
+            count += len(castling)
+
+        # --- absolute pins ---
+        pinned = 0
+        enemy_queens = pieces[enemy | QUEEN]
+        snipers = (
+                (rook_attacks(king_sq, them) & (pieces[enemy | ROOK] | enemy_queens))
+                | (bishop_attacks(king_sq, them) & (pieces[enemy | BISHOP] | enemy_queens))
+        )
+        while snipers:
+            bit = snipers & -snipers
+            snipers ^= bit
+            blockers = BETWEEN[king_sq][bit.bit_length() - 1] & occupied
+            if blockers and not (blockers & (blockers - 1)) and blockers & us:
+                pinned |= blockers
+
+        king_lines = LINE[king_sq]
+
+        # --- knights ---
+        bb = pieces[color | KNIGHT] & ~pinned
+        while bb:
+            bit = bb & -bb
+            bb ^= bit
+            count += (KNIGHT_ATTACKS[bit.bit_length() - 1] & target_mask).bit_count()
+
+        # --- sliders ---
+        queens = pieces[color | QUEEN]
+        for bb, slider_attacks in (
+                (pieces[color | BISHOP] | queens, bishop_attacks),
+                (pieces[color | ROOK] | queens, rook_attacks),
+        ):
+            while bb:
+                bit = bb & -bb
+                bb ^= bit
+                from_sq = bit.bit_length() - 1
+                targets = slider_attacks(from_sq, occupied) & target_mask
+                if pinned & bit:
+                    targets &= king_lines[from_sq]
+                count += targets.bit_count()
+
+        # --- pawns: free ones set-wise, pinned ones one target at a time ---
+        empty = BB_ALL ^ occupied
+        for pawns in (pieces[color | PAWN] & ~pinned, pieces[color | PAWN] & pinned):
+            if not pawns:
+                continue
+            if color == WHITE:
+                single = (pawns << 8) & empty
+                pawn_sets = (
+                    (single, 8),
+                    (((single & BB_RANK_3) << 8) & empty, 16),
+                    (((pawns & ~BB_FILE_A) << 7) & them, 7),
+                    (((pawns & ~BB_FILE_H) << 9) & them, 9),
+                )
+            else:
+                single = (pawns >> 8) & empty
+                pawn_sets = (
+                    (single, -8),
+                    (((single & BB_RANK_6) >> 8) & empty, -16),
+                    (((pawns & ~BB_FILE_A) >> 9) & them, -9),
+                    (((pawns & ~BB_FILE_H) >> 7) & them, -7),
+                )
+            for targets, delta in pawn_sets:
+                targets &= target_mask
+                if pawns & pinned:
+                    while targets:
+                        to_bit = targets & -targets
+                        targets ^= to_bit
+                        if king_lines[to_bit.bit_length() - 1 - delta] & to_bit:
+                            count += 4 if to_bit & BB_PROMOTION else 1
+                else:
+                    count += (targets & ~BB_PROMOTION).bit_count() + 4 * (targets & BB_PROMOTION).bit_count()
+
+        # --- en passant ---
+        ep = board_items.en_passant
+        if ep != -1:
+            captured_sq = ep - 8 if color == WHITE else ep + 8
+            captured_bit = BB_SQUARES[captured_sq]
+            if pieces[enemy | PAWN] & captured_bit:
+                candidates = PAWN_ATTACKS[enemy][ep] & pieces[color | PAWN]
+                while candidates:
+                    bit = candidates & -candidates
+                    candidates ^= bit
+                    after = (occupied ^ bit ^ captured_bit) | BB_SQUARES[ep]
+                    if not attackers(king_sq, enemy, after) & ~captured_bit:
+                        count += 1
+
+        return count
+
+    def _generate_castling(self, color: int, enemy: int, occupied: int, append):
+        board_items = self.board
+        rights = board_items.castling_rights
+        if color == WHITE:
+            if not rights & 3 or board_items.white_king != 4:
+                return
+            rooks = board_items.pieces[WHITE | ROOK]
+            base = 0
+            king_side, queen_side = rights & 1, rights & 2
+        else:
+            if not rights & 12 or board_items.black_king != 60:
+                return
+            rooks = board_items.pieces[BLACK | ROOK]
+            base = 56
+            king_side, queen_side = rights & 4, rights & 8
+
+        attackers = board_items.attackers
+        if king_side and rooks & BB_SQUARES[base + 7] and not occupied & (0x60 << base):
+            if not attackers(base + 5, enemy, occupied) and not attackers(base + 6, enemy, occupied):
+                append(base + 4 | (base + 6) << 6 | MOVE_CASTLE_K)
+        if queen_side and rooks & BB_SQUARES[base] and not occupied & (0x0E << base):
+            if not attackers(base + 3, enemy, occupied) and not attackers(base + 2, enemy, occupied):
+                append(base + 4 | (base + 2) << 6 | MOVE_CASTLE_Q)
+
+    def apply_uci(self, uci: str):
+        from_sq, to_sq, flags = decode_move(from_uci_move(uci))
+        piece = self.board.board[from_sq]
+
+        # capture
+        if self.board.board[to_sq] != EMPTY:
+            flags |= FLAG_CAPTURE
+
+        # en passant
+        elif (piece & PAWN) and self.board.en_passant == to_sq:
+            flags |= FLAG_CAPTURE | FLAG_EN_PASSANT
+
+        # castling
+        if piece & KING and abs((from_sq % 8) - (to_sq % 8)) == 2:
+            if to_sq % 8 == 6:
+                flags |= FLAG_CASTLE_K
+            else:
+                flags |= FLAG_CASTLE_Q
+
+        return self.apply(encode_move(from_sq, to_sq, flags))
+
+    def apply(self, move: int):
+        board_items = self.board
+        board = board_items.board
+        pieces = board_items.pieces
+        occupancy = board_items.occupancy
+        from_sq = move & 63
+        to_sq = move >> 6 & 63
+        flags = move >> 12
+
+        piece = board[from_sq]
+        color = piece & COLOR
+        captured_piece = EMPTY
+        captured_sq = None
+        rook_from = rook_to = None
+
+        # --- SAVE OLD STATE ---
+        old_castling = board_items.castling_rights
+        old_hash = board_items.hash
+        old_en_passant = board_items.en_passant
+        old_halfmove_clock = board_items.halfmove_clock
+        old_score = board_items.score
+
+        hash = old_hash
+        score = old_score
+
+        # --- REMOVE OLD EN PASSANT HASH ---
+        if old_en_passant != -1:
+            hash ^= Z_EP_FILE[old_en_passant & 7]
+        board_items.en_passant = -1
+
+        # --- HALF MOVE CLOCK ---
+        if piece & PAWN:
+            board_items.halfmove_clock = 0
+        else:
+            board_items.halfmove_clock += 1
+
+        # --- CAPTURE ---
+        if flags & FLAG_EN_PASSANT:
+            captured_sq = (from_sq & ~7) + (to_sq & 7)
+        elif flags & FLAG_CAPTURE:
+            captured_sq = to_sq
+
+        if captured_sq is not None:
+            captured_piece = board[captured_sq]
+            captured_bit = BB_SQUARES[captured_sq]
+            board[captured_sq] = EMPTY
+            pieces[captured_piece] ^= captured_bit
+            occupancy[captured_piece & COLOR] ^= captured_bit
+            hash ^= Z_PIECE[captured_piece][captured_sq]
+            score -= COMBINED_TABLE[captured_piece][captured_sq]
+            board_items.halfmove_clock = 0
+
+        # --- MOVE PIECE ---
+        to_bit = BB_SQUARES[to_sq]
+        move_bits = BB_SQUARES[from_sq] | to_bit
+        board[from_sq] = EMPTY
+        board[to_sq] = piece
+        pieces[piece] ^= move_bits
+        occupancy[color] ^= move_bits
+        hash ^= Z_PIECE[piece][from_sq] ^ Z_PIECE[piece][to_sq]
+        score += COMBINED_TABLE[piece][to_sq] - COMBINED_TABLE[piece][from_sq]
+
+        # --- UPDATE KING POSITION ---
+        if piece & KING:
+            if color == WHITE:
+                board_items.white_king = to_sq
+            else:
+                board_items.black_king = to_sq
+
+        # --- PROMOTION ---
+        if flags & FLAG_PROMOTION:
+            if flags & FLAG_PROMO_N:
+                promo_piece = KNIGHT | color
+            elif flags & FLAG_PROMO_B:
+                promo_piece = BISHOP | color
+            elif flags & FLAG_PROMO_R:
+                promo_piece = ROOK | color
+            else:
+                promo_piece = QUEEN | color
+
+            board[to_sq] = promo_piece
+            pieces[piece] ^= to_bit
+            pieces[promo_piece] ^= to_bit
+            hash ^= Z_PIECE[piece][to_sq] ^ Z_PIECE[promo_piece][to_sq]
+            score += COMBINED_TABLE[promo_piece][to_sq] - COMBINED_TABLE[piece][to_sq]
+
+        # --- CASTLING ---
+        if flags & FLAG_CASTLE_K:
+            rook_from = to_sq + 1
+            rook_to = to_sq - 1
+        elif flags & FLAG_CASTLE_Q:
+            rook_from = to_sq - 2
+            rook_to = to_sq + 1
+
+        if rook_from is not None:
+            rook = board[rook_from]
+            rook_bits = BB_SQUARES[rook_from] | BB_SQUARES[rook_to]
+            board[rook_from] = EMPTY
+            board[rook_to] = rook
+            pieces[rook] ^= rook_bits
+            occupancy[color] ^= rook_bits
+            hash ^= Z_PIECE[rook][rook_from] ^ Z_PIECE[rook][rook_to]
+            score += COMBINED_TABLE[rook][rook_to] - COMBINED_TABLE[rook][rook_from]
+
+        # --- CASTLING RIGHTS ---
+        new_rights = old_castling & CASTLING_KEEP_MASK[from_sq] & CASTLING_KEEP_MASK[to_sq]
+        if old_castling != new_rights:
+            hash ^= Z_CASTLING[old_castling] ^ Z_CASTLING[new_rights]
+            board_items.castling_rights = new_rights
+
+        # --- EN PASSANT CREATION ---
+        if piece & PAWN and abs(from_sq - to_sq) == 16:
+            ep_target = (from_sq + to_sq) // 2
+            board_items.en_passant = ep_target
+            hash ^= Z_EP_FILE[ep_target & 7]
+
+        # --- SIDE TO MOVE ---
+        board_items.active_color = color ^ COLOR
+        hash ^= Z_SIDE
+
+        # --- REPETITION COUNT ---
+        board_items.position_counts[hash] = board_items.position_counts.get(hash, 0) + 1
+
+        board_items.hash = hash
+        board_items.score = score
+        # --- SAVE UNDO INFO ---
+        board_items.undo_stack.append((
+            captured_piece,
+            captured_sq,
+            piece,
+            rook_from,
+            rook_to,
+            old_castling,
+            old_en_passant,
+            old_halfmove_clock,
+            old_hash,
+            old_score
+        ))
+        return move
+
+    def undo(self, move: int):
+        board_items = self.board
+        board = board_items.board
+        pieces = board_items.pieces
+        occupancy = board_items.occupancy
+        from_sq = move & 63
+        to_sq = move >> 6 & 63
+        flags = move >> 12
+
+        (
+            captured_piece,
+            captured_sq,
+            moved_piece,
+            rook_from,
+            rook_to,
+            old_castling,
+            old_en_passant,
+            old_halfmove,
+            old_hash,
+            old_score
+        ) = board_items.undo_stack.pop()
+
+        # Revert repetition counter (the key is the hash we are leaving)
+        counts = board_items.position_counts
+        current_hash = board_items.hash
+        if counts.get(current_hash):
+            counts[current_hash] -= 1
+            if not counts[current_hash]:
+                del counts[current_hash]
+
+        color = moved_piece & COLOR
+
+        # Restore moved piece (a promoted piece turns back into the pawn)
+        to_bit = BB_SQUARES[to_sq]
+        pieces[board[to_sq]] ^= to_bit
+        pieces[moved_piece] ^= BB_SQUARES[from_sq]
+        occupancy[color] ^= BB_SQUARES[from_sq] | to_bit
+        board[to_sq] = EMPTY
+        board[from_sq] = moved_piece
+
+        # Restore king position
+        if moved_piece & KING:
+            if color == WHITE:
+                board_items.white_king = from_sq
+            else:
+                board_items.black_king = from_sq
+
+        # Restore captured piece
+        if captured_sq is not None:
+            captured_bit = BB_SQUARES[captured_sq]
+            board[captured_sq] = captured_piece
+            pieces[captured_piece] ^= captured_bit
+            occupancy[captured_piece & COLOR] ^= captured_bit
+
+        # Undo castling rook
+        if rook_from is not None:
+            rook = board[rook_to]
+            rook_bits = BB_SQUARES[rook_from] | BB_SQUARES[rook_to]
+            board[rook_from] = rook
+            board[rook_to] = EMPTY
+            pieces[rook] ^= rook_bits
+            occupancy[color] ^= rook_bits
+
+        # Restore metadata
+        board_items.castling_rights = old_castling
+        board_items.en_passant = old_en_passant
+        board_items.halfmove_clock = old_halfmove
+        board_items.active_color = color
+        board_items.hash = old_hash
+        board_items.score = old_score
+
+    def apply_null(self):
+        """
+        Pass the turn (null-move pruning). Pushes an undo entry without pieces and leaves the
+        repetition counts alone.
+        """
+        board_items = self.board
+        old_en_passant = board_items.en_passant
+        hash = board_items.hash
+        board_items.undo_stack.append((
+            EMPTY,
+            None,
+            EMPTY,
+            None,
+            None,
+            board_items.castling_rights,
+            old_en_passant,
+            board_items.halfmove_clock,
+            hash,
+            board_items.score
+        ))
+
+        if old_en_passant != -1:
+            hash ^= Z_EP_FILE[old_en_passant & 7]
+            board_items.en_passant = -1
+        board_items.halfmove_clock = 0
+        board_items.active_color ^= COLOR
+        board_items.hash = hash ^ Z_SIDE
+
+    def undo_null(self):
+        board_items = self.board
+        _, _, _, _, _, _, old_en_passant, old_halfmove, old_hash, _ = board_items.undo_stack.pop()
+        board_items.en_passant = old_en_passant
+        board_items.halfmove_clock = old_halfmove
+        board_items.active_color ^= COLOR
+        board_items.hash = old_hash
+
+    def gives_check(self, move: int):
+        self.apply(move)
+        ret = self.board.is_king_in_check
+        self.undo(move)
+        return ret
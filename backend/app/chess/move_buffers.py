@@ -0,0 +1,26 @@
+from typing import List
+
+DEFAULT_BUFFER_PLIES = 128
+
+
+class MoveBuffers:
+    """
+    One move list and one score list per search ply, cleared and refilled at every node
+    instead of allocated. A node only touches the lists of its own ply, so they stay
+    valid while its children search with the lists of the next one.
+    """
+
+    def __init__(self, plies: int = DEFAULT_BUFFER_PLIES):
+        self.moves: List[List[int]] = [[] for _ in range(plies)]
+        self.scores: List[List[int]] = [[] for _ in range(plies)]
+
+    def at(self, ply: int) -> tuple[List[int], List[int]]:
+        if ply >= len(self.moves):
+            grow = ply + 1 - len(self.moves)
+            self.moves.extend([] for _ in range(grow))
+            self.scores.extend([] for _ in range(grow))
+        moves = self.moves[ply]
+        scores = self.scores[ply]
+        moves.clear()
+        scores.clear()
+        return moves, scores
@@ -0,0 +1,69 @@
+from collections import OrderedDict
+from threading import Lock
+from typing import List
+
+DEFAULT_MOVE_CACHE_ENTRIES = 32_768
+
+
+class MoveCache:
+    """
+    Size-bounded LRU cache of legal move lists, shared by all generators of a backend.
+    Entries are looked up by zobrist hash and verified against the full position key,
+    so a hash collision is a miss instead of another position's moves.
+    Every access takes the lock: API handlers run in a threadpool.
+    """
+
+    def __init__(self, max_entries: int = DEFAULT_MOVE_CACHE_ENTRIES):
+        self._entries: OrderedDict[int, tuple[bytes, List[int]]] = OrderedDict()
+        self._lock = Lock()
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: int, position: bytes) -> List[int] | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] != position:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key: int, position: bytes, moves: List[int]):
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (position, moves)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def resize(self, max_entries: int):
+        with self._lock:
+            self.max_entries = max_entries
+            while len(self._entries) > max(max_entries, 0):
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+            self.evictions = 0
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
@@ -27,3 +27,43 @@ FLAG_PROMOTION = (
         FLAG_PROMO_B |
         FLAG_PROMO_N
 )
+
+# ─────────────────────────────────────────────
+# Packed move: from | to << 6 | flags << 12
+# ─────────────────────────────────────────────
+# a move is a plain int: equality is one compare and nothing is allocated
+
+MOVE_TO_SHIFT = 6
+MOVE_FLAGS_SHIFT = 12
+MOVE_SQUARE_MASK = 0x3F
+
+# flags already shifted into place, for the generators
+MOVE_CAPTURE = FLAG_CAPTURE << MOVE_FLAGS_SHIFT
+MOVE_EN_PASSANT = FLAG_EN_PASSANT << MOVE_FLAGS_SHIFT
+MOVE_CASTLE_K = FLAG_CASTLE_K << MOVE_FLAGS_SHIFT
+MOVE_CASTLE_Q = FLAG_CASTLE_Q << MOVE_FLAGS_SHIFT
+MOVE_PROMO_Q = FLAG_PROMO_Q << MOVE_FLAGS_SHIFT
+MOVE_PROMOTION = FLAG_PROMOTION << MOVE_FLAGS_SHIFT
+
+# generation order of promotions (queen last, matching the bitboard generator)
+MOVE_PROMOS = tuple(flag << MOVE_FLAGS_SHIFT for flag in (FLAG_PROMO_R, FLAG_PROMO_N, FLAG_PROMO_B, FLAG_PROMO_Q))
+
+
+def encode_move(from_sq: int, to_sq: int, flags: int = FLAG_NONE) -> int:
+    return from_sq | to_sq << MOVE_TO_SHIFT | flags << MOVE_FLAGS_SHIFT
+
+
+def decode_move(move: int) -> tuple[int, int, int]:
+    return move & MOVE_SQUARE_MASK, move >> MOVE_TO_SHIFT & MOVE_SQUARE_MASK, move >> MOVE_FLAGS_SHIFT
+
+
+def move_from(move: int) -> int:
+    return move & MOVE_SQUARE_MASK
+
+
+def move_to(move: int) -> int:
+    return move >> MOVE_TO_SHIFT & MOVE_SQUARE_MASK
+
+
+def move_flags(move: int) -> int:
+    return move >> MOVE_FLAGS_SHIFT
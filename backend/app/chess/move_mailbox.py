@@ -1,22 +1,23 @@
-from typing import List
-from app.chess.static import KING_OFFSETS, KNIGHT_OFFSETS, CASTLE_OFFSETS, ROOK_DIRS, BISHOP_DIRS, \
-    QUEEN_DIRS
-from app.chess.static import PAWN_OFFSETS_MAILBOX as PAWN_OFFSETS
+from typing import Iterator, List
+from app.chess.static import KNIGHT_TARGETS, KING_TARGETS, PAWN_CAPTURE_TARGETS, ROOK_RAYS, BISHOP_RAYS, QUEEN_RAYS, \
+    CASTLE_WK, CASTLE_WQ, CASTLE_BK, CASTLE_BQ, LINE_SLIDERS, SQUARES_BETWEEN
 from app.chess.board_mailbox import BoardMailbox, Z_CASTLING, Z_EP_FILE, Z_PIECE, Z_SIDE
-from app.chess.move_flags import FLAG_CAPTURE, FLAG_CASTLE_K, FLAG_CASTLE_Q, FLAG_EN_PASSANT, FLAG_NONE, FLAG_PROMO_B, \
-    FLAG_PROMO_N, FLAG_PROMO_Q, FLAG_PROMO_R, FLAG_PROMOTION
+from app.chess.move_cache import MoveCache
+from app.chess.move_flags import FLAG_CAPTURE, FLAG_CASTLE_K, FLAG_CASTLE_Q, FLAG_EN_PASSANT, FLAG_PROMO_B, \
+    FLAG_PROMO_N, FLAG_PROMO_R, FLAG_PROMOTION, MOVE_CAPTURE, MOVE_EN_PASSANT, MOVE_CASTLE_K, MOVE_CASTLE_Q, \
+    MOVE_PROMO_Q, MOVE_PROMOS, encode_move, decode_move
 from app.chess.static import PAWN, ROOK, BISHOP, KNIGHT, QUEEN, KING, WHITE, BLACK, PIECE, COLOR, EMPTY, COMBINED_TABLE, \
-    CASTLE_OFFSETS, CASTLING_KEEP_MASK
-from app.chess.utils import rank_x, file_y, from_uci_move
-from app.chess.utils import to_uci
+    CASTLING_KEEP_MASK, ROOK_SLIDERS, BISHOP_SLIDERS
+from app.chess.utils import from_uci_move
+from app.chess.utils import to_uci, capture_score, is_bad_capture, promotion_piece, BAD_CAPTURE
 
 
 class MoveMailBoxGenerator:
     """
     Generates all legal moves for a given BoardArray.
     """
-    # key= zobist, value= move
-    _moves_cache: dict[int, List[tuple[int, int, int]]] = {}
+    # key= zobrist, verified against the position key; shared by all instances
+    _moves_cache = MoveCache()
 
     def __init__(self, board: BoardMailbox, order: bool = False):
         self._board = board
@@ -29,38 +30,584 @@ class MoveMailBoxGenerator:
     def board(self, new_board: BoardMailbox):
         self._board = new_board
 
-    def legal_moves(self) -> List[tuple[int, int, int]]:
+    def legal_moves(self) -> List[int]:
         """
         Return a list of all legal moves for the current active color.
         """
-        if self.board.hash in MoveMailBoxGenerator._moves_cache:
-            return MoveMailBoxGenerator._moves_cache[self.board.hash]
-        board = self.board
-        color = board.active_color
+        position = self.board.position_key()
+        legal_moves = MoveMailBoxGenerator._moves_cache.get(self.board.hash, position)
+        if legal_moves is not None:
+            return legal_moves
+
+        legal_moves = self.generate_legal_moves(self.board.active_color)
+        MoveMailBoxGenerator._moves_cache.put(self.board.hash, position, legal_moves)
+        return legal_moves
+
+    def generate_legal_moves(self, color: int) -> List[int]:
+        """
+        Legal moves without make/unmake filtering.
+        Checkers and absolute pins are computed once from the king; pinned pieces
+        stay on their pin ray, in check only evasions are kept and in double
+        check only the king moves.
+        """
+        board_items = self.board
+        board = board_items.board
+        enemy = color ^ COLOR
+        king_sq = board_items.find_king(color)
+        enemy_king = board_items.find_king(enemy)
+
+        checkers, evasions, pins = self.checks_and_pins(color, king_sq)
+        if color == board_items.active_color:
+            board_items.is_king_in_check = 1 if checkers else 0
+
+        moves: List[int] = []
+        self.generate_king_moves(king_sq, color, enemy_king, checkers, moves)
+        if checkers > 1:
+            return moves
+
+        legal = (king_sq, enemy, checkers, evasions, pins)
+        if checkers:
+            self.generate_evasions(legal, moves)
+            return moves
+
+        for sq_from in board_items.piece_squares[color]:
+            piece = board[sq_from]
+            if piece & KING:
+                continue
+
+            start = len(moves)
+            self.generate_piece_moves(sq_from, piece, enemy_king, moves)
+            self.keep_legal(moves, start, sq_from, piece, legal)
+
+        return moves
+
+    def count_legal_moves(self) -> int:
+        """
+        Number of legal moves for the active color.
+        Pieces that are not pinned, not asked to answer a check and cannot capture en passant
+        are counted from their target squares without building moves; the king and the
+        restricted pieces go through the same filters as generate_legal_moves.
+        """
+        board_items = self.board
+        cached = MoveMailBoxGenerator._moves_cache.get(board_items.hash, board_items.position_key())
+        if cached is not None:
+            return len(cached)
+
+        board = board_items.board
+        color = board_items.active_color
+        enemy = color ^ COLOR
+        king_sq = board_items.find_king(color)
+        enemy_king = board_items.find_king(enemy)
+
+        checkers, evasions, pins = self.checks_and_pins(color, king_sq)
+        board_items.is_king_in_check = 1 if checkers else 0
+
+        moves: List[int] = []
+        self.generate_king_moves(king_sq, color, enemy_king, checkers, moves)
+        if checkers > 1:
+            return len(moves)
+
+        legal = (king_sq, enemy, checkers, evasions, pins)
+        if checkers:
+            self.generate_evasions(legal, moves)
+            return len(moves)
+
+        count = 0
+        en_passant = board_items.en_passant != -1
+        for sq_from in board_items.piece_squares[color]:
+            piece = board[sq_from]
+            if piece & KING:
+                continue
+            if sq_from in pins or (en_passant and piece & PAWN):
+                start = len(moves)
+                self.generate_piece_moves(sq_from, piece, enemy_king, moves)
+                self.keep_legal(moves, start, sq_from, piece, legal)
+            else:
+                count += self.count_piece_moves(sq_from, piece)
+
+        return count + len(moves)
+
+    def count_piece_moves(self, sq_from: int, piece: int) -> int:
+        """
+        Number of pseudo-legal moves of a non-king piece on sq_from, en passant excluded.
+        """
         board = self.board.board
-        enemy_king = self.board.find_king(WHITE if color == BLACK else BLACK)
+        color = piece & COLOR
+        ptype = piece & PIECE
+        count = 0
+
+        if ptype == KNIGHT:
+            for sq_to in KNIGHT_TARGETS[sq_from]:
+                if not board[sq_to] & color:
+                    count += 1
+
+        elif ptype == PAWN:
+            if color == WHITE:
+                sq_to = sq_from + 8
+                per_move = 4 if sq_to >= 56 else 1
+                is_start = sq_from < 16
+            else:
+                sq_to = sq_from - 8
+                per_move = 4 if sq_to < 8 else 1
+                is_start = sq_from >= 48
+            if not board[sq_to]:
+                count += per_move
+                if is_start and not board[sq_to + sq_to - sq_from]:
+                    count += 1
+            for sq_to in PAWN_CAPTURE_TARGETS[color][sq_from]:
+                target = board[sq_to]
+                if target and not target & color:
+                    count += per_move
+
+        else:
+            if ptype == ROOK:
+                rays = ROOK_RAYS[sq_from]
+            elif ptype == BISHOP:
+                rays = BISHOP_RAYS[sq_from]
+            else:
+                rays = QUEEN_RAYS[sq_from]
+            for ray in rays:
+                for sq_to in ray:
+                    target = board[sq_to]
+                    if target:
+                        if not target & color:
+                            count += 1
+                        break
+                    count += 1
+
+        return count
 
-        pseudo_legal_moves = self.generate_pseudo_legal_moves(color, enemy_king)
+    def generate_evasions(self, legal: tuple, moves: List[int]):
+        """
+        Non-king answers to a single check, appended to moves: captures of the checker and
+        interpositions on the checking ray, tested per piece against the evasion squares.
+        Pinned pieces never qualify, their pin line meets the check line only on the king.
+        """
+        board_items = self.board
+        board = board_items.board
+        king_sq, enemy, _, evasions, pins = legal
+        color = enemy ^ COLOR
 
-        # filter out moves that leave own king in check
-        king_was_checked = self.board.is_king_in_check
-        scored_moves = []
-        for move in pseudo_legal_moves:
-            xy, nxy, flags = move
-            if king_was_checked and ((flags & FLAG_CASTLE_Q) or (flags & FLAG_CASTLE_Q)):
+        for sq_from in board_items.piece_squares[color]:
+            if sq_from in pins:
                 continue
-            self.apply(move)
-            if not self.board.is_other_king_in_check:
-                candidate = self.board.is_king_in_check
-                scored_moves.append((move, candidate))
-            self.undo(move)
-
-        legal_moves = [m for m, _ in scored_moves]
-        MoveMailBoxGenerator._moves_cache[self.board.hash] = legal_moves
-        return legal_moves
+            piece = board[sq_from]
+            ptype = piece & PIECE
+
+            # --- knights ---
+            if ptype == KNIGHT:
+                for sq_to in KNIGHT_TARGETS[sq_from]:
+                    if sq_to in evasions:
+                        moves.append(sq_from | sq_to << 6 | (MOVE_CAPTURE if board[sq_to] else 0))
+
+            # --- pawns ---
+            elif ptype == PAWN:
+                if color == WHITE:
+                    sq_to = sq_from + 8
+                    is_promo = sq_to >= 56
+                    is_start = sq_from < 16
+                else:
+                    sq_to = sq_from - 8
+                    is_promo = sq_to < 8
+                    is_start = sq_from >= 48
+                targets = []
+                if not board[sq_to]:
+                    if sq_to in evasions:
+                        targets.append(sq_to)
+                    elif is_start:
+                        sq_to2 = sq_to + sq_to - sq_from
+                        if sq_to2 in evasions and not board[sq_to2]:
+                            targets.append(sq_to2)
+                for sq_to in PAWN_CAPTURE_TARGETS[color][sq_from]:
+                    if sq_to in evasions and board[sq_to]:
+                        targets.append(sq_to)
+                for sq_to in targets:
+                    move = sq_from | sq_to << 6 | (MOVE_CAPTURE if board[sq_to] else 0)
+                    if is_promo:
+                        for promo in MOVE_PROMOS:
+                            moves.append(move | promo)
+                    else:
+                        moves.append(move)
+
+            # --- sliders ---
+            elif ptype != KING:
+                line_sliders = LINE_SLIDERS[sq_from]
+                between = SQUARES_BETWEEN[sq_from]
+                for sq_to in evasions:
+                    if line_sliders[sq_to] & ptype:
+                        for sq in between[sq_to]:
+                            if board[sq]:
+                                break
+                        else:
+                            moves.append(sq_from | sq_to << 6 | (MOVE_CAPTURE if board[sq_to] else 0))
+
+        # --- en passant: takes a double-pushed checker or lands on the ray ---
+        en_passant = board_items.en_passant
+        if en_passant != -1:
+            pawn = PAWN | color
+            for sq_from in PAWN_CAPTURE_TARGETS[enemy][en_passant]:
+                if board[sq_from] == pawn:
+                    move = sq_from | en_passant << 6 | MOVE_CAPTURE | MOVE_EN_PASSANT
+                    if self.is_en_passant_legal(move, king_sq, enemy):
+                        moves.append(move)
+
+    def keep_legal(self, moves: List[int], start: int, sq_from: int, piece: int, legal: tuple):
+        """
+        Drop the illegal ones among moves[start:], all made by the non-king piece on sq_from.
+        legal is (king_sq, enemy, checkers, evasions, pins) of the side to move.
+        """
+        king_sq, enemy, checkers, evasions, pins = legal
+        allowed = pins.get(sq_from)
+        if checkers:
+            allowed = evasions if allowed is None else allowed & evasions
+        if allowed is None and not (piece & PAWN and self.board.en_passant != -1):
+            return
+
+        piece_moves = moves[start:]
+        del moves[start:]
+        for move in piece_moves:
+            if move & MOVE_EN_PASSANT:
+                # the only move that clears two squares of one rank: test it on the board
+                if self.is_en_passant_legal(move, king_sq, enemy):
+                    moves.append(move)
+            elif allowed is None or move >> 6 & 63 in allowed:
+                moves.append(move)
+
+    def move_picker(self, tt_move: int | None = None, killers=(),
+                    buffers: tuple[List[int], List[int]] | None = None) -> Iterator[int]:
+        """
+        Legal moves of the side to move in search order: hash move, captures and queen
+        promotions by MVV-LVA, killers, the remaining quiet moves, then the captures that
+        lose material by static exchange.
+        Each stage is generated only when the previous one is exhausted, so a cutoff
+        on the hash move or a capture never generates the quiet moves.
+        The board must be back in the same position whenever the next move is requested.
+        buffers are an empty (moves, scores) pair the captures are held in, see MoveBuffers.
+        """
+        # --- hash move, validated on its own squares ---
+        if tt_move is not None and self.is_pseudo_legal(tt_move) and self.is_legal(tt_move):
+            yield tt_move
+        else:
+            tt_move = None
+
+        board_items = self.board
+        board = board_items.board
+        color = board_items.active_color
+        enemy = color ^ COLOR
+        king_sq = board_items.find_king(color)
+        checkers, evasions, pins = self.checks_and_pins(color, king_sq)
+        board_items.is_king_in_check = 1 if checkers else 0
+        legal = (king_sq, enemy, checkers, evasions, pins)
+
+        # --- captures and queen promotions, selected one at a time ---
+        captures, scores = buffers if buffers is not None else ([], [])
+        self.generate_legal_captures(legal, captures)
+        for move in captures:
+            scores.append(capture_score(board, move))
+        count = len(captures)
+        for i in range(count):
+            best = i
+            for j in range(i + 1, count):
+                if scores[j] > scores[best]:
+                    best = j
+            if best != i:
+                captures[i], captures[best] = captures[best], captures[i]
+                scores[i], scores[best] = scores[best], scores[i]
+            move = captures[i]
+            if move != tt_move:
+                if is_bad_capture(board_items, move):
+                    scores[i] = BAD_CAPTURE  # left in place, searched after the quiet moves
+                else:
+                    yield move
+
+        # --- killers ---
+        tried_killers = []
+        for killer in killers:
+            if killer is None or killer == tt_move or killer & (MOVE_CAPTURE | MOVE_PROMO_Q):
+                continue
+            if self.is_pseudo_legal(killer) and self.is_legal(killer):
+                tried_killers.append(killer)
+                yield killer
+
+        # --- quiet moves ---
+        for move in self.legal_moves():
+            if move & (MOVE_CAPTURE | MOVE_PROMO_Q) or move == tt_move or move in tried_killers:
+                continue
+            yield move
+
+        # --- losing captures ---
+        for i in range(count):
+            if scores[i] == BAD_CAPTURE:
+                yield captures[i]
+
+    def legal_moves_from_square(self, sq_from: int) -> List[int]:
+        """
+        Legal moves of the side-to-move piece on sq_from, [] if there is none.
+        Only that piece is generated; checkers and pins still come from the king.
+        """
+        board_items = self.board
+        piece = board_items.board[sq_from]
+        color = board_items.active_color
+        if not piece or (piece & COLOR) != color:
+            return []
+        king_sq = board_items.find_king(color)
+        checkers, evasions, pins = self.checks_and_pins(color, king_sq)
+        return self.legal_moves_from(sq_from, (king_sq, color ^ COLOR, checkers, evasions, pins))
+
+    def legal_moves_from(self, sq_from: int, legal: tuple) -> List[int]:
+        """
+        Legal moves of the own piece on sq_from, [] if there is none.
+        """
+        board_items = self.board
+        piece = board_items.board[sq_from]
+        king_sq, enemy, checkers, _, _ = legal
+        moves: List[int] = []
+        if not piece or (piece & COLOR) == enemy:
+            return moves
+
+        enemy_king = board_items.find_king(enemy)
+        if piece & KING:
+            self.generate_king_moves(king_sq, piece & COLOR, enemy_king, checkers, moves)
+        elif checkers < 2:
+            self.generate_piece_moves(sq_from, piece, enemy_king, moves)
+            self.keep_legal(moves, 0, sq_from, piece, legal)
+        return moves
+
+    def is_pseudo_legal(self, move: int) -> bool:
+        """
+        Whether move can be made by the side to move on the current board, own king safety
+        aside; checked on the move's own squares without generating anything.
+        Meant for hash and killer moves, which may come from another position.
+        """
+        board_items = self.board
+        board = board_items.board
+        from_sq = move & 63
+        to_sq = move >> 6 & 63
+        flags = move >> 12
+        piece = board[from_sq]
+        color = board_items.active_color
+        if not piece or (piece & COLOR) != color:
+            return False
+        target = board[to_sq]
+        if target and (target & COLOR) == color:
+            return False
+        ptype = piece & PIECE
+
+        if ptype == PAWN:
+            if color == WHITE:
+                forward = from_sq + 8
+                is_promo = to_sq >= 56
+                is_start = from_sq < 16
+            else:
+                forward = from_sq - 8
+                is_promo = to_sq < 8
+                is_start = from_sq >= 48
+            promo = flags & FLAG_PROMOTION
+            if is_promo != bool(promo) or flags & (FLAG_CASTLE_K | FLAG_CASTLE_Q):
+                return False
+            if promo and promo & (promo - 1):
+                return False  # more than one promotion piece
+            if flags & FLAG_EN_PASSANT:
+                return to_sq == board_items.en_passant and bool(flags & FLAG_CAPTURE) and \
+                    to_sq in PAWN_CAPTURE_TARGETS[color][from_sq]
+            if flags & FLAG_CAPTURE:
+                return bool(target) and to_sq in PAWN_CAPTURE_TARGETS[color][from_sq]
+            if target or board[forward]:
+                return False
+            return to_sq == forward or (is_start and to_sq == forward + forward - from_sq)
+
+        if flags & (FLAG_PROMOTION | FLAG_EN_PASSANT) or bool(flags & FLAG_CAPTURE) != bool(target):
+            return False
+        # only a king castles; apply would move the corner piece for anything else
+        if ptype != KING and flags & (FLAG_CASTLE_K | FLAG_CASTLE_Q):
+            return False
+
+        if ptype == KNIGHT:
+            return to_sq in KNIGHT_TARGETS[from_sq]
+
+        if ptype == KING:
+            if flags & (FLAG_CASTLE_K | FLAG_CASTLE_Q):
+                base = 0 if color == WHITE else 56
+                rights = board_items.castling_rights
+                if from_sq != base + 4:
+                    return False
+                if flags & FLAG_CASTLE_K:
+                    return to_sq == base + 6 and bool(rights & (CASTLE_WK if color == WHITE else CASTLE_BK)) \
+                        and board[base + 7] == ROOK | color and not board[base + 5] and not board[base + 6]
+                return to_sq == base + 2 and bool(rights & (CASTLE_WQ if color == WHITE else CASTLE_BQ)) \
+                    and board[base] == ROOK | color and not board[base + 1] and not board[base + 2] \
+                    and not board[base + 3]
+            return to_sq in KING_TARGETS[from_sq]
+
+        if not LINE_SLIDERS[from_sq][to_sq] & ptype:
+            return False
+        for sq in SQUARES_BETWEEN[from_sq][to_sq]:
+            if board[sq]:
+                return False
+        return True
+
+    def is_legal(self, move: int) -> bool:
+        """
+        Whether a pseudo-legal move keeps the own king safe. A piece off every line through
+        the king cannot expose it, so outside of check most moves need no board test.
+        """
+        board_items = self.board
+        board = board_items.board
+        from_sq = move & 63
+        to_sq = move >> 6 & 63
+        flags = move >> 12
+        color = board_items.active_color
+        enemy = color ^ COLOR
+        king_sq = board_items.find_king(color)
+
+        if from_sq == king_sq:
+            if flags & (FLAG_CASTLE_K | FLAG_CASTLE_Q):
+                if board_items.is_king_in_check:
+                    return False
+                step = 1 if flags & FLAG_CASTLE_K else -1
+                is_attacked = board_items.is_square_attacked
+                return not is_attacked(from_sq + step, enemy) and not is_attacked(from_sq + 2 * step, enemy)
+            king = board[from_sq]
+            board[from_sq] = EMPTY
+            attacked = board_items.is_square_attacked(to_sq, enemy)
+            board[from_sq] = king
+            return not attacked
+
+        if flags & FLAG_EN_PASSANT:
+            return self.is_en_passant_legal(move, king_sq, enemy)
+        if not board_items.is_king_in_check and not LINE_SLIDERS[king_sq][from_sq]:
+            return True
+
+        # make the move on the board squares only and look at the king
+        piece = board[from_sq]
+        target = board[to_sq]
+        board[from_sq] = EMPTY
+        board[to_sq] = piece
+        attacked = board_items.is_square_attacked(king_sq, enemy)
+        board[to_sq] = target
+        board[from_sq] = piece
+        return not attacked
+
+    def generate_legal_captures(self, legal: tuple, moves: List[int] | None = None) -> List[int]:
+        """
+        Legal captures, capture-promotions and queen promotions; no quiet move is generated.
+        Appended to moves when a list is given.
+        """
+        board_items = self.board
+        board = board_items.board
+        king_sq, enemy, checkers, _, _ = legal
+        if moves is None:
+            moves = []
+
+        # --- king captures; the attack map is only worth building for the full move list ---
+        attacked = board_items.attack_maps.get(enemy)
+        for sq_to in KING_TARGETS[king_sq]:
+            target = board[sq_to]
+            if target and (target & COLOR) == enemy:
+                if attacked is None:
+                    attacked = board_items.attack_map(enemy)
+                if not attacked[sq_to]:
+                    moves.append(king_sq | sq_to << 6 | MOVE_CAPTURE)
+        if checkers > 1:
+            return moves
+
+        for sq_from in board_items.piece_squares[enemy ^ COLOR]:
+            piece = board[sq_from]
+            if piece & KING:
+                continue
+            start = len(moves)
+            self.generate_piece_captures(sq_from, piece, moves)
+            if len(moves) != start:
+                self.keep_legal(moves, start, sq_from, piece, legal)
+
+        return moves
+
+    def checks_and_pins(self, color: int, king_sq: int) -> tuple[int, set[int] | None, dict[int, set[int]]]:
+        """
+        Scan outwards from the king once.
+        Returns (number of checkers, squares that resolve a single check,
+        pinned square -> squares it may still move to).
+        """
+        board = self.board.board
+        enemy = color ^ COLOR
+        checkers = 0
+        evasions = None
+        pins: dict[int, set[int]] = {}
+
+        # --- pawn checks ---
+        pawn = PAWN | enemy
+        for sq in PAWN_CAPTURE_TARGETS[color][king_sq]:
+            if board[sq] == pawn:
+                checkers += 1
+                evasions = {sq}
+
+        # --- knight checks ---
+        knight = KNIGHT | enemy
+        for sq in KNIGHT_TARGETS[king_sq]:
+            if board[sq] == knight:
+                checkers += 1
+                evasions = {sq}
+
+        # --- slider checks and pins ---
+        for rays, sliders in ((ROOK_RAYS[king_sq], ROOK_SLIDERS), (BISHOP_RAYS[king_sq], BISHOP_SLIDERS)):
+            for ray in rays:
+                own_sq = -1
+                for i, sq in enumerate(ray):
+                    p = board[sq]
+                    if not p:
+                        continue
+                    if (p & COLOR) == color:
+                        if own_sq != -1:
+                            break
+                        own_sq = sq
+                    else:
+                        if p & sliders:
+                            if own_sq == -1:
+                                checkers += 1
+                                evasions = set(ray[:i + 1])
+                            else:
+                                pins[own_sq] = set(ray[:i + 1])
+                        break
+
+        return checkers, evasions, pins
+
+    def generate_king_moves(self, king_sq: int, color: int, enemy_king: int, checkers: int,
+                            moves: List[int]):
+        board_items = self.board
+        board = board_items.board
+        enemy = color ^ COLOR
+        king_moves = []
+        self.generate_piece_moves(king_sq, board[king_sq], enemy_king, king_moves)
+
+        # the attack map is built without the king, it cannot shadow a slider ray behind it
+        attacked = board_items.attack_map(enemy)
+        for move in king_moves:
+            if move & (MOVE_CASTLE_K | MOVE_CASTLE_Q):
+                # castling already tested its path; never out of check
+                if not checkers:
+                    moves.append(move)
+            elif not attacked[move >> 6 & 63]:
+                moves.append(move)
+
+    def is_en_passant_legal(self, move: int, king_sq: int, enemy: int) -> bool:
+        board = self.board.board
+        from_sq = move & 63
+        to_sq = move >> 6 & 63
+        captured_sq = (from_sq & ~7) + (to_sq & 7)
+        pawn = board[from_sq]
+        captured = board[captured_sq]
+
+        board[from_sq] = EMPTY
+        board[captured_sq] = EMPTY
+        board[to_sq] = pawn
+        attacked = self.board.is_square_attacked(king_sq, enemy)
+        board[to_sq] = EMPTY
+        board[captured_sq] = captured
+        board[from_sq] = pawn
+        return not attacked
 
     def apply_uci(self, uci: str):
-        from_sq, to_sq, flags = from_uci_move(uci)
+        from_sq, to_sq, flags = decode_move(from_uci_move(uci))
         piece = self.board.board[from_sq]
 
         # capture
@@ -78,14 +625,17 @@ class MoveMailBoxGenerator:
             else:
                 flags |= FLAG_CASTLE_Q
 
-        return self.apply((from_sq, to_sq, flags))
+        return self.apply(encode_move(from_sq, to_sq, flags))
 
-    def apply(self, move: tuple[int, int, int]):
+    def apply(self, move: int):
         board_items = self.board
         board = board_items.board
-        from_sq, to_sq, flags = move
+        from_sq = move & 63
+        to_sq = move >> 6 & 63
+        flags = move >> 12
 
         piece = board[from_sq]
+        own_squares = board_items.piece_squares[piece & COLOR]
         captured_piece = EMPTY
         captured_sq = None
         rook_from = rook_to = None
@@ -103,6 +653,7 @@ class MoveMailBoxGenerator:
 
         board_items._is_king_in_check = -1
         board_items._is_other_king_in_check = -1
+        board_items.attack_maps = {}
 
         # --- REMOVE OLD EN PASSANT HASH ---
         if board_items.en_passant != -1:
@@ -124,6 +675,7 @@ class MoveMailBoxGenerator:
         if captured_sq is not None:
             captured_piece = board[captured_sq]
             board[captured_sq] = EMPTY
+            board_items.piece_squares[captured_piece & COLOR].remove(captured_sq)
             hash ^= Z_PIECE[captured_piece][captured_sq]
             score -= COMBINED_TABLE[captured_piece][captured_sq]
             board_items.halfmove_clock = 0
@@ -133,6 +685,8 @@ class MoveMailBoxGenerator:
         hash ^= Z_PIECE[piece][from_sq]
 
         board[to_sq] = piece
+        own_squares.remove(from_sq)
+        own_squares.add(to_sq)
         hash ^= Z_PIECE[piece][to_sq]
         score -= COMBINED_TABLE[piece][from_sq]
         score += COMBINED_TABLE[piece][to_sq]
@@ -174,6 +728,8 @@ class MoveMailBoxGenerator:
             rook = board[rook_from]
             board[rook_from] = EMPTY
             board[rook_to] = rook
+            own_squares.remove(rook_from)
+            own_squares.add(rook_to)
             hash ^= Z_PIECE[rook][rook_from]
             hash ^= Z_PIECE[rook][rook_to]
             score -= COMBINED_TABLE[rook][rook_from]
@@ -199,92 +755,126 @@ class MoveMailBoxGenerator:
         board_items.active_color ^= WHITE | BLACK
         hash ^= Z_SIDE
 
-        # --- REPETITION COUNT ---
-        board_items.position_counts[hash] = board_items.position_counts.get(hash, 0) + 1
-
         board_items.hash = hash
         board_items.score = score
-        # --- SAVE UNDO INFO ---
-        board_items.undo_stack.append((
-            captured_piece,
-            captured_sq,
-            piece,
-            rook_from,
-            rook_to,
-            old_castling,
-            old_en_passant,
-            old_halfmove_clock,
-            old_active_color,
-            old_hash,
-            old_score
-        ))
+
+        # --- SAVE UNDO INFO (the move itself tells the squares and the moved piece) ---
+        ply = board_items.ply
+        if ply == len(board_items.hash_history):
+            board_items.grow_undo()
+        board_items.hash_history[ply] = old_hash
+        board_items.undo_captured[ply] = captured_piece
+        board_items.undo_castling[ply] = old_castling
+        board_items.undo_en_passant[ply] = old_en_passant
+        board_items.undo_halfmove[ply] = old_halfmove_clock
+        board_items.undo_score[ply] = old_score
+        board_items.ply = ply + 1
         return move
 
-    def undo(self, move: tuple[int, int, int]):
-        from_sq, to_sq, flags = move
-        board = self.board.board
+    def undo(self, move: int):
+        board_items = self.board
+        board = board_items.board
+        from_sq = move & 63
+        to_sq = move >> 6 & 63
+        flags = move >> 12
+
+        ply = board_items.ply - 1
+        board_items.ply = ply
+        board_items.hash = board_items.hash_history[ply]
+        board_items.score = board_items.undo_score[ply]
+        board_items.castling_rights = board_items.undo_castling[ply]
+        board_items.en_passant = board_items.undo_en_passant[ply]
+        board_items.halfmove_clock = board_items.undo_halfmove[ply]
+        board_items.attack_maps = {}
+        board_items._is_king_in_check = -1
+        board_items._is_other_king_in_check = -1
 
-        # pop undo info
-        (
-            captured_piece,
-            captured_sq,
-            moved_piece,
-            rook_from,
-            rook_to,
-            old_castling,
-            old_en_passant,
-            old_halfmove,
-            old_active_color,
-            old_hash,
-            old_score
-        ) = self.board.undo_stack.pop()
-
-        self.board.hash = old_hash
-        self.board.score = old_score
         # Restore moved piece
+        piece = board[to_sq]
+        color = piece & COLOR
+        board_items.active_color = color
         if flags & FLAG_PROMOTION:
-            piece = PAWN | old_active_color
-        else:
-            piece = moved_piece
+            piece = PAWN | color
         board[from_sq] = piece
-        board[to_sq] = 0
+        board[to_sq] = EMPTY
+        own_squares = board_items.piece_squares[color]
+        own_squares.remove(to_sq)
+        own_squares.add(from_sq)
 
         # Restore king position
         if piece & KING:
-            if piece & WHITE:
-                self.board.white_king = from_sq
+            if color == WHITE:
+                board_items.white_king = from_sq
             else:
-                self.board.black_king = from_sq
+                board_items.black_king = from_sq
+
+            # Undo castling rook
+            if flags & (FLAG_CASTLE_K | FLAG_CASTLE_Q):
+                if flags & FLAG_CASTLE_K:
+                    rook_from = to_sq + 1
+                    rook_to = to_sq - 1
+                else:
+                    rook_from = to_sq - 2
+                    rook_to = to_sq + 1
+                board[rook_from] = board[rook_to]
+                board[rook_to] = EMPTY
+                own_squares.remove(rook_to)
+                own_squares.add(rook_from)
 
         # Restore captured piece
-        if captured_sq is not None:
+        if flags & (FLAG_CAPTURE | FLAG_EN_PASSANT):
+            captured_sq = (from_sq & ~7) + (to_sq & 7) if flags & FLAG_EN_PASSANT else to_sq
+            captured_piece = board_items.undo_captured[ply]
             board[captured_sq] = captured_piece
+            board_items.piece_squares[color ^ COLOR].add(captured_sq)
+
+    def apply_null(self):
+        """
+        Pass the turn (null-move pruning). Uses the same undo slots as apply; the halfmove
+        clock restarts so the repetition check never looks across the null move.
+        """
+        board_items = self.board
+        ply = board_items.ply
+        if ply == len(board_items.hash_history):
+            board_items.grow_undo()
+        hash = board_items.hash
+        board_items.hash_history[ply] = hash
+        board_items.undo_captured[ply] = EMPTY
+        board_items.undo_castling[ply] = board_items.castling_rights
+        board_items.undo_en_passant[ply] = board_items.en_passant
+        board_items.undo_halfmove[ply] = board_items.halfmove_clock
+        board_items.undo_score[ply] = board_items.score
+        board_items.ply = ply + 1
+
+        if board_items.en_passant != -1:
+            hash ^= Z_EP_FILE[board_items.en_passant % 8]
+            board_items.en_passant = -1
+        board_items.halfmove_clock = 0
+        board_items.active_color ^= WHITE | BLACK
+        board_items.hash = hash ^ Z_SIDE
+        board_items.attack_maps = {}
+        board_items._is_king_in_check = -1
+        board_items._is_other_king_in_check = -1
+
+    def undo_null(self):
+        board_items = self.board
+        ply = board_items.ply - 1
+        board_items.ply = ply
+        board_items.hash = board_items.hash_history[ply]
+        board_items.en_passant = board_items.undo_en_passant[ply]
+        board_items.halfmove_clock = board_items.undo_halfmove[ply]
+        board_items.active_color ^= WHITE | BLACK
+        board_items.attack_maps = {}
+        board_items._is_king_in_check = -1
+        board_items._is_other_king_in_check = -1
 
-        # Undo castling rook
-        if rook_from is not None and rook_to is not None:
-            rook_piece = board[rook_to]
-            board[rook_from] = rook_piece
-            board[rook_to] = EMPTY
-
-        # Restore metadata
-        self.board.castling_rights = old_castling
-        self.board.en_passant = old_en_passant
-        self.board.halfmove_clock = old_halfmove
-        self.board.active_color = old_active_color
-
-        # Revert repetition counter
-        if self.board.position_counts.get(old_hash):
-            self.board.position_counts[old_hash] -= 1
-            if self.board.position_counts[old_hash] == 0:
-                del self.board.position_counts[old_hash]
-
-    def order_moves(self, moves: list[tuple[tuple[int, int, int], bool]]) -> list[tuple[tuple[int, int, int], bool]]:
+    def order_moves(self, moves: list[tuple[int, bool]]) -> list[tuple[int, bool]]:
         promotions = []
         captures = []
         checks = []
         quiet = []
         for move, gives_check in moves:
-            _, _, flags = move
+            flags = move >> 12
             if flags & FLAG_PROMOTION:
                 promotions.append((move, gives_check))
             elif flags & FLAG_CAPTURE:
@@ -296,186 +886,276 @@ class MoveMailBoxGenerator:
 
         return checks + promotions + captures + quiet
 
-    def gives_check(self, move: tuple[int, int, int]):
-        self.apply(move)
-        ret = self.board.is_king_in_check
-        self.undo(move)
-        return ret
-
-    def legal_captures(self):
-        captures = []
-        # Identify who we are attacking
-        enemy_color = BLACK if self.board.active_color == WHITE else WHITE
-        e_k = self.board.black_king if self.board.active_color == WHITE else self.board.white_king
+    def check_info(self, color: int) -> tuple[int, dict[int, set[int]], dict[int, set[int]]]:
+        """
+        Scan outwards from the enemy king once.
+        Returns (enemy king square, piece type -> squares it gives check from,
+        own blocker square -> king line it must stay on to keep a slider behind it covered).
+        Slider squares end at the first occupied square of each ray.
+        """
+        board = self.board.board
+        enemy = color ^ COLOR
+        king_sq = self.board.find_king(enemy)
+        rook_squares: set[int] = set()
+        bishop_squares: set[int] = set()
+        discoverers: dict[int, set[int]] = {}
+
+        for rays, sliders, squares in ((ROOK_RAYS[king_sq], ROOK_SLIDERS, rook_squares),
+                                       (BISHOP_RAYS[king_sq], BISHOP_SLIDERS, bishop_squares)):
+            for ray in rays:
+                own_sq = -1
+                for i, sq in enumerate(ray):
+                    p = board[sq]
+                    if own_sq == -1:
+                        squares.add(sq)
+                    if not p:
+                        continue
+                    if own_sq == -1 and (p & COLOR) == color:
+                        own_sq = sq
+                        continue
+                    if own_sq != -1 and (p & COLOR) == color and p & sliders:
+                        discoverers[own_sq] = set(ray[:i + 1])
+                    break
+
+        check_squares = {
+            PAWN: set(PAWN_CAPTURE_TARGETS[enemy][king_sq]),
+            KNIGHT: set(KNIGHT_TARGETS[king_sq]),
+            BISHOP: bishop_squares,
+            ROOK: rook_squares,
+            QUEEN: bishop_squares | rook_squares,
+            KING: set(),
+        }
+        return king_sq, check_squares, discoverers
+
+    def gives_check(self, move: int, info: tuple | None = None) -> bool:
+        """
+        Whether the side to move checks the enemy king with move, without apply/undo.
+        info is check_info() of the side to move, computed when not given.
+        """
+        board_items = self.board
+        board = board_items.board
+        from_sq = move & 63
+        to_sq = move >> 6 & 63
+        flags = move >> 12
+        piece = board[from_sq]
+        color = piece & COLOR
+        king_sq, check_squares, discoverers = info or self.check_info(color)
 
-        # We only care about moves where the 'to_sq' contains an enemy piece
-        # Use your existing move gen logic, but add this filter:
-        for move in self.generate_pseudo_legal_moves(self.board.active_color, e_k):
-            from_sq, to_sq, flag = move
+        if flags & FLAG_EN_PASSANT:
+            # two squares leave the rank at once, look at the board instead
+            captured_sq = (from_sq & ~7) + (to_sq & 7)
+            captured = board[captured_sq]
+            board[from_sq] = EMPTY
+            board[captured_sq] = EMPTY
+            board[to_sq] = piece
+            attacked = board_items.is_square_attacked(king_sq, color)
+            board[to_sq] = EMPTY
+            board[captured_sq] = captured
+            board[from_sq] = piece
+            return attacked
+
+        # discovered check through the vacated square
+        line = discoverers.get(from_sq)
+        if line is not None and to_sq not in line:
+            return True
+
+        if flags & (FLAG_CASTLE_K | FLAG_CASTLE_Q):
+            # the rook checks; the king leaves its square, which may open the rook's line
+            to_sq = to_sq - 1 if flags & FLAG_CASTLE_K else to_sq + 1
+            ptype = ROOK
+        elif flags & FLAG_PROMOTION:
+            ptype = promotion_piece(flags, color) & PIECE
+        else:
+            ptype = piece & PIECE
 
-            if (flag & FLAG_CAPTURE) or (flag & FLAG_PROMOTION):
+        squares = check_squares[ptype]
+        if to_sq in squares:
+            return True
+        # a slider moving away from the king along the ray it was blocking
+        return bool(ptype & (ROOK_SLIDERS | BISHOP_SLIDERS)) and from_sq in squares \
+            and from_sq in SQUARES_BETWEEN[king_sq][to_sq]
 
-                self.apply(move)
-                if not self.board.is_other_king_in_check:
-                    captures.append(move)
-                self.undo(move)
+    def legal_moves_with_checks(self) -> List[tuple[int, bool]]:
+        """
+        Legal moves paired with whether they give check, in the shape order_moves takes.
+        """
+        info = self.check_info(self.board.active_color)
+        gives_check = self.gives_check
+        return [(move, gives_check(move, info)) for move in self.legal_moves()]
 
-        return captures
+    def legal_captures(self, moves: List[int] | None = None) -> List[int]:
+        """
+        Legal captures, capture-promotions and queen promotions (quiescence search).
+        Quiet moves are never generated and legality comes from the pins, not apply/undo.
+        Appended to moves when a list is given.
+        """
+        color = self.board.active_color
+        king_sq = self.board.find_king(color)
+        checkers, evasions, pins = self.checks_and_pins(color, king_sq)
+        return self.generate_legal_captures((king_sq, color ^ COLOR, checkers, evasions, pins), moves)
 
-    def generate_pseudo_legal_moves(self, color: int, enemy_king_sq: int) -> list[tuple[int, int, int]]:
-        moves: list[tuple[int, int, int]] = []
+    def generate_pseudo_legal_moves(self, color: int, enemy_king_sq: int) -> list[int]:
+        moves: list[int] = []
         board = self.board.board
-        for sq_from in range(64):
-            piece = board[sq_from]
-            if not piece or (piece & COLOR) != color:
-                continue
+        for sq_from in self.board.piece_squares[color]:
+            self.generate_piece_moves(sq_from, board[sq_from], enemy_king_sq, moves)
 
-            ptype = piece & PIECE
-            rank, file = divmod(sq_from, 8)
-            is_white = color == WHITE
-
-            # --- knight moves ---
-            if ptype == KNIGHT:
-                for dr, df in KNIGHT_OFFSETS:
-                    r, f = rank + dr, file + df
-                    if 0 <= r < 8 and 0 <= f < 8:
-                        sq_to = r * 8 + f
-                        target = board[sq_to]
-                        if not target:
-                            moves.append((sq_from, sq_to, FLAG_NONE))
-                        elif (target & COLOR) != color:
-                            moves.append((sq_from, sq_to, FLAG_CAPTURE))
-
-            # --- king moves ---
-            elif ptype == KING:
-                for dr, df in KING_OFFSETS:
-                    r, f = rank + dr, file + df
-                    if 0 <= r < 8 and 0 <= f < 8:
-                        sq_to = r * 8 + f
-                        if abs(r - (enemy_king_sq // 8)) <= 1 and abs(f - (enemy_king_sq % 8)) <= 1:
-                            continue  # illegal: kings adjacent
-                        target = board[sq_to]
-                        if not target:
-                            moves.append((sq_from, sq_to, FLAG_NONE))
-                        elif (target & COLOR) != color:
-                            moves.append((sq_from, sq_to, FLAG_CAPTURE))
-                # --- castling ---
-                rights = self.board.castling_to_string()
-                if is_white and rank == 0 and file == 4:
-                    # white kingside
-                    if "K" in rights and not board[0 * 8 + 5] and not board[0 * 8 + 6]:
-                        if not self.board.is_square_attacked(4 + 0 * 8, BLACK) and \
-                                not self.board.is_square_attacked(5 + 0 * 8, BLACK) and \
-                                not self.board.is_square_attacked(6 + 0 * 8, BLACK):
-                            moves.append((sq_from, 0 * 8 + 6, FLAG_CASTLE_K))
-                    # white queenside
-                    if "Q" in rights and not board[0 * 8 + 1] and not board[0 * 8 + 2] and not board[0 * 8 + 3]:
-                        if not self.board.is_square_attacked(4 + 0 * 8, BLACK) and \
-                                not self.board.is_square_attacked(3 + 0 * 8, BLACK) and \
-                                not self.board.is_square_attacked(2 + 0 * 8, BLACK):
-                            moves.append((sq_from, 0 * 8 + 2, FLAG_CASTLE_Q))
-
-                elif not is_white and rank == 7 and file == 4:
-                    # black kingside
-                    if "k" in rights and not board[7 * 8 + 5] and not board[7 * 8 + 6]:
-                        if not self.board.is_square_attacked(4 + 7 * 8, WHITE) and \
-                                not self.board.is_square_attacked(5 + 7 * 8, WHITE) and \
-                                not self.board.is_square_attacked(6 + 7 * 8, WHITE):
-                            moves.append((sq_from, 7 * 8 + 6, FLAG_CASTLE_K))
-                    # black queenside
-                    if "q" in rights and not board[7 * 8 + 1] and not board[7 * 8 + 2] and not board[
-                        7 * 8 + 3]:
-                        if not self.board.is_square_attacked(4 + 7 * 8, WHITE) and \
-                                not self.board.is_square_attacked(3 + 7 * 8, WHITE) and \
-                                not self.board.is_square_attacked(2 + 7 * 8, WHITE):
-                            moves.append((sq_from, 7 * 8 + 2, FLAG_CASTLE_Q))
-
-
-            # --- pawn moves ---
-            elif ptype == PAWN:
-                for dr, df in PAWN_OFFSETS[color]:
-                    r, f = rank + dr, file + df
-                    if not (0 <= r < 8 and 0 <= f < 8):
-                        continue
+        return moves
 
-                    sq_to = r * 8 + f
+    def generate_piece_moves(self, sq_from: int, piece: int, enemy_king_sq: int, moves: list[int]):
+        """
+        Pseudo-legal moves of the piece on sq_from, appended to moves.
+        """
+        board = self.board.board
+        color = piece & COLOR
+        ptype = piece & PIECE
+
+        # --- knight moves ---
+        if ptype == KNIGHT:
+            for sq_to in KNIGHT_TARGETS[sq_from]:
+                target = board[sq_to]
+                if not target:
+                    moves.append(sq_from | sq_to << 6)
+                elif (target & COLOR) != color:
+                    moves.append(sq_from | sq_to << 6 | MOVE_CAPTURE)
+
+        # --- king moves ---
+        elif ptype == KING:
+            enemy_king_zone = KING_TARGETS[enemy_king_sq]
+            for sq_to in KING_TARGETS[sq_from]:
+                if sq_to in enemy_king_zone:
+                    continue  # illegal: kings adjacent
+                target = board[sq_to]
+                if not target:
+                    moves.append(sq_from | sq_to << 6)
+                elif (target & COLOR) != color:
+                    moves.append(sq_from | sq_to << 6 | MOVE_CAPTURE)
+            # --- castling ---
+            rights = self.board.castling_rights
+            if color == WHITE:
+                if sq_from == 4 and rights & (CASTLE_WK | CASTLE_WQ):
+                    self.generate_castling(rights & CASTLE_WK, rights & CASTLE_WQ, 0, BLACK, moves)
+            elif sq_from == 60 and rights & (CASTLE_BK | CASTLE_BQ):
+                self.generate_castling(rights & CASTLE_BK, rights & CASTLE_BQ, 56, WHITE, moves)
+
+        # --- pawn moves ---
+        elif ptype == PAWN:
+            if color == WHITE:
+                sq_to = sq_from + 8
+                is_promo = sq_to >= 56
+                is_start = sq_from < 16
+            else:
+                sq_to = sq_from - 8
+                is_promo = sq_to < 8
+                is_start = sq_from >= 48
+
+            # single forward
+            if not board[sq_to]:
+                if is_promo:
+                    for promo in MOVE_PROMOS:
+                        moves.append(sq_from | sq_to << 6 | promo)
+                else:
+                    moves.append(sq_from | sq_to << 6)
+
+                    # double forward
+                    if is_start:
+                        sq_to2 = sq_to + sq_to - sq_from
+                        if not board[sq_to2]:
+                            moves.append(sq_from | sq_to2 << 6)
+
+            # captures
+            en_passant = self.board.en_passant
+            for sq_to in PAWN_CAPTURE_TARGETS[color][sq_from]:
+                target = board[sq_to]
+                if target and (target & COLOR) != color:
+                    if is_promo:
+                        for promo in MOVE_PROMOS:
+                            moves.append(sq_from | sq_to << 6 | MOVE_CAPTURE | promo)
+                    else:
+                        moves.append(sq_from | sq_to << 6 | MOVE_CAPTURE)
+                elif sq_to == en_passant:
+                    moves.append(sq_from | sq_to << 6 | MOVE_CAPTURE | MOVE_EN_PASSANT)
+
+        # --- sliders ---
+        else:
+            if ptype == ROOK:
+                rays = ROOK_RAYS[sq_from]
+            elif ptype == BISHOP:
+                rays = BISHOP_RAYS[sq_from]
+            else:
+                rays = QUEEN_RAYS[sq_from]
+            for ray in rays:
+                for sq_to in ray:
                     target = board[sq_to]
-                    is_promo = (is_white and r == 7) or (not is_white and r == 0)
-
-                    # captures
-                    if df != 0 and target and (target & COLOR) != color:
-                        if is_promo:
-                            for promo_flag in (FLAG_PROMO_R, FLAG_PROMO_N, FLAG_PROMO_B, FLAG_PROMO_Q):
-                                moves.append((sq_from, sq_to, FLAG_CAPTURE | promo_flag))
-                        else:
-                            moves.append((sq_from, sq_to, FLAG_CAPTURE))
-
-                    # en passant
-                    if self.board.en_passant != -1 and sq_to == self.board.en_passant:
-                        moves.append((sq_from, sq_to, FLAG_CAPTURE | FLAG_EN_PASSANT))
-
-                    # single forward
-                    elif df == 0 and not target:
-                        if is_promo:
-                            for promo_flag in (FLAG_PROMO_R, FLAG_PROMO_N, FLAG_PROMO_B, FLAG_PROMO_Q):
-                                moves.append((sq_from, sq_to, promo_flag))
-                        else:
-                            moves.append((sq_from, sq_to, FLAG_NONE))
-
-                        # double forward
-                        if (is_white and rank == 1) or (not is_white and rank == 6):
-                            r2 = rank + (2 if is_white else -2)
-                            sq_to2 = r2 * 8 + file
-                            if board[sq_to2] == EMPTY:
-                                moves.append((sq_from, sq_to2, FLAG_NONE))
-
-
-            # --- rook moves ---
-            elif ptype == ROOK:
-                for dr, df in ROOK_DIRS:
-                    r, f = rank + dr, file + df
-                    while 0 <= r < 8 and 0 <= f < 8:
-                        sq_to = r * 8 + f
-                        target = board[sq_to]
-                        if not target:
-                            moves.append((sq_from, sq_to, FLAG_NONE))
-                        else:
-                            if (target & COLOR) != color:
-                                moves.append((sq_from, sq_to, FLAG_CAPTURE))
-                            break
-                        r += dr
-                        f += df
+                    if not target:
+                        moves.append(sq_from | sq_to << 6)
+                    else:
+                        if (target & COLOR) != color:
+                            moves.append(sq_from | sq_to << 6 | MOVE_CAPTURE)
+                        break
+
+    def generate_piece_captures(self, sq_from: int, piece: int, moves: list[int]):
+        """
+        Pseudo-legal captures and queen promotions of the non-king piece on sq_from.
+        """
+        board = self.board.board
+        color = piece & COLOR
+        ptype = piece & PIECE
+
+        if ptype == KNIGHT:
+            for sq_to in KNIGHT_TARGETS[sq_from]:
+                target = board[sq_to]
+                if target and (target & COLOR) != color:
+                    moves.append(sq_from | sq_to << 6 | MOVE_CAPTURE)
+
+        elif ptype == PAWN:
+            if color == WHITE:
+                sq_to = sq_from + 8
+                is_promo = sq_to >= 56
+            else:
+                sq_to = sq_from - 8
+                is_promo = sq_to < 8
+
+            if is_promo and not board[sq_to]:
+                moves.append(sq_from | sq_to << 6 | MOVE_PROMO_Q)
+
+            en_passant = self.board.en_passant
+            for sq_to in PAWN_CAPTURE_TARGETS[color][sq_from]:
+                target = board[sq_to]
+                if target and (target & COLOR) != color:
+                    if is_promo:
+                        for promo in MOVE_PROMOS:
+                            moves.append(sq_from | sq_to << 6 | MOVE_CAPTURE | promo)
+                    else:
+                        moves.append(sq_from | sq_to << 6 | MOVE_CAPTURE)
+                elif sq_to == en_passant:
+                    moves.append(sq_from | sq_to << 6 | MOVE_CAPTURE | MOVE_EN_PASSANT)
 
-            # --- bishop moves ---
+        else:
+            if ptype == ROOK:
+                rays = ROOK_RAYS[sq_from]
             elif ptype == BISHOP:
-                for dr, df in BISHOP_DIRS:
-                    r, f = rank + dr, file + df
-                    while 0 <= r < 8 and 0 <= f < 8:
-                        sq_to = r * 8 + f
-                        target = board[sq_to]
-                        if not target:
-                            moves.append((sq_from, sq_to, FLAG_NONE))
-                        else:
-                            if (target & COLOR) != color:
-                                moves.append((sq_from, sq_to, FLAG_CAPTURE))
-                            break
-                        r += dr
-                        f += df
-
-            # --- queen moves ---
-            elif ptype == QUEEN:
-                for dr, df in QUEEN_DIRS:
-                    r, f = rank + dr, file + df
-                    while 0 <= r < 8 and 0 <= f < 8:
-                        sq_to = r * 8 + f
-                        target = board[sq_to]
-                        if not target:
-                            moves.append((sq_from, sq_to, FLAG_NONE))
-                        else:
-                            if (target & COLOR) != color:
-                                moves.append((sq_from, sq_to, FLAG_CAPTURE))
-                            break
-                        r += dr
-                        f += df
+                rays = BISHOP_RAYS[sq_from]
+            else:
+                rays = QUEEN_RAYS[sq_from]
+            for ray in rays:
+                for sq_to in ray:
+                    target = board[sq_to]
+                    if target:
+                        if (target & COLOR) != color:
+                            moves.append(sq_from | sq_to << 6 | MOVE_CAPTURE)
+                        break
 
-        return moves
+    def generate_castling(self, king_side: int, queen_side: int, base: int, enemy: int,
+                          moves: list[int]):
+        """
+        Castling moves for the king on base + 4 (e1 / e8); base is 0 or 56.
+        """
+        board = self.board.board
+        attacked = self.board.attack_map(enemy)
+        if king_side and not board[base + 5] and not board[base + 6]:
+            if not attacked[base + 4] and not attacked[base + 5] and not attacked[base + 6]:
+                moves.append(base + 4 | (base + 6) << 6 | MOVE_CASTLE_K)
+        if queen_side and not board[base + 1] and not board[base + 2] and not board[base + 3]:
+            if not attacked[base + 4] and not attacked[base + 3] and not attacked[base + 2]:
+                moves.append(base + 4 | (base + 2) << 6 | MOVE_CASTLE_Q)
@@ -50,7 +50,7 @@ class MoveTupleGenerator:
             y = file_y(xy)
             nx = rank_x(nxy)
             ny = file_y(nxy)
-            if king_was_checked and ((flags & FLAG_CASTLE_Q) or (flags & FLAG_CASTLE_Q)):
+            if king_was_checked and flags & (FLAG_CASTLE_K | FLAG_CASTLE_Q):
                 continue
             self.apply(move)
             if not self.board.is_king_in_check:
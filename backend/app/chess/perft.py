@@ -23,10 +23,35 @@ def run_perft(gen: MoveGenerator, depth: int):
     return total_nodes
 
 
+def run_apply_undo_bench(gen: MoveGenerator, rounds: int = 1000):
+    """
+    Make/unmake throughput: every legal move of the current position is applied and
+    undone rounds times, without generating moves in between.
+    """
+    moves = gen.legal_moves()
+    apply = gen.apply
+    undo = gen.undo
+
+    start_time = time.perf_counter()
+    for _ in range(rounds):
+        for move in moves:
+            apply(move)
+            undo(move)
+    duration = time.perf_counter() - start_time
+
+    pairs = rounds * len(moves)
+    pps = int(pairs / duration) if duration > 0 else 0
+    print(f"Apply+undo: {pairs} pairs in {duration:.3f} s, {pps:,} pairs/s")
+    return pps
+
+
 def perft(gen: MoveGenerator, depth: int) -> int:
     # This remains your core recursive function
     if depth == 0:
         return 1
+    if depth == 1:
+        # bulk counting: the leaves are never applied
+        return gen.count_legal_moves()
 
     nodes = 0
     moves = gen.legal_moves()
@@ -37,12 +62,12 @@ def perft(gen: MoveGenerator, depth: int) -> int:
     return nodes
 
 
-def perft_divide(board: Board, depth: int) -> dict[tuple[int, int, int], int]:
+def perft_divide(board: Board, depth: int) -> dict[int, int]:
     if depth < 1:
         raise ValueError("perft_divide depth must be >= 1")
 
-    results: dict[tuple[int, int, int], int] = {}
-    generator = MoveGenerator(board)
+    results: dict[int, int] = {}
+    generator = board.move_generator()
 
     for move in generator.legal_moves():
         generator.apply(move)
@@ -37,11 +37,83 @@ QUEEN_DIRS = ROOK_DIRS + BISHOP_DIRS
 
 EMPTY = 0
 
+# castling right bits (board.castling_rights)
+CASTLE_WK = 1  # K
+CASTLE_WQ = 2  # Q
+CASTLE_BK = 4  # k
+CASTLE_BQ = 8  # q
+
+
+# ─────────────────────────────────────────────
+# Precomputed square tables (0 = a1, 63 = h8)
+# ─────────────────────────────────────────────
+# Built once at import so move generation walks plain lists
+# instead of doing divmod and bounds checks per step.
+
+def _jump_targets(offsets) -> list[list[int]]:
+    targets = []
+    for sq in range(64):
+        rank, file = divmod(sq, 8)
+        targets.append([
+            (rank + dr) * 8 + file + df
+            for dr, df in offsets
+            if 0 <= rank + dr < 8 and 0 <= file + df < 8
+        ])
+    return targets
+
+
+def _rays(dirs) -> list[list[list[int]]]:
+    rays = []
+    for sq in range(64):
+        rank, file = divmod(sq, 8)
+        sq_rays = []
+        for dr, df in dirs:
+            ray = []
+            r, f = rank + dr, file + df
+            while 0 <= r < 8 and 0 <= f < 8:
+                ray.append(r * 8 + f)
+                r += dr
+                f += df
+            if ray:
+                sq_rays.append(ray)
+        rays.append(sq_rays)
+    return rays
+
+
+KNIGHT_TARGETS = _jump_targets(KNIGHT_OFFSETS)
+KING_TARGETS = _jump_targets(KING_OFFSETS)
+# squares a pawn of the given color on sq captures on
+PAWN_CAPTURE_TARGETS = {
+    WHITE: _jump_targets(((1, -1), (1, 1))),
+    BLACK: _jump_targets(((-1, -1), (-1, 1))),
+}
+# per square: one list per direction, ordered outwards, empty directions dropped
+ROOK_RAYS = _rays(ROOK_DIRS)
+BISHOP_RAYS = _rays(BISHOP_DIRS)
+QUEEN_RAYS = _rays(QUEEN_DIRS)
+
 COLOR = WHITE | BLACK
 PIECE = PAWN | KNIGHT | BISHOP | ROOK | QUEEN | KING
 ROOK_SLIDERS = ROOK | QUEEN  # 0b00101000
 BISHOP_SLIDERS = BISHOP | QUEEN  # 0b00010100
 
+
+def _lines() -> tuple[list[list[int]], list[list[tuple[int, ...]]]]:
+    sliders = [[0] * 64 for _ in range(64)]
+    between = [[()] * 64 for _ in range(64)]
+    for sq in range(64):
+        for rays, line_sliders in ((ROOK_RAYS[sq], ROOK_SLIDERS), (BISHOP_RAYS[sq], BISHOP_SLIDERS)):
+            for ray in rays:
+                for i, target in enumerate(ray):
+                    sliders[sq][target] = line_sliders
+                    between[sq][target] = tuple(ray[:i])
+    return sliders, between
+
+
+# [from][to]: slider types moving from -> to on an empty board (0 if none),
+# and the squares strictly between the two
+LINE_SLIDERS, SQUARES_BETWEEN = _lines()
+
 # piece type to index (0..5)
 PIECE_TO_INDEX = {
     PAWN: 0,
@@ -166,6 +238,10 @@ def init_tables():
             COMBINED_TABLE[black_piece][sq] = -(val + pst[sq ^ 56])
 
 
+# filled once at import; boards only read it
+init_tables()
+
+
 # 1 = W_KING_SIDE (K)
 # 2 = W_QUEEN_SIDE (Q)
 # 4 = B_KING_SIDE (k)
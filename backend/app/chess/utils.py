@@ -1,9 +1,23 @@
-from app.chess.move_flags import FLAG_NONE, FLAG_PROMO_Q, FLAG_PROMO_B, FLAG_PROMOTION, FLAG_PROMO_R, FLAG_PROMO_N
-from app.chess.static import PAWN, ROOK, KNIGHT, BISHOP, QUEEN, KING, WHITE, BLACK
+from app.chess.move_flags import FLAG_NONE, FLAG_PROMO_Q, FLAG_PROMO_B, FLAG_PROMOTION, FLAG_PROMO_R, FLAG_PROMO_N, \
+    FLAG_EN_PASSANT, MOVE_FLAGS_SHIFT, MOVE_PROMO_Q, encode_move
+from app.chess.static import PAWN, ROOK, KNIGHT, BISHOP, QUEEN, KING, WHITE, BLACK, PIECE_VALUE_TABLE
 
 FILES = "abcdefgh"
 RANKS = "12345678"
 
+# --- UCI codec tables ---
+SQUARE_NAMES = [FILES[sq & 7] + RANKS[sq >> 3] for sq in range(64)]
+# packed from | to << 6 -> "e2e4"
+UCI_FROM_TO = [SQUARE_NAMES[m & 63] + SQUARE_NAMES[m >> 6] for m in range(4096)]
+UCI_TO_MOVE = {name: m for m, name in enumerate(UCI_FROM_TO)}
+UCI_PROMO_FLAGS = {"q": FLAG_PROMO_Q, "r": FLAG_PROMO_R, "b": FLAG_PROMO_B, "n": FLAG_PROMO_N}
+# move flags -> promotion suffix
+UCI_PROMO_SUFFIX = [""] * 256
+for _flags in range(256):
+    for _letter, _promo in UCI_PROMO_FLAGS.items():
+        if _flags & _promo:
+            UCI_PROMO_SUFFIX[_flags] = _letter
+
 
 def sq(x: int, y: int) -> int:
     return x * 8 + y
@@ -17,22 +31,10 @@ def rank_x(sq: int) -> int:
     return sq >> 3
 
 
-def to_uci(move: tuple[int, int, int]) -> str:
-    xy, nxy, flag = move
-    sqxy = squaretuple_to_notation((rank_x(xy), file_y(xy)))
-    sqnxy = squaretuple_to_notation((rank_x(nxy), file_y(nxy)))
-
-    promo = ""
-    if flag & FLAG_PROMO_R:
-        promo = "r"
-    elif flag & FLAG_PROMO_N:
-        promo = "n"
-    elif flag & FLAG_PROMO_B:
-        promo = "b"
-    elif flag & FLAG_PROMO_Q:
-        promo = "q"
-
-    return sqxy + sqnxy + promo
+def to_uci(move: int) -> str:
+    if type(move) is tuple:  # BoardArray generators still produce (from, to, flags)
+        move = encode_move(*move)
+    return UCI_FROM_TO[move & 0xFFF] + UCI_PROMO_SUFFIX[move >> MOVE_FLAGS_SHIFT]
 
 
 def from_uci(uci: str) -> int:
@@ -48,41 +50,18 @@ def from_uci(uci: str) -> int:
     return sq
 
 
-def from_uci_move(uci: str) -> tuple[int, int, int]:
+def from_uci_move(uci: str) -> int:
     if len(uci) not in (4, 5):
         raise ValueError("Invalid UCI")
 
-    f_file = ord(uci[0]) - ord("a")
-    f_rank = int(uci[1]) - 1
-    t_file = ord(uci[2]) - ord("a")
-    t_rank = int(uci[3]) - 1
-
-    if f_rank not in (0, 1, 2, 3, 4, 5, 6, 7):
+    move = UCI_TO_MOVE.get(uci[:4])
+    if move is None:
         raise ValueError("Invalid UCI!")
-    if f_file not in (0, 1, 2, 3, 4, 5, 6, 7):
-        raise ValueError("Invalid UCI!")
-
-    if t_rank not in (0, 1, 2, 3, 4, 5, 6, 7):
-        raise ValueError("Invalid UCI!")
-    if t_file not in (0, 1, 2, 3, 4, 5, 6, 7):
-        raise ValueError("Invalid UCI!")
-
-    from_sq = f_rank * 8 + f_file
-    to_sq = t_rank * 8 + t_file
 
-    flags = FLAG_NONE
     if len(uci) == 5:
-        promo = uci[4].lower()
-        if promo == "q":
-            flags |= FLAG_PROMO_Q
-        elif promo == "r":
-            flags |= FLAG_PROMO_R
-        elif promo == "b":
-            flags |= FLAG_PROMO_B
-        elif promo == "n":
-            flags |= FLAG_PROMO_N
+        move |= UCI_PROMO_FLAGS.get(uci[4].lower(), FLAG_NONE) << MOVE_FLAGS_SHIFT
 
-    return from_sq, to_sq, flags
+    return move
 
 
 def square_to_notation(sq: int) -> str:
@@ -148,3 +127,44 @@ def piece_str_to_flag(p: str) -> int:
     p_lower = p.lower()
     flag |= CHAR_TO_PIECE.get(p_lower, 0)
     return flag
+
+
+def promotion_piece(flags: int, color: int) -> int:
+    if flags & FLAG_PROMO_N:
+        return KNIGHT | color
+    if flags & FLAG_PROMO_B:
+        return BISHOP | color
+    if flags & FLAG_PROMO_R:
+        return ROOK | color
+    return QUEEN | color
+
+
+def capture_score(board: list[int], move: int) -> int:
+    """
+    MVV-LVA: most valuable victim first, cheapest attacker among equal victims.
+    """
+    flags = move >> MOVE_FLAGS_SHIFT
+    attacker = board[move & 63]
+    if flags & FLAG_EN_PASSANT:
+        victim_value = PIECE_VALUE_TABLE[PAWN | WHITE]
+    else:
+        victim_value = PIECE_VALUE_TABLE[board[move >> 6 & 63]]
+    score = victim_value * 10 - PIECE_VALUE_TABLE[attacker]
+    if flags & FLAG_PROMO_Q:
+        score += PIECE_VALUE_TABLE[QUEEN | WHITE] * 10
+    return score
+
+
+# score marking a capture that loses material, below any capture_score
+BAD_CAPTURE = -(1 << 30)
+
+
+def is_bad_capture(board_items, move: int) -> bool:
+    """
+    Capture that loses material by static exchange. Only a more valuable piece taking a
+    less valuable one can lose, so the exchange is not evaluated for any other capture.
+    """
+    board = board_items.board
+    if move & MOVE_PROMO_Q or PIECE_VALUE_TABLE[board[move & 63]] <= PIECE_VALUE_TABLE[board[move >> 6 & 63]]:
+        return False
+    return board_items.see(move) < 0
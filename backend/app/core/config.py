@@ -5,6 +5,7 @@ class Settings(BaseSettings):
     app_name: str = "Bukochess Backend"
     api_v1_prefix: str = "/api/v1"
     debug: bool = True
+    move_cache_entries: int = 32_768
 
     class Config:
         env_file = ".env"
@@ -15,6 +15,7 @@ from app.core.exceptions import BukochessException
 from app.api.v1.position import router as position_router
 from app.api.v1.game import router as game_router
 from app.api.v1.engine import router as engine_router
+from app.chess.move_mailbox import MoveMailBoxGenerator
 
 logger = get_logger(__name__)
 
@@ -22,6 +23,7 @@ logger = get_logger(__name__)
 def create_application() -> FastAPI:
     app = FastAPI(title=settings.app_name, debug=settings.debug)
     logger.info("Starting Bukochess backend...")
+    MoveMailBoxGenerator._moves_cache.resize(settings.move_cache_entries)
 
     # Routers
     app.include_router(health_router, prefix=settings.api_v1_prefix)
@@ -15,3 +15,23 @@ def test_engine_random_move():
     assert res.status_code == 200
     assert "move" in res.json()
     assert "fen" in res.json()
+
+
+def test_engine_alphabeta_time_limit():
+    res = client.post("/api/v1/engine/move", json={
+        "fen": START_FEN,
+        "engine": "alphabeta",
+        "seed": 1,
+        "time_limit": 0.2,
+    })
+    assert res.status_code == 200
+    assert res.json()["move"]
+
+
+def test_engine_time_limit_must_be_positive():
+    res = client.post("/api/v1/engine/move", json={
+        "fen": START_FEN,
+        "engine": "alphabeta",
+        "time_limit": 0,
+    })
+    assert res.status_code == 422
@@ -72,6 +72,24 @@ def test_legal_moves_from_e2():
     assert len(data["moves"]) == 2
 
 
+def test_legal_moves_from_pinned_piece():
+    resp = client.post("/api/v1/position/legal-moves", json={
+        "fen": "4k3/4r3/8/8/8/8/4N3/4K3 w - - 0 1",
+        "square": "e2",
+    })
+    assert resp.status_code == 200
+    assert resp.json()["moves"] == []
+
+
+def test_legal_moves_from_square_in_check():
+    resp = client.post("/api/v1/position/legal-moves", json={
+        "fen": "4k3/8/8/8/7b/5Q2/8/4K3 w - - 0 1",
+        "square": "f3",
+    })
+    assert resp.status_code == 200
+    assert sorted(resp.json()["moves"]) == ["f3f2", "f3g3"]
+
+
 def test_legal_moves_start_position():
     resp = client.post("/api/v1/position/legal-moves", json={
         "fen": START_FEN,
@@ -94,6 +94,41 @@ TEST_POSITIONS = {
         "is_checkmate": False,
         "is_stalemate": False,
         "is_threefold_rep": False
+    },
+    "en_passant_horizontal_pin": {
+        "fen": "8/8/8/KPp4r/8/8/8/7k w - c6 0 1",
+        "expected_moves": 4,
+        "is_checkmate": False,
+        "is_stalemate": False,
+        "is_threefold_rep": False
+    },
+    "pinned_knight_cannot_block": {
+        "fen": "4k3/8/8/8/1b6/8/3N4/r3K3 w - - 0 1",
+        "expected_moves": 2,
+        "is_checkmate": False,
+        "is_stalemate": False,
+        "is_threefold_rep": False
+    },
+    "rook_pinned_on_file": {
+        "fen": "4k3/4r3/8/8/8/8/4R3/4K3 w - - 0 1",
+        "expected_moves": 9,
+        "is_checkmate": False,
+        "is_stalemate": False,
+        "is_threefold_rep": False
+    },
+    "king_steps_off_check_ray": {
+        "fen": "4k3/8/5n2/8/8/8/4r3/4K3 w - - 0 1",
+        "expected_moves": 3,
+        "is_checkmate": False,
+        "is_stalemate": False,
+        "is_threefold_rep": False
+    },
+    "queen_blocks_rank_check": {
+        "fen": "4k3/8/8/1b6/8/8/4Q3/r3K3 w - - 0 1",
+        "expected_moves": 3,
+        "is_checkmate": False,
+        "is_stalemate": False,
+        "is_threefold_rep": False
     }
 
 }
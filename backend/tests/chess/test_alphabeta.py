@@ -1,3 +1,5 @@
+import time
+
 import pytest
 from app.chess.move_mailbox import MoveMailBoxGenerator as MoveGenerator, BoardMailbox as Board
 from app.chess.engines.alphabeta import AlphaBeta
@@ -60,3 +62,142 @@ def test_best_move_1():
         gen.apply_uci(move)
         gen.board.print_board()
     a = 33
+
+
+def test_time_limit_returns_last_completed_depth():
+    fen = "r1bq2r1/b4pk1/p1pp1p2/1p2pP2/1P2P1PB/3P4/1PPQ2P1/R3K2R w - - 0 1"
+    board = Board()
+    board.from_fen(fen)
+    eng = AlphaBeta(seed=1, soft_limit=0.05, hard_limit=0.2)
+
+    start = time.perf_counter()
+    move = eng.choose_move(board)
+    elapsed = time.perf_counter() - start
+
+    assert move in [to_uci(m) for m in MoveGenerator(board).legal_moves()]
+    assert eng.completed_depth >= 1
+    assert elapsed < 1.0
+    # a stopped search leaves the position as it was
+    assert board.to_fen() == fen
+    assert board.hash == board.compute_hash()
+
+
+def test_stopped_iteration_is_discarded():
+    board = Board()
+    board.from_fen("rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1")
+    eng = AlphaBeta(10, seed=1, soft_limit=10, hard_limit=0.001)
+
+    move = eng.choose_move(board)
+
+    assert eng.stopped
+    assert 1 <= eng.completed_depth < 10
+    assert move is not None
+
+
+def test_iterative_deepening_stops_at_mate():
+    fen = "rnbqkb1r/ppppp2p/8/5p2/4P3/8/PPPP1PPP/RNBQKBNR w KQkq - 0 1"
+    board = Board()
+    board.from_fen(fen)
+    eng = AlphaBeta(4)
+
+    assert eng.choose_move(board) == "d1h5"
+    assert eng.completed_depth == 2
+
+
+@pytest.mark.parametrize("fen", [
+    "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1",
+    "2r3k1/p4p2/3Rp2p/1p2P1pK/8/1P4P1/P3Q2P/1q6 b - - 0 1",
+    "r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1",
+])
+def test_root_window_matches_full_window(fen):
+    board = Board()
+    board.from_fen(fen)
+    gen = MoveGenerator(board)
+    moves = gen.legal_moves()
+    full = {}
+    for m in moves:
+        gen.apply(m)
+        full[m] = -AlphaBeta(2).negamax(gen, 1, -float("inf"), float("inf"), ply=1)
+        gen.undo(m)
+    best = max(full.values())
+
+    value, best_moves, _ = AlphaBeta(2).search_root(gen, moves, 2)
+    assert value == best
+    assert full[best_moves[0]] == best
+
+    value, best_moves, _ = AlphaBeta(2, random_ties=True).search_root(gen, moves, 2)
+    assert value == best
+    assert sorted(best_moves) == sorted(m for m in moves if full[m] == best)
+
+
+def test_principal_variation_is_a_legal_line():
+    fen = "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1"
+    board = Board()
+    board.from_fen(fen)
+    eng = AlphaBeta(4)
+
+    move = eng.choose_move(board)
+
+    assert len(eng.pv) == 4
+    assert to_uci(eng.pv[0]) == move
+    gen = MoveGenerator(board)
+    for m in eng.pv:
+        assert m in gen.legal_moves()
+        gen.apply(m)
+
+
+def test_principal_variation_of_mate():
+    fen = "r1bq2r1/b4pk1/p1pp1p2/1p2pP2/1P2P1PB/3P4/1PPQ2P1/R3K2R w - - 0 1"
+    board = Board()
+    board.from_fen(fen)
+    eng = AlphaBeta(4)
+
+    eng.choose_move(board)
+
+    assert [to_uci(m) for m in eng.pv] == ["d2h6", "g7h6", "h4f6"]
+
+
+@pytest.mark.parametrize("offset, fails", [(0, (0, 0)), (-300, (1, 0)), (300, (0, 1))])
+def test_aspiration_window_widens_to_the_full_window_score(offset, fails):
+    board = Board()
+    board.from_fen("r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1")
+    gen = MoveGenerator(board)
+    moves = gen.legal_moves()
+    value, _, _ = AlphaBeta(3).search_root(gen, moves, 3)
+
+    eng = AlphaBeta(3)
+    result = eng.search_aspiration(gen, moves, 3, value + offset)
+
+    assert result[0] == value
+    assert (min(eng.fail_highs, 1), min(eng.fail_lows, 1)) == fails
+
+
+def test_aspiration_can_be_disabled():
+    board = Board()
+    board.from_fen("rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1")
+    eng = AlphaBeta(4, aspiration_delta=None)
+
+    eng.choose_move(board)
+
+    assert eng.fail_highs == eng.fail_lows == 0
+
+
+def test_null_move_pruning_keeps_the_mate():
+    fen = "r1bq2r1/b4pk1/p1pp1p2/1p2pP2/1P2P1PB/3P4/1PPQ2P1/R3K2R w - - 0 1"
+    board = Board()
+    board.from_fen(fen)
+    eng = AlphaBeta(4)
+
+    assert eng.choose_move(board) == "d2h6"
+    assert eng.null_cutoffs > 0
+    assert board.to_fen() == fen
+
+
+def test_no_null_move_with_only_pawns():
+    board = Board()
+    board.from_fen("8/4k3/2p1p3/2P1P3/8/4K3/8/8 w - - 0 1")
+    eng = AlphaBeta(5)
+
+    eng.choose_move(board)
+
+    assert eng.null_cutoffs == 0
@@ -0,0 +1,85 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from app.chess.batch import PositionBatch
+from app.chess.board_mailbox import BoardMailbox
+from app.chess.move_mailbox import MoveMailBoxGenerator
+from app.chess.static import WHITE, BLACK
+from tests.chess.test_perft_raw import load_perft_lines, parse_perft_line
+
+
+def child_fens(fen: str) -> list[str]:
+    board = BoardMailbox()
+    board.from_fen(fen)
+    gen = MoveMailBoxGenerator(board)
+    fens = []
+    for move in gen.generate_legal_moves(board.active_color):
+        gen.apply(move)
+        fens.append(board.to_fen())
+        gen.undo(move)
+    return fens
+
+
+PERFT_CASES = [parse_perft_line(line) for line in load_perft_lines()]
+# roots and every position one move in: both colors to move, checks, pins, castling
+FENS = [fen for fen, _ in PERFT_CASES] + [child for fen, _ in PERFT_CASES for child in child_fens(fen)]
+
+
+def test_legal_move_counts_match_perft_depth_one():
+    cases = [(fen, dict(depth_nodes)[1]) for fen, depth_nodes in PERFT_CASES if dict(depth_nodes).get(1)]
+    batch = PositionBatch.from_fens([fen for fen, _ in cases])
+    expected = [count for _, count in cases]
+
+    assert batch.legal_move_counts().tolist() == expected
+
+
+def test_legal_move_counts_match_scalar():
+    batch = PositionBatch.from_fens(FENS)
+    counts = batch.legal_move_counts()
+
+    for fen, count in zip(FENS, counts):
+        board = BoardMailbox()
+        board.from_fen(fen)
+        assert count == len(MoveMailBoxGenerator(board).generate_legal_moves(board.active_color)), fen
+
+
+def test_attacks_targets_and_checks_match_scalar():
+    batch = PositionBatch.from_fens(FENS)
+    white_attacks = batch.attack_counts(WHITE)
+    black_attacks = batch.attack_counts(BLACK)
+    targets = batch.target_masks()
+    in_check = batch.in_check()
+
+    for i, fen in enumerate(FENS):
+        board = BoardMailbox()
+        board.from_fen(fen)
+        for sq in range(64):
+            assert bool(white_attacks[i, sq]) == board.is_square_attacked(sq, WHITE), (fen, sq)
+            assert bool(black_attacks[i, sq]) == board.is_square_attacked(sq, BLACK), (fen, sq)
+        legal_targets = {m >> 6 & 63 for m in MoveMailBoxGenerator(board).generate_legal_moves(board.active_color)}
+        assert legal_targets <= set(np.flatnonzero(targets[i]).tolist()), fen
+        assert in_check[i] == board.is_king_in_check, fen
+
+
+def test_attack_counts_count_every_attacker():
+    batch = PositionBatch.from_fens(["4k3/8/8/8/8/2N5/8/R2QK3 w - - 0 1"])
+    counts = batch.attack_counts(WHITE)
+
+    assert counts[0, 19] == 1  # d3: queen
+    assert counts[0, 1] == 3  # b1: rook, knight and queen
+    assert counts[0, 2] == 2  # c1: rook and queen
+    assert counts[0, 11] == 2  # d2: queen and king
+
+
+@pytest.mark.parametrize("fen", [
+    "8/8/8/8/8/8/8/8 x - - 0 1",
+    "rnbqkbnr/pppppppp/9/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1",
+    "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNX w KQkq - 0 1",
+    "rnbqkbnP/pppppppp/8/8/8/8/PPPPPPP1/RNBQKBNR w KQkq - 0 1",
+    "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0",
+    "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq e4 0 1",
+])
+def test_invalid_fen_raises(fen):
+    with pytest.raises(ValueError):
+        PositionBatch.from_fens(["4k3/8/8/8/8/8/8/4K3 w - - 0 1", fen])
@@ -0,0 +1,114 @@
+import pytest
+from app.chess.board_bitboard import BoardBitboard
+from app.chess.board_mailbox import BoardMailbox
+from app.chess.move_bitboard import MoveBitboardGenerator
+from app.chess.engines.alphabeta import AlphaBeta
+from app.chess.perft import perft
+from app.chess.utils import to_uci
+from tests.chess.move_generator_cases import TEST_POSITIONS
+from tests.chess.test_perft_raw import load_perft_lines, parse_perft_line, MAX_TEST_DEPTH
+
+
+@pytest.mark.parametrize("line", load_perft_lines())
+def test_perft_bitboard(line):
+    fen, depth_nodes = parse_perft_line(line)
+
+    board = BoardBitboard()
+    board.from_fen(fen)
+    old_hash = board.hash
+    gen = MoveBitboardGenerator(board)
+    for depth, expected in depth_nodes:
+        if depth > MAX_TEST_DEPTH:
+            break
+        result = perft(gen, depth)
+        assert result == expected, (
+            f"Perft failed\n"
+            f"FEN: {fen}\n"
+            f"Depth: {depth}\n"
+            f"Expected: {expected}, Got: {result}"
+        )
+    assert old_hash == board.hash
+    assert board.to_fen() == fen
+
+
+@pytest.mark.parametrize("name", TEST_POSITIONS.keys())
+def test_same_moves_as_mailbox(name):
+    fen = TEST_POSITIONS[name]["fen"]
+    board = BoardBitboard()
+    board.from_fen(fen)
+    mailbox = BoardMailbox()
+    mailbox.from_fen(fen)
+
+    moves = sorted(to_uci(m) for m in MoveBitboardGenerator(board).legal_moves())
+    expected = sorted(to_uci(m) for m in mailbox.move_generator().legal_moves())
+
+    assert moves == expected
+    assert board.score == mailbox.score
+    assert board.is_checkmate() == mailbox.is_checkmate()
+    assert board.is_stalemate() == mailbox.is_stalemate()
+
+
+@pytest.mark.parametrize("fen", [pos["fen"] for pos in TEST_POSITIONS.values()] + [
+    "n1n5/PPPk4/8/8/8/8/4Kppp/5N1N b - - 0 1",
+    "4k3/8/8/2KPp2r/8/8/8/8 w - e6 0 2",
+    "4k3/1P6/8/8/1b6/8/3P4/4K3 w - - 0 1",
+])
+def test_count_legal_moves_bitboard(fen):
+    board = BoardBitboard()
+    board.from_fen(fen)
+    gen = MoveBitboardGenerator(board)
+
+    assert gen.count_legal_moves() == len(gen.legal_moves())
+
+
+def test_apply_undo_keeps_bitboards_in_sync():
+    fen = "r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1"
+    board = BoardBitboard()
+    board.from_fen(fen)
+    gen = MoveBitboardGenerator(board)
+
+    for m in gen.legal_moves():
+        gen.apply(m)
+        assert board.hash == board.compute_hash()
+        assert board.score == board.calculate_total_score()
+        for sq, piece in enumerate(board.board):
+            if piece:
+                assert board.pieces[piece] & (1 << sq)
+        gen.undo(m)
+
+    assert board.to_fen() == fen
+    assert board.position_counts == {}
+
+
+def test_null_move_bitboard():
+    fen = "rnbqkb1r/pppp1ppp/5n2/3Pp3/8/8/PPP1PPPP/RNBQKBNR w KQkq e6 0 3"
+    board = BoardBitboard()
+    board.from_fen(fen)
+    gen = MoveBitboardGenerator(board)
+
+    gen.apply_null()
+    assert board.to_fen().split()[1:4] == ["b", "KQkq", "-"]
+    assert board.hash == board.compute_hash()
+    for m in gen.legal_moves():
+        gen.apply(m)
+        gen.undo(m)
+    gen.undo_null()
+
+    assert board.to_fen() == fen
+    assert board.hash == board.compute_hash()
+    assert board.undo_stack == []
+
+
+def test_legal_captures_bitboard():
+    board = BoardBitboard()
+    board.from_fen("rnbqkb1r/pppp1ppp/5n2/3Pp3/8/8/PPP1PPPP/RNBQKBNR w KQkq e6 0 3")
+    captures = [to_uci(m) for m in MoveBitboardGenerator(board).legal_captures()]
+
+    assert captures == ["d5e6"]
+
+
+def test_alphabeta_on_bitboard():
+    board = BoardBitboard()
+    board.from_fen("rnbqkb1r/ppppp2p/8/5p2/4P3/8/PPPP1PPP/RNBQKBNR w KQkq - 0 1")
+
+    assert AlphaBeta(2).choose_move(board) == "d1h5"
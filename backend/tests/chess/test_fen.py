@@ -1,5 +1,9 @@
 import pytest
 from app.chess.board_array import BoardArray
+from app.chess.board_mailbox import BoardMailbox, PACKED_SIZE
+from app.chess.move_mailbox import MoveMailBoxGenerator
+from app.chess.static import WHITE, BLACK, PAWN, COMBINED_TABLE
+from app.chess.utils import from_uci_move
 from tests.chess.fen_cases import VALID_FENS, INVALID_FENS, ADVANCED_VALID_FENS, ADVANCED_INVALID_FENS
 
 
@@ -41,3 +45,67 @@ def test_fen_round_trip(name, fen):
 
     valid, msg = BoardArray.validate_fen(out_fen)
     assert valid is True, f"Round-trip failed for {name}: {msg}"
+
+
+@pytest.mark.parametrize("name,fen", VALID_FENS.items())
+def test_packed_round_trip(name, fen):
+    board = BoardMailbox()
+    board.from_fen(fen)
+    data = board.to_bytes()
+
+    loaded = BoardMailbox()
+    loaded.from_bytes(data)
+
+    assert len(data) == PACKED_SIZE
+    assert data.startswith(board.position_key())
+    assert loaded.to_fen() == fen
+    assert loaded.hash == board.hash
+    assert loaded.score == board.score
+
+
+@pytest.mark.parametrize("data", [
+    b"",
+    bytes(PACKED_SIZE - 1),
+    bytes([3] * 64) + bytes(PACKED_SIZE - 64),  # no such piece
+    bytes(64) + bytes([WHITE | BLACK]) + bytes(PACKED_SIZE - 65),  # no side to move
+])
+def test_from_bytes_invalid(data):
+    with pytest.raises(ValueError):
+        BoardMailbox().from_bytes(data)
+
+
+def test_copy_is_independent_and_keeps_history():
+    board = BoardMailbox()
+    board.from_fen("4k1n1/8/8/8/8/8/8/4K1N1 w - - 0 1")
+    gen = MoveMailBoxGenerator(board)
+    shuffle = [from_uci_move(m) for m in ("g1f3", "g8f6", "f3g1", "f6g8")]
+    played = shuffle * 2 + shuffle[:3]
+    fens = []
+    for move in played:
+        fens.append(board.to_fen())
+        gen.apply(move)
+    fen = board.to_fen()
+
+    other = board.copy()
+    other_gen = MoveMailBoxGenerator(other)
+    other_gen.apply(shuffle[3])
+
+    assert other.is_threefold_repetition() is True
+    assert board.to_fen() == fen
+    assert (board.ply, other.ply) == (11, 12)
+
+    other_gen.undo(shuffle[3])
+    for move, before in zip(reversed(played), reversed(fens)):
+        other_gen.undo(move)
+        assert other.to_fen() == before
+    assert other.hash == other.compute_hash()
+    assert board.to_fen() == fen
+
+
+def test_board_is_slotted_and_tables_ready():
+    board = BoardMailbox()
+
+    assert not hasattr(board, "__dict__")
+    with pytest.raises(AttributeError):
+        board.undo_stack = []
+    assert COMBINED_TABLE[WHITE | PAWN][8] != 0
@@ -1,9 +1,9 @@
 import pytest
 from app.chess.board_mailbox import BoardMailbox as Board
-from app.chess.move_flags import FLAG_NONE, FLAG_CAPTURE, FLAG_EN_PASSANT
+from app.chess.move_flags import FLAG_NONE, FLAG_CAPTURE, FLAG_EN_PASSANT, encode_move
 from app.chess.move_mailbox import MoveMailBoxGenerator as MoveGenerator
 from app.chess.static import PAWN, WHITE, BLACK
-from app.chess.utils import sq, square_to_notation
+from app.chess.utils import sq, square_to_notation, to_uci
 
 
 def test_apply_undo_normal_move():
@@ -11,7 +11,7 @@ def test_apply_undo_normal_move():
     board = Board()
     board.from_fen("rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1")
     gen = MoveGenerator(board)
-    move = (sq(1, 4), sq(3, 4), FLAG_NONE)  # e2 -> e4
+    move = encode_move(sq(1, 4), sq(3, 4), FLAG_NONE)  # e2 -> e4
     gen.apply(move)
 
     # Assertions
@@ -32,7 +32,7 @@ def test_apply_undo_capture():
     gen = MoveGenerator(board)
 
     # e4 captures d5
-    move = (3 * 8 + 4, 4 * 8 + 3, FLAG_CAPTURE)
+    move = encode_move(3 * 8 + 4, 4 * 8 + 3, FLAG_CAPTURE)
     gen.apply(move)
 
     # After apply
@@ -75,9 +75,55 @@ def test_apply_undo_en_passant():
     board.from_fen("r1bqkbnr/pppp1ppp/2n5/3Pp3/8/8/PPP1PPPP/RNBQKBNR w KQkq e6 0 3")  # White to move
     gen = MoveGenerator(board)
     # White pawn moves d5->d6 (already en passant target set to e6 in FEN, meaning en passant has to go away)
-    move1 = (sq(4, 3), sq(5, 3), FLAG_NONE)
+    move1 = encode_move(sq(4, 3), sq(5, 3), FLAG_NONE)
     gen.apply(move1)
     assert 1 > board.en_passant
     # assert board.en_passant is None or board.en_passant == "-"  # updated internally
     gen.undo(move1)
     assert "e6" == square_to_notation(board.en_passant)
+
+
+def test_piece_squares_follow_apply_undo():
+    # castling, en passant, promotions and captures from one position
+    fen = "r3k2r/1P6/8/3Pp3/8/8/8/R3K2R w KQkq e6 0 1"
+    board = Board()
+    board.from_fen(fen)
+    gen = MoveGenerator(board)
+
+    def scanned(color):
+        return {sq for sq in range(64) if board.board[sq] and board.board[sq] & color}
+
+    for m in gen.legal_moves():
+        gen.apply(m)
+        assert board.piece_squares[WHITE] == scanned(WHITE), to_uci(m)
+        assert board.piece_squares[BLACK] == scanned(BLACK), to_uci(m)
+        gen.undo(m)
+
+    assert board.piece_squares[WHITE] == scanned(WHITE)
+    assert board.piece_squares[BLACK] == scanned(BLACK)
+    assert board.to_fen() == fen
+
+
+def test_attack_map_follows_apply_undo():
+    fen = "r3k2r/1P6/8/3Pp3/8/8/8/R3K2R w KQkq e6 0 1"
+    board = Board()
+    board.from_fen(fen)
+    gen = MoveGenerator(board)
+
+    def scanned(color):
+        # the map leaves the other king out
+        king_sq = board.black_king if color == WHITE else board.white_king
+        king = board.board[king_sq]
+        board.board[king_sq] = 0
+        attacked = [board.is_square_attacked(sq, color) for sq in range(64)]
+        board.board[king_sq] = king
+        return attacked
+
+    for m in gen.legal_moves():
+        gen.apply(m)
+        for color in (WHITE, BLACK):
+            assert [n > 0 for n in board.attack_map(color)] == scanned(color), to_uci(m)
+        gen.undo(m)
+        assert [n > 0 for n in board.attack_map(WHITE)] == scanned(WHITE), to_uci(m)
+
+    assert board.to_fen() == fen
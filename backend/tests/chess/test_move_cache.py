@@ -0,0 +1,75 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from app.chess.board_mailbox import BoardMailbox
+from app.chess.move_cache import MoveCache
+from app.chess.move_flags import encode_move
+from app.chess.move_mailbox import MoveMailBoxGenerator
+from app.chess.utils import to_uci
+
+
+def test_lru_eviction_and_counters():
+    cache = MoveCache(max_entries=2)
+    cache.put(1, b"a", [encode_move(0, 1)])
+    cache.put(2, b"b", [encode_move(0, 2)])
+    assert cache.get(1, b"a") == [encode_move(0, 1)]  # 1 is now most recent
+
+    cache.put(3, b"c", [encode_move(0, 3)])
+
+    assert cache.get(2, b"b") is None
+    assert cache.get(1, b"a") == [encode_move(0, 1)]
+    assert cache.get(3, b"c") == [encode_move(0, 3)]
+    assert len(cache) == 2
+    assert cache.stats() == {"entries": 2, "max_entries": 2, "hits": 3, "misses": 1, "evictions": 1}
+
+
+def test_hash_collision_is_a_miss():
+    cache = MoveCache()
+    cache.put(42, b"position one", [encode_move(12, 28)])
+
+    assert cache.get(42, b"position two") is None
+    assert cache.misses == 1
+
+
+def test_resize_evicts_oldest():
+    cache = MoveCache(max_entries=4)
+    for key in range(4):
+        cache.put(key, bytes([key]), [])
+
+    cache.resize(1)
+
+    assert len(cache) == 1
+    assert cache.get(3, bytes([3])) == []
+    assert cache.evictions == 3
+
+
+def test_generator_ignores_colliding_entry():
+    board = BoardMailbox()
+    board.from_fen("rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1")
+    other = BoardMailbox()
+    other.from_fen("4k3/8/8/8/8/8/8/4K3 w - - 0 1")
+
+    # poison the slot of the start position with another position's moves
+    cache = MoveMailBoxGenerator._moves_cache
+    cache.put(board.hash, other.position_key(), MoveMailBoxGenerator(other).generate_legal_moves(other.active_color))
+
+    moves = MoveMailBoxGenerator(board).legal_moves()
+
+    assert len(moves) == 20
+    assert "e2e4" in [to_uci(m) for m in moves]
+
+
+def test_concurrent_access_stays_bounded():
+    cache = MoveCache(max_entries=64)
+
+    def worker(offset):
+        for key in range(offset, offset + 500):
+            cache.put(key, bytes([key % 256]), [])
+            cache.get(key - 3, bytes([(key - 3) % 256]))
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        list(pool.map(worker, range(0, 4000, 500)))
+
+    stats = cache.stats()
+    assert stats["entries"] == 64
+    assert stats["hits"] + stats["misses"] == 4000
+    assert stats["evictions"] == 4000 - 64
@@ -4,9 +4,12 @@ from tokenize import generate_tokens
 import pytest
 
 from app.chess.board_mailbox import BoardMailbox as Board
+from app.chess.move_buffers import MoveBuffers
 from app.chess.move_mailbox import MoveMailBoxGenerator as MoveGenerator
 from tests.chess.move_generator_cases import TEST_POSITIONS
 from app.chess.static import *
+from app.chess.move_flags import FLAG_NONE, MOVE_CAPTURE, MOVE_CASTLE_K, MOVE_CASTLE_Q, MOVE_PROMO_Q, \
+    encode_move, decode_move
 from app.chess.utils import piece_flag_to_str, piece_str_to_flag, to_uci
 
 
@@ -101,7 +104,7 @@ from app.chess.utils import sq, rank_x, file_y
 def tetst_pawn_block():
     fen = "r3k2r/8/8/8/8/8/8/2R1K2R w Kkq - 0 1"
 
-    m = (sq(1, 3), sq(3, 3), 0)
+    m = encode_move(sq(1, 3), sq(3, 3))
     possible_moves = 3
     board = Board()
     board.from_fen(fen)
@@ -110,7 +113,7 @@ def tetst_pawn_block():
     n_m = []
     m_m = generator.legal_moves()
     for m in generator.legal_moves():
-        xy, nxy, flags = m
+        xy, nxy, flags = decode_move(m)
         print(f"{rank_x(xy)}, {file_y(xy)} - {rank_x(nxy)}, {file_y(nxy)}")
         generator.apply(m)
         n_m = generator.legal_moves()
@@ -202,3 +205,278 @@ def test_legal_moves_basic(name):
         assert board.is_threefold_repetition() == pos["is_threefold_rep"], (
             f"{name}: expected is_threefold_rep = {pos["is_threefold_rep"]}"
         )
+
+
+@pytest.mark.parametrize("name", TEST_POSITIONS.keys())
+def test_move_picker_yields_every_legal_move_once(name):
+    board = Board()
+    board.from_fen(TEST_POSITIONS[name]["fen"])
+    generator = MoveGenerator(board)
+    legal = generator.generate_legal_moves(board.active_color)
+    quiets = [m for m in legal if not m & (MOVE_CAPTURE | MOVE_PROMO_Q)]
+    tt_move = legal[-1] if legal else None
+
+    picked = list(generator.move_picker(tt_move, tuple(quiets[:2])))
+
+    assert sorted(picked) == sorted(legal)
+    if legal:
+        assert picked[0] == tt_move
+
+
+def test_move_picker_stage_order():
+    board = Board()
+    board.from_fen("r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1")
+    generator = MoveGenerator(board)
+    killer = encode_move(1, 0, FLAG_NONE)  # b1a1 is not legal here and must be skipped
+    quiet_killer = encode_move(4, 5, FLAG_NONE)
+
+    picked = [to_uci(m) for m in generator.move_picker(encode_move(21, 37, FLAG_NONE), (killer, quiet_killer))]
+
+    assert picked[0] == "f3f5"  # hash move
+    # winning and even captures by MVV-LVA
+    assert picked[1] == "e2a6"
+    assert sorted(picked[2:4]) == ["d5e6", "g2h3"]
+    assert picked[4] == "e1f1"  # killer
+    # captures losing material come after every quiet move, still by MVV-LVA
+    assert picked[-5] == "f3f6"
+    assert sorted(picked[-4:-1]) == ["e5d7", "e5f7", "e5g6"]
+    assert picked[-1] == "f3h3"
+    assert len(picked) == 48
+    assert "b1a1" not in picked
+
+
+def test_move_picker_skips_quiets_on_cutoff():
+    board = Board()
+    board.from_fen("rnbqkbnr/pppp1ppp/8/4p3/3P4/8/PPP1PPPP/RNBQKBNR w KQkq - 0 2")
+    generator = MoveGenerator(board)
+    calls = []
+    generator.legal_moves = lambda: calls.append(1) or []
+
+    picker = generator.move_picker()
+
+    assert to_uci(next(picker)) == "d4e5"
+    assert calls == []
+
+
+@pytest.mark.parametrize("fen", [pos["fen"] for pos in TEST_POSITIONS.values()] + [
+    "r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1",
+    "n1n5/PPPk4/8/8/8/8/4Kppp/5N1N b - - 0 1",
+    "8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - - 0 1",
+    "4k3/8/8/2KPp2r/8/8/8/8 w - e6 0 2",
+])
+def test_legal_captures_match_full_generation(fen):
+    board = Board()
+    board.from_fen(fen)
+    generator = MoveGenerator(board)
+
+    expected = [m for m in generator.generate_legal_moves(board.active_color) if m & (MOVE_CAPTURE | MOVE_PROMO_Q)]
+
+    assert sorted(generator.legal_captures()) == sorted(expected)
+    assert board.to_fen() == fen
+
+
+@pytest.mark.parametrize("fen", [pos["fen"] for pos in TEST_POSITIONS.values()] + [
+    "r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1",
+    "n1n5/PPPk4/8/8/8/8/4Kppp/5N1N b - - 0 1",
+    "4k3/8/8/2KPp2r/8/8/8/8 w - e6 0 2",
+    "4k3/8/8/8/1b6/8/3P4/4K3 w - - 0 1",
+])
+def test_count_legal_moves_matches_generation(fen):
+    board = Board()
+    board.from_fen(fen)
+    generator = MoveGenerator(board)
+    MoveGenerator._moves_cache.clear()
+
+    assert generator.count_legal_moves() == len(generator.generate_legal_moves(board.active_color))
+    assert board.to_fen() == fen
+
+
+@pytest.mark.parametrize("fen", [
+    "4k3/8/8/b7/8/8/1PP5/4K1N1 w - - 0 1",  # interposition by single and double push
+    "4k3/8/8/8/8/5n2/8/4K2r w - - 0 1",  # double check
+    "4k3/8/8/8/1b6/8/3R4/r3K3 w - - 0 1",  # the pinned rook may not block on d1
+    "8/8/8/2k5/3Pp3/8/8/4K3 b - d3 0 1",  # en passant takes the checker
+    "1r2k3/P7/8/8/8/8/8/1K6 w - - 0 1",  # capture-promotion of the checker
+])
+def test_evasions_match_brute_force(fen):
+    board = Board()
+    board.from_fen(fen)
+    generator = MoveGenerator(board)
+    color = board.active_color
+    assert board.precompute_is_king_in_check(color)
+
+    pseudo = []
+    enemy_king = board.find_king(color ^ COLOR)
+    for sq_from in list(board.piece_squares[color]):
+        generator.generate_piece_moves(sq_from, board.board[sq_from], enemy_king, pseudo)
+    expected = []
+    for move in pseudo:
+        generator.apply(move)
+        if not board.precompute_is_king_in_check(color):
+            expected.append(move)
+        generator.undo(move)
+
+    assert sorted(generator.generate_legal_moves(color)) == sorted(expected)
+    assert board.to_fen() == fen
+
+
+VALIDATION_FENS = [pos["fen"] for pos in TEST_POSITIONS.values()] + [
+    "r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1",
+    "r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R b KQkq - 0 1",
+    "n1n5/PPPk4/8/8/8/8/4Kppp/5N1N b - - 0 1",
+    "8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - - 0 1",
+    "4k3/8/8/2KPp2r/8/8/8/8 w - e6 0 2",
+    "4k3/8/8/8/1b6/8/3R4/r3K3 w - - 0 1",
+]
+
+
+@pytest.mark.parametrize("fen", VALIDATION_FENS)
+def test_move_validation_matches_generation(fen):
+    # moves of every test position, most of them foreign to this one
+    candidates = set()
+    for other in VALIDATION_FENS:
+        board = Board()
+        board.from_fen(other)
+        candidates.update(MoveGenerator(board).generate_legal_moves(board.active_color))
+
+    board = Board()
+    board.from_fen(fen)
+    generator = MoveGenerator(board)
+    legal = set(generator.generate_legal_moves(board.active_color))
+
+    for move in candidates | legal:
+        valid = generator.is_pseudo_legal(move) and generator.is_legal(move)
+        assert valid == (move in legal), to_uci(move)
+    assert board.to_fen() == fen
+
+
+@pytest.mark.parametrize("fen, move", [
+    ("4k3/8/8/8/8/8/3K4/4R2N w - - 0 1", 4 | 6 << 6 | MOVE_CASTLE_K),  # rook e1-g1 would take the knight along
+    ("4k3/8/8/8/8/8/3K4/R3Q3 w - - 0 1", 4 | 2 << 6 | MOVE_CASTLE_Q),
+    ("r3r1k1/8/8/8/8/8/8/4K3 b - - 0 1", 60 | 58 << 6 | MOVE_CASTLE_Q),
+    ("4k3/8/8/8/8/8/8/4R1KR w - - 0 1", 4 | 5 << 6 | MOVE_CASTLE_K),
+])
+def test_castle_flag_on_non_king_is_rejected(fen, move):
+    board = Board()
+    board.from_fen(fen)
+    generator = MoveGenerator(board)
+
+    assert not generator.is_pseudo_legal(move)
+    assert not (generator.is_pseudo_legal(move) and generator.is_legal(move))
+    assert generator.is_pseudo_legal(move & 0xFFF)  # the plain slide is fine
+
+
+@pytest.mark.parametrize("fen", VALIDATION_FENS + ["4k3/8/8/8/8/8/3K4/4R2N w - - 0 1"])
+def test_move_picker_never_returns_illegal_hash_or_killer_moves(fen):
+    # moves of the other test positions, as from a hash collision or a sibling's killers
+    foreign = set()
+    for other in VALIDATION_FENS:
+        board = Board()
+        board.from_fen(other)
+        foreign.update(MoveGenerator(board).generate_legal_moves(board.active_color))
+    # castle flags on rooks and queens from the king squares
+    foreign.update(from_sq | to_sq << 6 | flag for from_sq, to_sq in ((4, 6), (4, 2), (60, 62), (60, 58))
+                   for flag in (MOVE_CASTLE_K, MOVE_CASTLE_Q))
+
+    board = Board()
+    board.from_fen(fen)
+    generator = MoveGenerator(board)
+    legal = set(generator.generate_legal_moves(board.active_color))
+    illegal = sorted(foreign - legal)
+
+    for i, move in enumerate(illegal):
+        killers = (illegal[i - 1], illegal[(i + 1) % len(illegal)])
+        picked = list(generator.move_picker(move, killers))
+        assert sorted(picked) == sorted(legal), to_uci(move)
+        assert board.to_fen() == fen
+
+
+@pytest.mark.parametrize("fen", VALIDATION_FENS)
+def test_legal_moves_from_square_matches_generation(fen):
+    board = Board()
+    board.from_fen(fen)
+    gen = MoveGenerator(board)
+    moves = gen.generate_legal_moves(board.active_color)
+
+    for sq in range(64):
+        expected = sorted(m for m in moves if m & 63 == sq)
+        assert sorted(gen.legal_moves_from_square(sq)) == expected, to_uci(sq | sq << 6)
+
+
+@pytest.mark.parametrize("fen", VALIDATION_FENS + [
+    "4k3/8/8/8/8/8/4B3/4R1K1 w - - 0 1",  # discovered check by the rook
+    "8/8/8/8/8/8/8/2k1K2R w K - 0 1",  # castling rook checks through the king's square
+    "5k2/8/8/8/8/8/8/4K2R w K - 0 1",  # castling rook checks on the f-file
+    "1r2k3/P7/8/8/8/8/8/4K3 w - - 0 1",  # promotions and capture-promotions
+    "8/8/8/K2pP2q/8/8/8/7k w - d6 0 1",  # en passant discovers nothing, captures into check
+    "8/8/8/R2pP2k/8/8/8/K7 w - d6 0 1",  # en passant opens the rank
+])
+def test_gives_check_matches_apply_undo(fen):
+    board = Board()
+    board.from_fen(fen)
+    if board.is_other_king_in_check:
+        pytest.skip("side not to move is in check")
+    gen = MoveGenerator(board)
+    info = gen.check_info(board.active_color)
+
+    for move in gen.generate_legal_moves(board.active_color):
+        gen.apply(move)
+        expected = board.is_king_in_check
+        gen.undo(move)
+        assert gen.gives_check(move, info) == expected, to_uci(move)
+        assert gen.gives_check(move) == expected, to_uci(move)
+
+
+@pytest.mark.parametrize("fen", VALIDATION_FENS)
+def test_null_move_round_trip(fen):
+    board = Board()
+    board.from_fen(fen)
+    gen = MoveGenerator(board)
+    color = board.active_color
+    in_check = board.is_king_in_check
+
+    gen.apply_null()
+    assert board.active_color == color ^ COLOR
+    assert board.en_passant == -1
+    assert board.hash == board.compute_hash()
+    # the cached check state belonged to the other side
+    assert board.is_other_king_in_check == in_check
+    if not board.is_other_king_in_check:
+        for m in gen.legal_moves():
+            gen.apply(m)
+            gen.undo(m)
+    gen.undo_null()
+
+    assert board.to_fen() == fen
+    assert board.hash == board.compute_hash()
+    assert board.ply == 0
+    assert board.is_king_in_check == in_check
+
+
+def test_legal_moves_with_checks():
+    board = Board()
+    board.from_fen("4k3/8/8/8/8/8/4B3/4R1K1 w - - 0 1")
+    gen = MoveGenerator(board)
+
+    moves = gen.legal_moves_with_checks()
+    checks = sorted(to_uci(m) for m, gives_check in moves if gives_check)
+
+    assert [m for m, _ in moves] == gen.legal_moves()
+    assert checks == ["e2a6", "e2b5", "e2c4", "e2d1", "e2d3", "e2f1", "e2f3", "e2g4", "e2h5"]
+    assert gen.order_moves(moves)[0][1]
+
+
+def test_move_picker_with_buffers():
+    board = Board()
+    board.from_fen("r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1")
+    generator = MoveGenerator(board)
+    buffers = MoveBuffers(plies=1)
+
+    expected = list(generator.move_picker())
+    picked = list(generator.move_picker(buffers=buffers.at(0)))
+
+    assert picked == expected
+    assert sorted(buffers.moves[0]) == sorted(generator.legal_captures())
+    # a deeper ply gets its own lists
+    assert buffers.at(3) == ([], [])
+    assert len(buffers.moves) == 4 and buffers.moves[0]
@@ -1,6 +1,6 @@
 import pytest
 from app.chess.board_mailbox import BoardMailbox as Board
-from app.chess.move_flags import FLAG_PROMOTION, FLAG_PROMO_Q, FLAG_PROMO_N, FLAG_NONE
+from app.chess.move_flags import FLAG_PROMOTION, FLAG_PROMO_Q, FLAG_PROMO_N, FLAG_NONE, encode_move
 from app.chess.move_mailbox import MoveMailBoxGenerator as MoveGenerator
 from app.chess.static import PAWN, WHITE, BLACK, QUEEN, KNIGHT, ROOK, BISHOP
 
@@ -10,7 +10,7 @@ def test_pawn_promotion_to_queen():
     board = Board()
     board.from_fen("8/P7/8/8/8/8/8/8 w - - 0 1")  # Pawn on a7
     gen = MoveGenerator(board)
-    move = (6 * 8, 7 * 8, FLAG_PROMO_Q)
+    move = encode_move(6 * 8, 7 * 8, FLAG_PROMO_Q)
     gen.apply(move)
 
     assert board.board[7 * 8] == (WHITE | QUEEN)
@@ -28,7 +28,7 @@ def test_pawn_promotion_to_knight():
     board = Board()
     board.from_fen("8/P7/8/8/8/8/8/8 w - - 0 1")  # Pawn on h7
     gen = MoveGenerator(board)
-    move = (6 * 8, 7 * 8, FLAG_PROMO_N)  # h7 -> h8=N
+    move = encode_move(6 * 8, 7 * 8, FLAG_PROMO_N)  # h7 -> h8=N
     gen.apply(move)
 
     assert board.board[7 * 8] == (WHITE | KNIGHT)
@@ -43,7 +43,7 @@ def test_en_passant_creation():
     fen_end = "rnbqkbnr/pppppppp/8/8/P7/8/1PPPPPPP/RNBQKBNR b KQkq a3 0 1"
     board.from_fen(fen)  # Black pawn on a2
     gen = MoveGenerator(board)
-    move = (8, 24, FLAG_NONE)
+    move = encode_move(8, 24, FLAG_NONE)
     gen.apply(move)
 
     assert board.to_fen() == fen_end
@@ -53,7 +53,7 @@ def test_black_pawn_promotion():
     board = Board()
     board.from_fen("8/8/8/8/8/8/p7/8 b - - 0 1")  # Black pawn on a2
     gen = MoveGenerator(board)
-    move = (8, 0, FLAG_PROMO_Q)
+    move = encode_move(8, 0, FLAG_PROMO_Q)
     gen.apply(move)
     assert board.board[0] == (BLACK | QUEEN)
     assert board.board[8] == 0
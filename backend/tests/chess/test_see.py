@@ -0,0 +1,27 @@
+import pytest
+from app.chess.board_bitboard import BoardBitboard
+from app.chess.board_mailbox import BoardMailbox
+from app.chess.utils import to_uci, is_bad_capture
+
+SEE_CASES = [
+    ("4k3/8/8/3p4/8/8/3R4/3RK3 w - - 0 1", "d2d5", 100),  # undefended pawn
+    ("4k3/3r4/3r4/3p4/8/8/3R4/3RK3 w - - 0 1", "d2d5", -400),  # doubled rooks on both sides (x-rays)
+    ("4k3/8/2b5/3p4/4Q3/8/8/4K3 w - - 0 1", "e4d5", -800),  # queen takes a defended pawn
+    ("4k3/8/8/2pP4/8/8/8/4K3 w - c6 0 1", "d5c6", 100),  # en passant
+    ("1r2k3/P7/8/8/8/8/8/4K3 w - - 0 1", "a7b8q", 1300),  # capture-promotion
+    ("1r2k3/P7/8/8/8/8/8/4K3 w - - 0 1", "a7a8q", -100),  # the new queen is taken
+    ("1k1r3q/1ppn3p/p4b2/4p3/8/P2N2P1/1PP1R1BP/2K1Q3 w - - 0 1", "d3e5", -70),
+]
+
+
+@pytest.mark.parametrize("board_class", [BoardMailbox, BoardBitboard])
+@pytest.mark.parametrize("fen, uci, expected", SEE_CASES)
+def test_see(board_class, fen, uci, expected):
+    board = board_class()
+    board.from_fen(fen)
+    move = next(m for m in board.move_generator().legal_moves() if to_uci(m) == uci)
+
+    assert board.see(move) == expected
+    # queen promotions are always searched
+    assert is_bad_capture(board, move) == (expected < 0 and not uci.endswith("q"))
+    assert board.to_fen() == fen
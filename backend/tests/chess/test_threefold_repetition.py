@@ -1,4 +1,6 @@
 from app.chess.board_array import BoardArray
+from app.chess.board_mailbox import BoardMailbox, UNDO_PLIES
+from app.chess.move_mailbox import MoveMailBoxGenerator
 from app.chess.move_tuple import MoveTupleGenerator
 from app.chess.perft import perft
 from app.chess.utils import sq
@@ -72,3 +74,31 @@ def test_repetition_en_passant_matters():
 
     # En passant square changed/reset → no repetition
     assert board.is_threefold_repetition() is False
+
+
+def test_threefold_repetition_mailbox_follows_undo():
+    board = BoardMailbox()
+    board.from_fen("4k1n1/8/8/8/8/8/8/4K1N1 w - - 0 1")
+    gen = MoveMailBoxGenerator(board)
+    # the FEN position itself is not counted
+    moves = [gen.apply_uci(uci) for uci in ("g1f3", "g8f6", "f3g1", "f6g8") * 3]
+
+    assert board.is_threefold_repetition() is True
+
+    for move in reversed(moves[-4:]):
+        gen.undo(move)
+    assert board.is_threefold_repetition() is False
+
+
+def test_undo_store_grows_past_capacity():
+    fen = "4k1n1/8/8/8/8/8/8/4K1N1 w - - 0 1"
+    board = BoardMailbox()
+    board.from_fen(fen)
+    gen = MoveMailBoxGenerator(board)
+    moves = [gen.apply_uci(uci) for uci in ("g1f3", "g8f6", "f3g1", "f6g8") * (UNDO_PLIES // 2)]
+
+    assert board.ply == 2 * UNDO_PLIES
+    for move in reversed(moves):
+        gen.undo(move)
+    assert board.ply == 0
+    assert board.to_fen() == fen
@@ -1,5 +1,7 @@
 import pytest
-from app.chess.utils import int_tuple_to_notation, notation_to_int_tuple
+from app.chess.move_flags import FLAG_NONE, FLAG_CAPTURE, FLAG_PROMO_Q, FLAG_PROMO_N, encode_move, decode_move, \
+    move_from, move_to, move_flags
+from app.chess.utils import int_tuple_to_notation, notation_to_int_tuple, to_uci, from_uci_move
 
 
 def test_int_tuple_to_notation():
@@ -12,3 +14,26 @@ def test_notation_to_int_tuple():
     assert notation_to_int_tuple("a8") == (0, 0)
     assert notation_to_int_tuple("e4") == (4, 4)
     assert notation_to_int_tuple("h1") == (7, 7)
+
+
+def test_uci_round_trip_packed_moves():
+    for uci in ("e2e4", "a1h8", "h7h8q", "b2a1n", "e7e8r", "c2c1b"):
+        assert to_uci(from_uci_move(uci)) == uci
+
+    assert from_uci_move("e2e4") == encode_move(12, 28)
+    assert from_uci_move("a7a8Q") == encode_move(48, 56, FLAG_PROMO_Q)
+    assert to_uci(encode_move(48, 57, FLAG_CAPTURE | FLAG_PROMO_N)) == "a7b8n"
+    assert to_uci((12, 28, FLAG_NONE)) == "e2e4"  # BoardArray generators still use tuples
+
+
+@pytest.mark.parametrize("uci", ["e2e", "e2e4q1", "i2e4", "e9e4", "e2e0"])
+def test_invalid_uci_move(uci):
+    with pytest.raises(ValueError):
+        from_uci_move(uci)
+
+
+def test_packed_move_fields():
+    move = encode_move(52, 60, FLAG_PROMO_Q | FLAG_CAPTURE)
+
+    assert decode_move(move) == (52, 60, FLAG_PROMO_Q | FLAG_CAPTURE)
+    assert (move_from(move), move_to(move), move_flags(move)) == (52, 60, FLAG_PROMO_Q | FLAG_CAPTURE)